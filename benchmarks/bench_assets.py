@@ -0,0 +1,121 @@
+# Benchmark: page weight and request time of the pages before vs. after the asset build (src/assets.py)
+#   - before: no build, the plain /static files with Flask's default cache headers (revalidated on every visit)
+#   - after:  hashed, precompressed files from /assets/ and the background photo picked from its srcset
+# A small "browser" fetches index.html over HTTP like a real one would: the stylesheet, then the background
+# <picture> candidate for its viewport (AVIF if offered). plotly.js (the graph page's script) is measured on its own.
+# Counts the bytes on the wire and the requests a repeat visit still makes (anything without a max-age is revalidated).
+# Usage: python benchmarks/bench_assets.py [--repeats 20]
+
+import argparse
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+from html.parser import HTMLParser
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# A throwaway build folder, so this never touches (or depends on) the real one
+BUILD_DIR = tempfile.mkdtemp(prefix="bench_assets_")
+os.environ["ASSET_BUILD_DIR"] = BUILD_DIR
+
+from load_plan import start_local_app  # Also puts src/ on sys.path
+
+import requests
+
+from bench_report import summarize, write_results
+
+# (name, viewport width in CSS pixels, device pixel ratio)
+BROWSERS = [("mobile", 390, 2), ("desktop", 1440, 1)]
+ACCEPT = {"Accept-Encoding": "gzip, deflate, br", "Accept": "image/avif,image/webp,*/*"}
+
+
+class PageAssets(HTMLParser):
+    # Stylesheets and the first <picture> of a page, like a browser's preload scanner sees them
+    def __init__(self):
+        super().__init__()
+        self.stylesheets, self.sources, self.img = [], [], None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "link" and attrs.get("rel") == "stylesheet":
+            self.stylesheets.append(attrs["href"])
+        elif tag == "source" and self.img is None:
+            self.sources.append((attrs.get("type"), attrs.get("srcset", "")))
+        elif tag == "img" and self.img is None:
+            self.img = attrs.get("src")
+
+
+def pick_image(page, width, ratio):
+    # First source type the browser supports, then the smallest candidate that covers the viewport
+    for mime, srcset in page.sources:
+        if mime in ("image/avif", "image/webp"):
+            candidates = sorted((int(w[:-1]), url) for url, w in (item.split() for item in srcset.split(", ")))
+            for candidate_width, url in candidates:
+                if candidate_width >= width * ratio:
+                    return url
+            return candidates[-1][1]
+    return page.img
+
+
+def fetch(session, url, repeats):
+    # Bytes on the wire (compressed if it was sent compressed), cache headers and time per request
+    seconds = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        response = session.get(url, headers=ACCEPT, stream=True)
+        body = response.raw.read(decode_content=False)
+        seconds.append(time.perf_counter() - start)
+    cache_control = response.headers.get("Cache-Control", "")
+    cached = "immutable" in cache_control or bool(re.search(r"max-age=[1-9]", cache_control))
+    return {"url": url, "bytes": len(body), "cached": cached, "latency": summarize(seconds)}
+
+
+def page_weight(session, base_url, urls, repeats):
+    files = [fetch(session, base_url + url, repeats) for url in urls]
+    return {
+        "files": files,
+        "bytes": sum(file["bytes"] for file in files),
+        "requests": len(files),
+        "repeat_visit_requests": sum(not file["cached"] for file in files),
+        "seconds_p50": sum(file["latency"]["p50"] for file in files),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeats", type=int, default=20, help="Requests per file for the timings")
+    parser.add_argument("--output", default=None, help="JSON file to write (default: benchmarks/results/...)")
+    args = parser.parse_args()
+
+    import assets
+    base_url, stop = start_local_app(0.0, 20)
+    results = {}
+    try:
+        start = time.perf_counter()
+        assets.build(out_dir=BUILD_DIR)
+        print(f"Asset build: {time.perf_counter() - start:.1f} s")
+        for mode in ("before", "after"):
+            assets.BUILD_DIR = BUILD_DIR if mode == "after" else os.path.join(BUILD_DIR, "missing")
+            session = requests.Session()
+            page = PageAssets()
+            page.feed(session.get(f"{base_url}/").text)
+            for name, width, ratio in BROWSERS:
+                urls = ["/"] + page.stylesheets + [pick_image(page, width, ratio)]
+                results[f"{mode}-{name}"] = page_weight(session, base_url, urls, args.repeats)
+            plotly_url = assets.url("vendor/plotly.min.js") or "/vendor/plotly.min.js"
+            results[f"{mode}-plotly.js"] = page_weight(session, base_url, [plotly_url], args.repeats)
+    finally:
+        stop()
+        shutil.rmtree(BUILD_DIR, ignore_errors=True)
+
+    print(f"{'page':<16} | {'KB':>8} | {'requests':>8} | {'repeat visit':>12} | {'p50 ms':>8}")
+    for key, result in results.items():
+        print(f"{key:<16} | {result['bytes'] / 1024:>8.1f} | {result['requests']:>8} | "
+              f"{result['repeat_visit_requests']:>12} | {result['seconds_p50'] * 1000:>8.2f}")
+        for file in result["files"]:
+            print(f"    {file['url'][len(base_url):][:60]:<60} {file['bytes'] / 1024:>8.1f} KB {file['latency']['p50'] * 1000:>7.2f} ms")
+    path = write_results("assets", vars(args), results, args.output)
+    print(f"Results saved to {path}")
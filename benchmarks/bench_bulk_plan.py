@@ -0,0 +1,92 @@
+# Benchmark: plans per second through the form route vs. the bulk JSON API
+#   - form: concurrent users POSTing /plan (threads in one Flask process, HTML results)
+#   - bulk: one POST /api/plan/bulk with every spec, planned on the process pool and streamed back as NDJSON
+# The app and a stub Maps server run in this process (see load_plan.py); both modes share one SQLite geo cache
+# file like a real deployment, but plan different destinations so neither gets the other's cache hits.
+# Usage: python benchmarks/bench_bulk_plan.py [--plans 48] [--concurrency 8] [--workers 4] [--latency 0.02]
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from load_plan import start_local_app  # Also puts src/ on sys.path
+
+# A cache file instead of load_plan's memory-only cache, so the bulk workers share it (the pool passes the path on)
+CACHE_PATH = os.path.join(tempfile.gettempdir(), f"bench_bulk_plan_{os.getpid()}.sqlite")
+os.environ["GEO_CACHE_PATH"] = CACHE_PATH
+
+import requests
+
+from bench_report import write_results
+
+
+def spec(prefix, i, args):
+    return {"id": i, "destination": f"{prefix} City {i}", "budget": args.budget, "duration": args.duration, "interests": ["museum"]}
+
+
+def run_form(base_url, args):
+    def user(i):
+        form = spec("Form", i, args)
+        form["budget"], form["duration"] = str(form["budget"]), str(form["duration"])
+        return requests.post(f"{base_url}/plan", data=form).status_code
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        statuses = list(pool.map(user, range(args.plans)))
+    return time.perf_counter() - start, sum(status == 200 for status in statuses), None
+
+
+def run_bulk(base_url, args):
+    start = time.perf_counter()
+    first = None
+    done = 0
+    with requests.post(f"{base_url}/api/plan/bulk", json={"plans": [spec("Bulk", i, args) for i in range(args.plans)]}, stream=True) as response:
+        for line in response.iter_lines():
+            if first is None:
+                first = time.perf_counter() - start  # Streaming: the first record arrives long before the last
+            done += json.loads(line)["status"] == "done"
+    return time.perf_counter() - start, done, first
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--plans", type=int, default=48)
+    parser.add_argument("--concurrency", type=int, default=8, help="Form route users planning at the same time")
+    parser.add_argument("--workers", type=int, default=2 * (os.cpu_count() or 1), help="Bulk pool worker processes")
+    parser.add_argument("--budget", type=int, default=1500)
+    parser.add_argument("--duration", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.02, help="Seconds of delay the stub adds to every response")
+    parser.add_argument("--city-size", type=int, default=60, help="Places per nearby search on the stub")
+    parser.add_argument("--output", default=None, help="JSON file to write (default: benchmarks/results/...)")
+    args = parser.parse_args()
+
+    base_url, stop = start_local_app(args.latency, args.city_size)
+    import app
+    app.bulk.max_workers = args.workers
+    # Start every worker before timing (the pool spawns them on demand and each one imports the app's modules)
+    list(app.bulk.pool().map(time.sleep, [1.0] * args.workers))
+
+    results = {}
+    try:
+        for mode, run in (("form", run_form), ("bulk", run_bulk)):
+            seconds, done, first = run(base_url, args)
+            results[mode] = {"seconds": seconds, "plans_done": done, "plans_per_second": done / seconds, "first_result": first}
+            extra = f" | first record after {first:.2f} s" if first is not None else ""
+            print(f"{mode:<5} | {done}/{args.plans} plans in {seconds:.2f} s | {done / seconds:.2f} plans/s{extra}")
+    finally:
+        app.bulk.shutdown()
+        stop()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(CACHE_PATH + suffix):
+                os.remove(CACHE_PATH + suffix)
+
+    print(f"Speedup: {results['bulk']['plans_per_second'] / results['form']['plans_per_second']:.1f}x "
+          f"({args.workers} worker processes vs. {args.concurrency} threads)")
+    path = write_results("bulk_plan", vars(args), results, args.output)
+    print(f"Results saved to {path}")
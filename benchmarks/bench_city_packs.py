@@ -0,0 +1,88 @@
+# Benchmark: places + graph of /plan from live API calls vs. from a precomputed city pack (src/city_packs.py)
+#   - live: geocode, nearby searches and the Distance Matrix for the places the budget allows (cold cache, stub API)
+#   - pack: open the memory-mapped pack, pick the places by interest and budget, slice their distances
+# Packs of growing size are built first (great-circle distances so building stays quick; slicing doesn't care)
+# Usage: python benchmarks/bench_city_packs.py [--sizes 60 250 1000] [--runs 20] [--budget 1500] [--duration 3]
+
+import argparse
+import contextlib
+import io
+import math
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+os.environ["GEO_CACHE_PATH"] = ""  # Memory-only cache so runs don't touch (or get answered by) the real cache file
+
+import api_test
+import utils
+from api_test import collect_places, get_lat_lon, iter_places
+from city_packs import CityPack, build_pack
+from distance_providers import HaversineProvider
+from geo_cache import cache
+from graph_builder import create_compact_graph
+from mock_maps_server import MockMapsServer
+
+INTERESTS = ["museum", "restaurant"]
+
+
+def live(max_places):
+    # Same calls as planner.fetch_graph
+    lat, lon = get_lat_lon("Benchmark City")
+    places = collect_places(iter_places(f"{lat}, {lon}", 5000, INTERESTS), max_places)
+    return create_compact_graph(places)
+
+
+def from_pack(path, max_places):
+    pack = CityPack(path)  # Opened fresh every run: the memory maps cost nothing until they're read
+    return pack.graph(pack.select(INTERESTS, max_places))
+
+
+def time_runs(fn, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        graph = fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), graph
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[60, 250, 1000], help="Places per interest in the pack")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--budget", type=int, default=1500)
+    parser.add_argument("--duration", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds of delay the stub adds to every response")
+    args = parser.parse_args()
+    max_places = args.budget // (10 * args.duration)  # Same budget rule as run_plan
+
+    print(f"{max_places} places per plan, interests {INTERESTS}")
+    print(f"{'pack places':>11} | {'pack MB':>8} | {'build s':>8} | {'live ms':>9} | {'requests':>8} | {'pack ms':>8} | {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as folder:
+        for size in args.sizes:
+            with MockMapsServer(latency=args.latency, city_size=size) as server, contextlib.redirect_stdout(io.StringIO()):
+                utils.MAPS_API_URL = server.url
+                api_test.PAGE_TOKEN_DELAY = 0
+
+                start = time.perf_counter()
+                path = build_pack("Benchmark City", max_pages=math.ceil(size / 20), provider=HaversineProvider(), directory=folder)
+                build_seconds = time.perf_counter() - start
+
+                live_runs = []
+                for _ in range(max(1, args.runs // 4)):  # Live plans are slow, fewer of them
+                    cache.clear()
+                    server.reset_count()
+                    live_runs.append(time_runs(lambda: live(max_places), 1)[0])
+                requests_per_plan = server.request_count
+                live_seconds = statistics.median(live_runs)
+
+                pack_seconds, graph = time_runs(lambda: from_pack(path, max_places), args.runs)
+
+            places = len(CityPack(path))
+            megabytes = sum(entry.stat().st_size for entry in os.scandir(path)) / 2 ** 20
+            print(f"{places:>11} | {megabytes:>8.2f} | {build_seconds:>8.2f} | {live_seconds * 1000:>9.1f} | "
+                  f"{requests_per_plan:>8} | {pack_seconds * 1000:>8.2f} | {live_seconds / pack_seconds:>7.0f}x")
@@ -0,0 +1,52 @@
+# Benchmark: networkx.Graph vs. CompactGraph for what a /plan request does with the graph
+# (build it, run DFS once and Dijkstra once per day), using great-circle distances so no API is involved
+# Usage: python benchmarks/bench_compact_graph.py [--sizes 50 200 500] [--days 3]
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_sparse_graph import random_places
+from dfs_algorithm import dfs_path
+from dijkstra_algorithm import dijkstra_path
+from distance_providers import HaversineProvider
+from graph_builder import create_compact_graph, create_graph
+
+
+def plan_request(build, places, days):
+    # Mirrors the graph part of app.plan
+    tracemalloc.start()
+    start = time.perf_counter()
+    graph = build(places, HaversineProvider())
+    built = time.perf_counter()
+    graph_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    dfs_path(graph, start_node=0, preference="rating")
+    searched = time.perf_counter()
+    start_node, end_node = 0, len(places) - 1
+    for _ in range(days):
+        dijkstra_path(graph, [], start_node, end_node)
+        start_node += 1
+        end_node -= 1
+    done = time.perf_counter()
+    return graph_bytes / 2 ** 20, built - start, searched - built, done - searched
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 200, 500])
+    parser.add_argument("--days", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'N':>5} | {'graph':<8} | {'memory MB':>9} | {'build s':>8} | {'dfs s':>8} | {'dijkstra s':>10}")
+    for n in args.sizes:
+        places = random_places(n)
+        for label, build in (("networkx", create_graph), ("compact", create_compact_graph)):
+            memory, build_s, dfs_s, dijkstra_s = plan_request(build, places, args.days)
+            print(f"{n:>5} | {label:<8} | {memory:>9.2f} | {build_s:>8.3f} | {dfs_s:>8.3f} | {dijkstra_s:>10.3f}")
@@ -0,0 +1,75 @@
+# Benchmark: the old recursive dfs_path vs. the iterative one
+#   chain:    a long path of places, the deepest possible DFS (recursion limit)
+#   knn:      k-nearest-neighbour graph of random places
+#   complete: complete graph like the default create_graph makes (only up to --max-complete places)
+# Usage: python benchmarks/bench_dfs.py [--sizes 1000 10000 50000] [--max-complete 1000]
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import networkx as nx
+
+from bench_sparse_graph import random_places
+from compact_graph import CompactGraph
+from dfs_algorithm import dfs_path
+from distance_providers import HaversineProvider
+from graph_builder import create_graph
+
+
+def recursive_dfs_path(graph, start_node, preference=None):
+    # The previous implementation, kept here for comparison
+    visited = set()
+    path = []
+
+    def dfs(node):
+        if node not in visited:
+            visited.add(node)
+            path.append(node)
+            neighbors = list(graph.neighbors(node))
+            if preference:
+                neighbors.sort(key=lambda n: graph.nodes[n].get(preference, 0), reverse=True)
+            for neighbor in neighbors:
+                dfs(neighbor)
+
+    dfs(start_node)
+    return path
+
+
+def chain_graph(n):
+    G = nx.path_graph(n)
+    nx.set_node_attributes(G, {node: (node * 7919) % 50 / 10 for node in G}, "rating")
+    return G
+
+
+def timed(fn, graph):
+    start = time.perf_counter()
+    try:
+        visited = len(fn(graph, 0, "rating"))
+    except RecursionError:
+        return "RecursionError", time.perf_counter() - start
+    return visited, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--max-complete", type=int, default=1000)
+    parser.add_argument("--k", type=int, default=8)
+    args = parser.parse_args()
+
+    print(f"{'N':>6} | {'graph':<8} | {'implementation':<19} | {'visited':>14} | {'seconds':>8}")
+    for n in args.sizes:
+        graphs = [("chain", chain_graph(n)), ("knn", create_graph(random_places(n), HaversineProvider(), k=args.k))]
+        if n <= args.max_complete:
+            graphs.append(("complete", create_graph(random_places(n), HaversineProvider())))
+        for label, graph in graphs:
+            runs = (("recursive", recursive_dfs_path, graph), ("iterative", dfs_path, graph),
+                    ("iterative (compact)", dfs_path, CompactGraph.from_networkx(graph)))
+            for implementation, fn, g in runs:
+                visited, seconds = timed(fn, g)
+                print(f"{n:>6} | {label:<8} | {implementation:<19} | {visited:>14} | {seconds:>8.3f}")
@@ -0,0 +1,55 @@
+# Benchmark: batched distance matrix vs. the old one-request-per-pair loop, against the local stub server
+# Usage: python benchmarks/bench_distance_matrix.py [--sizes 10 50 200] [--latency 0.02]
+
+import argparse
+import itertools
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+os.environ["GEO_CACHE_PATH"] = ""  # Memory-only cache so runs don't touch (or get answered by) the real cache file
+
+import utils
+from distance_matrix import build_distance_matrix
+from geo_cache import cache
+from mock_maps_server import MockMapsServer
+
+
+def random_coords(n, seed=0, center=(40.7128, -74.0060), spread=0.05):
+    rng = random.Random(seed)
+    return [f"{center[0] + rng.uniform(-spread, spread):.6f},{center[1] + rng.uniform(-spread, spread):.6f}" for _ in range(n)]
+
+
+def pairwise(coords):
+    # The old create_graph loop: one Distance Matrix call per pair of places
+    for i, j in itertools.combinations(range(len(coords)), 2):
+        utils.get_distances(coords[i], [coords[j]])
+
+
+def measure(server, fn, coords):
+    cache.clear()  # Every run starts cold
+    server.reset_count()
+    start = time.perf_counter()
+    fn(coords)
+    return server.request_count, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--latency", type=float, default=0.02, help="Simulated seconds per request")
+    parser.add_argument("--max-pairwise", type=int, default=200, help="Skip the pairwise baseline above this size")
+    args = parser.parse_args()
+
+    with MockMapsServer(latency=args.latency) as server:
+        utils.MAPS_API_URL = server.url
+        print(f"{'N':>5} | {'mode':<8} | {'requests':>8} | {'seconds':>8}")
+        for n in args.sizes:
+            coords = random_coords(n)
+            if n <= args.max_pairwise:
+                requests_made, seconds = measure(server, pairwise, coords)
+                print(f"{n:>5} | {'pairwise':<8} | {requests_made:>8} | {seconds:>8.3f}")
+            requests_made, seconds = measure(server, build_distance_matrix, coords)
+            print(f"{n:>5} | {'batched':<8} | {requests_made:>8} | {seconds:>8.3f}")
@@ -0,0 +1,58 @@
+# Benchmark: fig.write_html per graph (the old interactive files) vs. the compact JSON payload graph.html draws from
+# Compares file size (raw and gzipped) and the time to produce it, for the DFS view of a plan
+# Usage: python benchmarks/bench_graph_payload.py [--sizes 1000] [--k 8]   (no --k: complete graph, like /plan)
+
+import argparse
+import gzip
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_sparse_graph import random_places
+from dfs_algorithm import dfs_path
+from distance_providers import HaversineProvider
+from graph_builder import create_compact_graph, visualize_graph_interactive
+from graph_export import graph_payload, write_payload
+from layout import graph_layout
+
+
+def measure(write, folder, name):
+    filename = os.path.join(folder, name)
+    start = time.perf_counter()
+    write(filename)
+    seconds = time.perf_counter() - start
+    with open(filename, "rb") as file:
+        data = file.read()
+    if name.endswith(".gz"):
+        return len(gzip.decompress(data)), len(data), seconds
+    return len(data), len(gzip.compress(data)), seconds
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000])
+    parser.add_argument("--k", type=int, default=None, help="k-nearest-neighbour graph instead of a complete one")
+    args = parser.parse_args()
+
+    print(f"{'N':>5} | {'edges':>7} | {'format':<10} | {'raw MB':>8} | {'gzip MB':>8} | {'seconds':>8}")
+    for n in args.sizes:
+        graph = create_compact_graph(random_places(n), HaversineProvider(), k=args.k)
+        order = dfs_path(graph, start_node=0, preference="rating")
+        edges = list(zip(order[:-1], order[1:]))
+        pos = graph_layout(graph)
+
+        with tempfile.TemporaryDirectory() as folder:
+            def html(filename):
+                # Includes converting to networkx, which the old path needs too
+                visualize_graph_interactive(graph.to_networkx(), filename=filename, edge_highlight=edges, node_order=order, pos=pos)
+
+            def payload(filename):
+                write_payload(graph_payload(graph, pos, edges, order), filename)
+
+            for label, write, name in (("write_html", html, "graph.html"), ("payload", payload, "graph.json.gz")):
+                raw, zipped, seconds = measure(write, folder, name)
+                print(f"{n:>5} | {graph.number_of_edges():>7} | {label:<10} | {raw / 2 ** 20:>8.2f} | {zipped / 2 ** 20:>8.2f} | {seconds:>8.3f}")
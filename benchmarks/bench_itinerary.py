@@ -0,0 +1,47 @@
+# Benchmark: total travel distance and solve time of the itinerary optimizer vs. the DFS and Dijkstra itineraries
+# Uses great-circle distances on random places, so no API is involved
+# Usage: python benchmarks/bench_itinerary.py [--sizes 20 50 100 200] [--days 3]
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_sparse_graph import random_places
+from dfs_algorithm import dfs_path
+from distance_providers import HaversineProvider
+from graph_builder import create_compact_graph
+from itinerary import plan_itinerary, route_length, split_days, travel_matrix
+from shortest_paths import ShortestPathService
+
+
+def dfs_itinerary(graph, days):
+    return split_days(dfs_path(graph, start_node=0, preference="rating"), days)
+
+
+def dijkstra_itinerary(graph, days):
+    result = []
+    for path in ShortestPathService(graph).day_paths(days):
+        result += path
+    return split_days(result, days)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[20, 50, 100, 200])
+    parser.add_argument("--days", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'N':>5} | {'itinerary':<10} | {'places':>6} | {'distance km':>11} | {'seconds':>8}")
+    for n in args.sizes:
+        graph = create_compact_graph(random_places(n), HaversineProvider())
+        matrix = travel_matrix(graph)
+        for label, solve in (("dfs", dfs_itinerary), ("dijkstra", dijkstra_itinerary), ("optimized", plan_itinerary)):
+            start = time.perf_counter()
+            days = solve(graph, args.days)
+            seconds = time.perf_counter() - start
+            visited = sum(len(day) for day in days)
+            print(f"{n:>5} | {label:<10} | {visited:>6} | {route_length(matrix, days) / 1000:>11.1f} | {seconds:>8.3f}")
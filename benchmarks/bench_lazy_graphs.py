@@ -0,0 +1,98 @@
+# Benchmark: cold start of the app and /plan latency, rendering the graphs eagerly (what /plan used to do) vs. lazily
+#   - cold start: time to `import app` in a fresh interpreter, with and without the plotting libraries loaded up front
+#   - /plan: response time when all four graphs are rendered before responding vs. only when one is opened
+# Runs against the local stub server so no API quota is used
+# Usage: python benchmarks/bench_lazy_graphs.py [--runs 5] [--budget 2000] [--duration 3]
+
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+sys.path.insert(0, SRC_DIR)
+os.environ["GEO_CACHE_PATH"] = ""  # Memory-only cache so runs don't touch (or get answered by) the real cache file
+
+import api_test
+import planner
+import utils
+from artifacts import ArtifactStore
+from geo_cache import cache
+from mock_maps_server import MockMapsServer
+
+IMPORT_SNIPPET = """
+import sys, time
+start = time.perf_counter()
+{preload}
+import app
+print(time.perf_counter() - start, int("matplotlib.pyplot" in sys.modules), int("plotly.graph_objects" in sys.modules))
+"""
+
+
+def cold_start(preload, runs):
+    # Fresh interpreter every run, so nothing is already imported
+    times, loaded = [], None
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET.format(preload=preload)], cwd=SRC_DIR,
+                             env={**os.environ, "GEO_CACHE_PATH": ""}, capture_output=True, text=True, check=True)
+        seconds, matplotlib_loaded, plotly_loaded = out.stdout.split()[-3:]
+        times.append(float(seconds))
+        loaded = matplotlib_loaded == "1" and plotly_loaded == "1"
+    return statistics.median(times), loaded
+
+
+def plan_latency(client, form, eager, runs):
+    # Every run starts cold: empty place/distance cache and an empty artifact folder
+    plan_times, first_view_times = [], []
+    for _ in range(runs):
+        cache.clear()
+        with tempfile.TemporaryDirectory() as folder:
+            planner.store = ArtifactStore(folder)
+            with contextlib.redirect_stdout(io.StringIO()):  # /plan and the renderers print their results
+                start = time.perf_counter()
+                client.post("/plan", data=form)
+                plan_id = next(iter(planner._plans))  # Only plan stored so far in this run
+                if eager:
+                    for view in planner.VIEWS:
+                        planner.render_view(planner.get_plan(plan_id), view).close()
+                planned = time.perf_counter()
+                planner.render_view(planner.get_plan(plan_id), "dfs").close()  # The user opens one graph
+            plan_times.append(planned - start)
+            first_view_times.append(time.perf_counter() - planned)
+            planner._plans.clear()
+    return statistics.median(plan_times), statistics.median(first_view_times)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", type=int, default=2000)
+    parser.add_argument("--duration", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'cold start':<28} | {'import app s':>12} | plotting libs loaded")
+    for label, preload in (("eager imports (before)", "import matplotlib.pyplot, plotly.graph_objects"),
+                           ("deferred imports (after)", "")):
+        seconds, loaded = cold_start(preload, args.runs)
+        print(f"{label:<28} | {seconds:>12.3f} | {loaded}")
+
+    api_test.PAGE_TOKEN_DELAY = 0  # The stub's page tokens work right away
+    form = {"destination": "New York", "budget": str(args.budget), "duration": str(args.duration), "interests": ["museum"]}
+    with MockMapsServer() as server:
+        utils.MAPS_API_URL = server.url
+        import app
+        client = app.app.test_client()
+        with contextlib.redirect_stdout(io.StringIO()):
+            client.post("/plan", data=form)  # Warm up imports for both modes
+        planner._plans.clear()
+
+        print()
+        print(f"{'/plan':<28} | {'response s':>12} | {'first graph s':>13}")
+        for label, eager in (("render all graphs (before)", True), ("render on request (after)", False)):
+            plan_s, view_s = plan_latency(client, form, eager, args.runs)
+            print(f"{label:<28} | {plan_s:>12.3f} | {view_s:>13.3f}")
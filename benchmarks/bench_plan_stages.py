@@ -0,0 +1,126 @@
+# Benchmark: every stage of /plan timed on its own, over synthetic cities of increasing size
+# Stages (same order as planner.run_plan): geocode, places fetch, create_graph, dfs_path, the Dijkstra days,
+# split_days, plan_itinerary and each visualizer. Places and distances come from the local stub server,
+# so nothing costs API quota. Results (p50/p95 per stage, peak memory per stage) are saved as JSON.
+# Usage: python benchmarks/bench_plan_stages.py [--sizes 50 100 200 400] [--repeats 5] [--duration 3]
+#                                                [--provider api|haversine] [--latency 0.0] [--output file.json]
+
+import argparse
+import math
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ["GEO_CACHE_PATH"] = ""  # Memory-only cache so runs don't touch (or get answered by) the real cache file
+
+import api_test
+import layout
+import utils
+from api_test import collect_places, get_lat_lon, iter_places
+from bench_report import summarize, write_results
+from dfs_algorithm import dfs_path
+from distance_providers import ApiProvider, HaversineProvider
+from geo_cache import cache
+from graph_builder import create_compact_graph, visualize_graph, visualize_graph_interactive
+from graph_export import graph_payload, write_payload
+from itinerary import plan_itinerary, split_days
+from mock_maps_server import MockMapsServer
+from shortest_paths import ShortestPathService
+
+
+def run_stages(n, duration, provider, folder, timer, max_pages):
+    """
+    One plan for a city of n places, calling timer(stage, fn) around every stage (mirrors planner.run_plan).
+    """
+    lat, lon = timer("geocode", lambda: get_lat_lon("Benchmark City"))
+    location = f"{lat}, {lon}"
+    places = timer("places", lambda: collect_places(iter_places(location, 5000, ["tourist_attraction"], max_pages), n))
+    graph = timer("create_graph", lambda: create_compact_graph(places, provider))
+    dfs_result = timer("dfs_path", lambda: dfs_path(graph, start_node=0, preference="rating"))
+    day_paths = timer("dijkstra", lambda: ShortestPathService(graph).day_paths(duration))
+    dijkstra_result = [node for path in day_paths for node in path]
+    timer("split_days", lambda: (split_days(dfs_result, duration), split_days(dijkstra_result, duration)))
+    timer("plan_itinerary", lambda: plan_itinerary(graph, duration))
+
+    # Visualizers (rendered on request in the app, timed here as if the user opened all of them)
+    dfs_edges = list(zip(dfs_result[:-1], dfs_result[1:]))
+    pos = timer("layout", lambda: layout.graph_layout(graph))
+    nx_graph = timer("to_networkx", graph.to_networkx)
+    timer("visualize_graph", lambda: visualize_graph(nx_graph, filename=os.path.join(folder, "graph.png"), pos=pos))
+    timer("visualize_graph_interactive", lambda: visualize_graph_interactive(
+        nx_graph, filename=os.path.join(folder, "graph.html"), edge_highlight=dfs_edges, node_order=dfs_result, pos=pos))
+    timer("graph_payload", lambda: write_payload(graph_payload(graph, pos, dfs_edges, dfs_result), os.path.join(folder, "graph.json.gz")))
+    return len(places), graph.number_of_edges()
+
+
+def fresh_run():
+    # Cold caches for every run: the place/distance cache and the cached layouts
+    cache.clear()
+    layout._layouts.clear()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 100, 200, 400])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--duration", type=int, default=3)
+    parser.add_argument("--provider", choices=["api", "haversine"], default="api",
+                        help="Distances from the stub Distance Matrix API (like /plan) or computed locally")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds of delay the stub adds to every response")
+    parser.add_argument("--output", default=None, help="JSON file to write (default: benchmarks/results/...)")
+    args = parser.parse_args()
+
+    results = []
+    with MockMapsServer(latency=args.latency, city_size=max(args.sizes)) as server, tempfile.TemporaryDirectory() as folder:
+        utils.MAPS_API_URL = server.url
+        api_test.PAGE_TOKEN_DELAY = 0
+        max_pages = math.ceil(max(args.sizes) / 20)  # The stub has no 60-result cap
+        provider = ApiProvider() if args.provider == "api" else HaversineProvider()
+
+        for n in args.sizes:
+            timings = defaultdict(list)
+
+            def timed(stage, fn):
+                start = time.perf_counter()
+                value = fn()
+                timings[stage].append(time.perf_counter() - start)
+                return value
+
+            for _ in range(args.repeats):
+                fresh_run()
+                server.reset_count()
+                places, edges = run_stages(n, args.duration, provider, folder, timed, max_pages)
+            requests_per_plan = server.request_count
+
+            # One more run with tracemalloc on, for the peak memory of every stage (kept out of the timings)
+            peaks = {}
+
+            def traced(stage, fn):
+                tracemalloc.reset_peak()
+                value = fn()
+                peaks[stage] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+                return value
+
+            fresh_run()
+            tracemalloc.start()
+            run_stages(n, args.duration, provider, folder, traced, max_pages)
+            tracemalloc.stop()
+
+            stages = {stage: {**summarize(samples), "peak_mb": round(peaks.get(stage, 0.0), 3)} for stage, samples in timings.items()}
+            total = [sum(run) for run in zip(*timings.values())]
+            results.append({"places": places, "edges": edges, "requests": requests_per_plan,
+                            "total": summarize(total), "stages": stages})
+
+            print(f"\nN = {n} ({places} places, {edges} edges, {requests_per_plan} stub requests per plan)")
+            print(f"{'stage':<28} | {'p50 s':>8} | {'p95 s':>8} | {'peak MB':>8}")
+            for stage, summary in stages.items():
+                print(f"{stage:<28} | {summary['p50']:>8.4f} | {summary['p95']:>8.4f} | {summary['peak_mb']:>8.2f}")
+            print(f"{'total':<28} | {summarize(total)['p50']:>8.4f} | {summarize(total)['p95']:>8.4f} |")
+
+    path = write_results("plan_stages", vars(args), results, args.output)
+    print(f"\nResults saved to {path}")
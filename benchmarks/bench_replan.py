@@ -0,0 +1,78 @@
+# Benchmark: a user re-planning the same destination (bigger budget, one more interest, smaller budget)
+#   - rebuild, cold cache: create_compact_graph from scratch every time with an empty geo cache
+#   - rebuild, warm cache: the same, but distances already fetched come from the geo cache (n^2 lookups)
+#   - session:             plan_session.PlanSession, only the new places get distance rows
+# Every edit is timed and its Distance Matrix requests and elements (what the API bills) counted (stub API, no quota used)
+# Usage: python benchmarks/bench_replan.py [--duration 3] [--city-size 120] [--latency 0.0]
+
+import argparse
+import contextlib
+import io
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+os.environ["GEO_CACHE_PATH"] = ""  # Memory-only cache so runs don't touch (or get answered by) the real cache file
+
+import api_test
+import utils
+from api_test import collect_places, iter_places
+from geo_cache import cache
+from graph_builder import create_compact_graph
+from mock_maps_server import MockMapsServer
+from plan_session import PlanSession
+from utils import REQUEST_COUNTS
+
+# (budget, interests) of each submission, in order
+EDITS = [
+    (1000, ["museum"]),
+    (2000, ["museum"]),
+    (2000, ["museum", "restaurant"]),
+    (3000, ["museum", "restaurant"]),
+    (1200, ["museum"]),
+]
+
+
+def run(server, strategy, duration, max_pages):
+    session = PlanSession("Benchmark City", 40.7128, -74.0060)
+    cache.clear()
+    rows = []
+    for budget, interests in EDITS:
+        max_places = budget // (10 * duration)  # Same budget rule as run_plan
+        # Same candidates for every strategy: the place pages are always fetched beforehand (not counted)
+        places = collect_places(iter_places(session.location, session.radius, interests, max_pages), max_places)
+        if strategy == "rebuild, cold cache":
+            cache.clear()
+            places = collect_places(iter_places(session.location, session.radius, interests, max_pages), max_places)
+
+        before, elements = REQUEST_COUNTS["distancematrix"], server.elements_served
+        start = time.perf_counter()
+        graph = session.graph(places) if strategy == "session" else create_compact_graph(places)
+        rows.append((graph.number_of_nodes(), REQUEST_COUNTS["distancematrix"] - before,
+                     server.elements_served - elements, time.perf_counter() - start))
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--duration", type=int, default=3)
+    parser.add_argument("--city-size", type=int, default=120, help="Places per nearby search on the stub")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds of delay the stub adds to every response")
+    args = parser.parse_args()
+
+    with MockMapsServer(latency=args.latency, city_size=args.city_size) as server:
+        utils.MAPS_API_URL = server.url
+        api_test.PAGE_TOKEN_DELAY = 0
+        max_pages = math.ceil(args.city_size / 20)
+
+        for strategy in ("rebuild, cold cache", "rebuild, warm cache", "session"):
+            with contextlib.redirect_stdout(io.StringIO()):
+                rows = run(server, strategy, args.duration, max_pages)
+            print(f"\n{strategy}")
+            print(f"{'budget':>6} | {'interests':<20} | {'places':>6} | {'requests':>8} | {'elements':>8} | {'ms':>8}")
+            for (budget, interests), (places, requests, elements, seconds) in zip(EDITS, rows):
+                print(f"{budget:>6} | {'+'.join(interests):<20} | {places:>6} | {requests:>8} | {elements:>8} | {seconds * 1000:>8.1f}")
+            totals = [sum(row[k] for row in rows) for k in (1, 2, 3)]
+            print(f"{'total':>6} | {'':<20} | {'':>6} | {totals[0]:>8} | {totals[1]:>8} | {totals[2] * 1000:>8.1f}")
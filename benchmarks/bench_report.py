@@ -0,0 +1,85 @@
+# Shared helpers for the benchmarks that save their results as JSON (bench_plan_stages.py, load_plan.py)
+# Every file has the same shape so runs can be compared over time:
+#   {"benchmark", "created", "git_commit", "python", "platform", "config", "results"}
+
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+
+import numpy as np
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def summarize(samples):
+    """
+    Latency summary of a list of durations in seconds (empty list gives zeros).
+
+    Returns:
+        dict: count, mean, p50, p95, p99, min and max, all in seconds.
+    """
+    if not samples:
+        return {"count": 0, "mean": 0.0, "p50": 0.0, "p95": 0.0, "p99": 0.0, "min": 0.0, "max": 0.0}
+    values = np.asarray(samples, dtype=np.float64)
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        "count": int(len(values)),
+        "mean": float(values.mean()),
+        "p50": float(p50),
+        "p95": float(p95),
+        "p99": float(p99),
+        "min": float(values.min()),
+        "max": float(values.max()),
+    }
+
+
+def peak_rss_mb():
+    # Peak resident memory of this process so far (ru_maxrss is KB on Linux, bytes on macOS)
+    try:
+        import resource
+    except ImportError:
+        return None  # Windows
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 1024
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_results(name, config, results, path=None):
+    """
+    Save one benchmark run as JSON.
+
+    Parameters:
+        name (str): Benchmark name (also the start of the default file name).
+        config (dict): Settings of the run (sizes, concurrency, ...).
+        results: Whatever the benchmark measured (JSON-serializable).
+        path (str): Output file; defaults to benchmarks/results/<name>-<timestamp>.json.
+
+    Returns:
+        str: The path written.
+    """
+    created = datetime.datetime.now(datetime.timezone.utc)
+    if path is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"{name}-{created.strftime('%Y%m%d-%H%M%S')}.json")
+    report = {
+        "benchmark": name,
+        "created": created.isoformat(timespec="seconds"),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": config,
+        "results": results,
+    }
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+    return path
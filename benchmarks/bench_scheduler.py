@@ -0,0 +1,84 @@
+# Benchmark: concurrent plans against a rate-limited Maps API, with and without the outbound scheduler
+#   - off: every request goes out as soon as a thread wants to send it, the stub answers 429 past its limit
+#   - on:  scheduler.py holds requests back to the same limit, so they go out at the pace the API accepts
+# Counts the 429s the stub served, wall time, and plans that finished vs. failed (a plan with a missing
+# distance now fails instead of silently leaving the edge out). Stub API, no quota used.
+# Usage: python benchmarks/bench_scheduler.py [--plans 8] [--concurrency 8] [--rate-limit 20] [--city-size 60]
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ["GEO_CACHE_PATH"] = ""     # Memory-only cache so runs don't touch (or get answered by) the real cache file
+os.environ["SCHEDULER_DB_PATH"] = ""  # Buckets in this process only, so runs don't share state with the app
+
+import api_client
+import api_test
+import utils
+from bench_report import write_results
+from distance_matrix import MAX_ELEMENTS
+from geo_cache import cache
+from mock_maps_server import MockMapsServer
+from planner import PlanError, run_plan
+from scheduler import Scheduler
+from utils import REQUEST_COUNTS
+
+
+def run(server, mode, args):
+    cache.clear()
+    server.reset_count()
+    before = REQUEST_COUNTS.copy()
+    # Same limit as the stub: requests per second, and a full tile of elements per request for the Distance Matrix
+    limits = {"places": args.rate_limit, "geocode": args.rate_limit, "distancematrix": args.rate_limit * MAX_ELEMENTS}
+    api_client.scheduler = Scheduler(None, limits if mode == "on" else {})
+
+    def plan(i):
+        try:
+            run_plan(f"{mode.title()} City {i}", args.budget, args.duration, ["museum"])
+            return True
+        except PlanError:
+            return False
+
+    start = time.perf_counter()
+    # The per-request error lines would drown the table
+    with contextlib.redirect_stdout(io.StringIO()), ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        outcomes = list(pool.map(plan, range(args.plans)))
+    seconds = time.perf_counter() - start
+    return {
+        "seconds": seconds,
+        "plans_done": sum(outcomes),
+        "plans_failed": len(outcomes) - sum(outcomes),
+        "rate_limited": server.rate_limited,
+        "requests": sum((REQUEST_COUNTS - before).values()),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--plans", type=int, default=8)
+    parser.add_argument("--concurrency", type=int, default=8, help="Plans running at the same time")
+    parser.add_argument("--rate-limit", type=float, default=20, help="Requests per second per API the stub accepts")
+    parser.add_argument("--budget", type=int, default=2000)
+    parser.add_argument("--duration", type=int, default=3)
+    parser.add_argument("--city-size", type=int, default=60, help="Places per nearby search on the stub")
+    parser.add_argument("--output", default=None, help="JSON file to write (default: benchmarks/results/...)")
+    args = parser.parse_args()
+
+    api_test.PAGE_TOKEN_DELAY = 0
+    results = {}
+    with MockMapsServer(city_size=args.city_size, rate_limit=args.rate_limit) as server:
+        utils.MAPS_API_URL = server.url
+        print(f"{'scheduler':<9} | {'time':>7} | {'plans ok':>8} | {'failed':>6} | {'429s':>5} | {'requests':>8}")
+        for mode in ("off", "on"):
+            result = results[mode] = run(server, mode, args)
+            print(f"{mode:<9} | {result['seconds']:6.2f}s | {result['plans_done']:>8} | {result['plans_failed']:>6} | "
+                  f"{result['rate_limited']:>5} | {result['requests']:>8}")
+
+    path = write_results("scheduler", vars(args), results, args.output)
+    print(f"Results saved to {path}")
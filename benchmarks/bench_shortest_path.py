@@ -0,0 +1,87 @@
+# Benchmark: one shortest-path query with dijkstra_path vs. astar_path vs. bidirectional_dijkstra_path
+#   knn:      k-nearest-neighbour graph of random places
+#   complete: complete graph like the default create_graph makes (only up to --max-complete places)
+# Edge weights are great-circle distances times a random detour factor (1.0 - 1.5), like road distances,
+# so the direct edge isn't always the shortest path (and no edge is shorter than the great-circle distance, which A*
+# needs). Reports nodes settled, edges relaxed and latency per query, and checks that all three find paths of the same length.
+# Usage: python benchmarks/bench_shortest_path.py [--sizes 50 200 1000 5000 10000] [--queries 50] [--max-complete 2000]
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ["GEO_CACHE_PATH"] = ""  # Memory-only cache so runs don't touch (or get answered by) the real cache file
+
+import numpy as np
+
+from bench_report import summarize, write_results
+from bench_sparse_graph import random_places
+from compact_graph import CompactGraph, NodeTable
+from dijkstra_algorithm import astar_path, bidirectional_dijkstra_path, dijkstra_path
+from distance_providers import HaversineProvider, haversine_pairs, to_coords
+from graph_builder import edge_arrays
+
+ALGORITHMS = (("dijkstra", dijkstra_path), ("astar", astar_path), ("bidirectional", bidirectional_dijkstra_path))
+
+
+def road_like_graph(n, k=None, seed=0):
+    places = random_places(n, seed=seed)
+    rows, cols, _ = edge_arrays(places, HaversineProvider(), k=k)
+    detour = np.random.default_rng(seed).uniform(1.0, 1.5, len(rows))
+    weights = haversine_pairs(to_coords(places), rows, cols) * detour
+    return CompactGraph.from_edges(NodeTable.from_places(places), rows, cols, weights)
+
+
+def run(graph, queries):
+    results = {}
+    lengths = {}
+    for name, fn in ALGORITHMS:
+        settled, relaxed, seconds = [], [], []
+        lengths[name] = []
+        for start_node, end_node in queries:
+            stats = {}
+            path = []
+            start = time.perf_counter()
+            length = fn(graph, path, start_node, end_node, stats)
+            seconds.append(time.perf_counter() - start)
+            settled.append(stats["settled"])
+            relaxed.append(stats["relaxed"])
+            lengths[name].append(length)
+        results[name] = {"settled": float(np.mean(settled)), "relaxed": float(np.mean(relaxed)), "latency": summarize(seconds)}
+
+    # Every algorithm must find an equally short path (float32 weights, so compare with a tolerance)
+    for name, _ in ALGORITHMS[1:]:
+        if not np.allclose(lengths[name], lengths["dijkstra"], rtol=1e-6):
+            print(f"Warning: {name} found different path lengths than dijkstra")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 200, 1000, 5000, 10000])
+    parser.add_argument("--queries", type=int, default=50, help="Random (start, end) pairs per graph")
+    parser.add_argument("--k", type=int, default=8)
+    parser.add_argument("--max-complete", type=int, default=2000, help="Largest complete graph (n^2 edges)")
+    parser.add_argument("--output", default=None, help="JSON file to write (default: benchmarks/results/...)")
+    args = parser.parse_args()
+
+    results = {}
+    print(f"{'N':>6} | {'graph':<8} | {'algorithm':<13} | {'settled':>8} | {'relaxed':>10} | {'p50 ms':>8} | {'p95 ms':>8}")
+    for n in args.sizes:
+        graphs = [("knn", road_like_graph(n, k=args.k))]
+        if n <= args.max_complete:
+            graphs.append(("complete", road_like_graph(n)))
+        rng = random.Random(n)
+        queries = [(rng.randrange(n), rng.randrange(n)) for _ in range(args.queries)]
+        for label, graph in graphs:
+            case = results[f"{label}-{n}"] = run(graph, queries)
+            for name, result in case.items():
+                print(f"{n:>6} | {label:<8} | {name:<13} | {result['settled']:>8.0f} | {result['relaxed']:>10.0f} | "
+                      f"{result['latency']['p50'] * 1000:>8.2f} | {result['latency']['p95'] * 1000:>8.2f}")
+
+    path = write_results("shortest_path", vars(args), results, args.output)
+    print(f"Results saved to {path}")
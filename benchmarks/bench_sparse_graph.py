@@ -0,0 +1,69 @@
+# Benchmark: complete graph vs. sparse k-nearest-neighbour graph (build time, edge count, peak memory)
+# Every case runs in its own process so the peak RSS numbers don't leak into each other
+# Usage: python benchmarks/bench_sparse_graph.py [--sizes 100 1000 10000] [--k 8] [--max-complete 2000]
+
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+
+def random_places(n, seed=0, center=(40.7128, -74.0060), spread=0.1):
+    rng = random.Random(seed)
+    return [
+        {
+            "name": f"Place {i}",
+            "address": f"{i} Benchmark Ave",
+            "rating": round(rng.uniform(1, 5), 1),
+            "lat": center[0] + rng.uniform(-spread, spread),
+            "lon": center[1] + rng.uniform(-spread, spread),
+        }
+        for i in range(n)
+    ]
+
+
+def run_case(mode, n, k):
+    # Runs inside the child process
+    from distance_providers import HaversineProvider
+    from graph_builder import create_graph
+
+    places = random_places(n)
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    if mode == "complete":
+        G = create_graph(places, HaversineProvider())
+    else:
+        G = create_graph(places, HaversineProvider(), k=k)
+    seconds = time.perf_counter() - start
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {"mode": mode, "n": n, "edges": G.number_of_edges(), "seconds": seconds, "peak_rss_mb": (rss_after - rss_before) / 1024}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--k", type=int, default=8)
+    parser.add_argument("--max-complete", type=int, default=2000, help="Skip the complete graph above this size (it needs n^2 memory)")
+    parser.add_argument("--case", nargs=2, metavar=("MODE", "N"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        print(json.dumps(run_case(args.case[0], int(args.case[1]), args.k)))
+        sys.exit()
+
+    print(f"{'N':>6} | {'mode':<8} | {'edges':>10} | {'seconds':>8} | {'peak RSS MB':>11}")
+    for n in args.sizes:
+        for mode in ("complete", "knn"):
+            if mode == "complete" and n > args.max_complete:
+                print(f"{n:>6} | {mode:<8} | {'skipped (n > --max-complete)':>35}")
+                continue
+            output = subprocess.run([sys.executable, __file__, "--k", str(args.k), "--case", mode, str(n)],
+                                    capture_output=True, text=True, check=True).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"{n:>6} | {mode:<8} | {result['edges']:>10} | {result['seconds']:>8.3f} | {result['peak_rss_mb']:>11.1f}")
@@ -0,0 +1,142 @@
+# Load generator for /plan: many concurrent users planning trips over real HTTP
+# By default it starts the app and a stub Maps server in this process (no API quota used);
+# --url points it at an app that is already running instead.
+# Saves latency percentiles, throughput, errors and peak memory as JSON (see bench_report.py).
+# Usage: python benchmarks/load_plan.py [--requests 50] [--concurrency 8] [--mode sync|async]
+#                                       [--destinations 0] [--latency 0.0] [--url http://127.0.0.1:5000]
+
+import argparse
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ["GEO_CACHE_PATH"] = ""  # Memory-only cache so runs don't touch (or get answered by) the real cache file
+
+import requests
+
+from bench_report import peak_rss_mb, summarize, write_results
+
+POLL_INTERVAL = 0.05  # Seconds between status polls in async mode
+
+
+def start_local_app(latency, city_size):
+    """
+    Start a stub Maps server and the Flask app (threaded, like a real deployment's worker) in this process.
+
+    Returns:
+        tuple: (app URL, stop function)
+    """
+    import logging
+    from werkzeug.serving import make_server
+
+    import api_test
+    import utils
+    from mock_maps_server import MockMapsServer
+
+    maps = MockMapsServer(latency=latency, city_size=city_size).start()
+    utils.MAPS_API_URL = maps.url
+    api_test.PAGE_TOKEN_DELAY = 0
+
+    import app
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)  # No log line per request
+    server = make_server("127.0.0.1", 0, app.app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    def stop():
+        server.shutdown()
+        maps.stop()
+
+    return f"http://127.0.0.1:{server.server_port}", stop
+
+
+def plan_once(session, base_url, form, mode):
+    """
+    One user planning one trip.
+
+    Returns:
+        tuple: (seconds, HTTP status of the final response)
+    """
+    start = time.perf_counter()
+    if mode == "sync":
+        response = session.post(f"{base_url}/plan", data=form)
+        return time.perf_counter() - start, response.status_code
+
+    job = session.post(f"{base_url}/plan/async", data=form)
+    if job.status_code != 202:
+        return time.perf_counter() - start, job.status_code
+    job = job.json()
+    while True:
+        status = session.get(base_url + job["status_url"]).json()
+        if status["status"] in ("done", "failed"):
+            break
+        time.sleep(POLL_INTERVAL)
+    response = session.get(base_url + job["result_url"])
+    return time.perf_counter() - start, response.status_code
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=50, help="Total number of plans")
+    parser.add_argument("--concurrency", type=int, default=8, help="Users planning at the same time")
+    parser.add_argument("--mode", choices=["sync", "async"], default="sync", help="POST /plan, or /plan/async and poll")
+    parser.add_argument("--destinations", type=int, default=0,
+                        help="Number of different destinations to cycle through (0: every request is a new one, no cache hits)")
+    parser.add_argument("--budget", type=int, default=2000)
+    parser.add_argument("--duration", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds of delay the stub adds to every response")
+    parser.add_argument("--city-size", type=int, default=60, help="Places per nearby search on the stub")
+    parser.add_argument("--url", default=None, help="Load an app that is already running instead of starting one")
+    parser.add_argument("--output", default=None, help="JSON file to write (default: benchmarks/results/...)")
+    args = parser.parse_args()
+
+    if args.url:
+        base_url, stop = args.url.rstrip("/"), (lambda: None)
+    else:
+        base_url, stop = start_local_app(args.latency, args.city_size)
+
+    def form(i):
+        destination = f"Load Test City {i % args.destinations if args.destinations else i}"
+        return {"destination": destination, "budget": str(args.budget), "duration": str(args.duration), "interests": ["museum"]}
+
+    sessions = threading.local()
+
+    def user(i):
+        if not hasattr(sessions, "session"):
+            sessions.session = requests.Session()
+        try:
+            return plan_once(sessions.session, base_url, form(i), args.mode)
+        except requests.RequestException as error:
+            return None, type(error).__name__
+
+    print(f"{args.requests} plans, {args.concurrency} at a time, {args.mode} mode, against {base_url}")
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        outcomes = list(pool.map(user, range(args.requests)))
+    elapsed = time.perf_counter() - start
+    stop()
+
+    statuses = Counter(str(status) for _, status in outcomes)
+    latencies = [seconds for seconds, status in outcomes if status == 200]
+    results = {
+        "latency": summarize(latencies),
+        "throughput_rps": len(latencies) / elapsed if elapsed else 0.0,
+        "elapsed": elapsed,
+        "statuses": dict(statuses),
+        "errors": sum(count for status, count in statuses.items() if status != "200"),
+        "peak_rss_mb": None if args.url else peak_rss_mb(),  # Only meaningful when the app runs in this process
+    }
+
+    summary = results["latency"]
+    print(f"p50 {summary['p50']:.3f} s | p95 {summary['p95']:.3f} s | p99 {summary['p99']:.3f} s | "
+          f"{results['throughput_rps']:.2f} plans/s | errors {results['errors']} | statuses {results['statuses']}")
+    if results["peak_rss_mb"] is not None:
+        print(f"Peak memory (app + load generator): {results['peak_rss_mb']:.1f} MB")
+
+    path = write_results("load_plan", vars(args), results, args.output)
+    print(f"Results saved to {path}")
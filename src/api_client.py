@@ -0,0 +1,164 @@
+# One shared HTTP client for every Maps API call (used by api_test.py, utils.py and distance_matrix.py)
+# Keeps connections alive between calls, caps how many requests are in flight and retries on 429/5xx
+# Every attempt first waits for a rate limit token (scheduler.py), and identical requests in flight are sent only once
+# Only attempts the API bills count against the daily quota: throttled (429 / OVER_QUERY_LIMIT) and 5xx ones are refunded
+
+import contextvars
+import logging
+import os
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from fixtures import save_fixture
+from metrics import count, log, span
+from scheduler import QuotaExceeded, request_cost, scheduler
+
+MAX_CONCURRENCY = 8     # Max requests in flight at once across the whole process
+DEFAULT_TIMEOUT = 10    # Seconds per attempt
+MAX_RETRIES = 3         # Extra attempts after the first one
+BACKOFF_SECONDS = 0.5   # Base delay, doubled after every failed attempt
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Google also reports failures inside a 200 response, in the body's "status"
+THROTTLED_STATUS = "OVER_QUERY_LIMIT"  # Same as a 429: slow down and retry
+ERROR_STATUSES = {"REQUEST_DENIED", "UNKNOWN_ERROR", "OVER_DAILY_LIMIT", "MAX_ELEMENTS_EXCEEDED",
+                  "MAX_DIMENSIONS_EXCEEDED", "MAX_ROUTE_LENGTH_EXCEEDED"}  # Raised as MapsApiError
+
+# Folder to record every successful response into, for replaying with mock_maps_server.py (see fixtures.py)
+RECORD_FIXTURES = os.getenv("MAPS_RECORD_FIXTURES") or None
+
+# Number of outbound HTTP requests made to each API since the process started
+REQUEST_COUNTS = Counter()
+
+_session = requests.Session()
+_adapter = HTTPAdapter(pool_connections=4, pool_maxsize=MAX_CONCURRENCY)
+_session.mount("https://", _adapter)
+_session.mount("http://", _adapter)
+
+_slots = threading.BoundedSemaphore(MAX_CONCURRENCY)
+_counts_lock = threading.Lock()
+_inflight = {}  # Request key -> _Call of the request being sent right now
+_inflight_lock = threading.Lock()
+
+
+class MapsApiError(Exception):
+    """
+    A Maps API request that had to succeed failed for good (after every retry), e.g. a tile of the
+    distance matrix. Raised instead of leaving the gap in the results.
+    """
+
+
+class _Call:
+    # One request in flight; identical requests wait for its result instead of sending their own
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def get_json(api, url, params, timeout=DEFAULT_TIMEOUT, retries=MAX_RETRIES):
+    """
+    GET a Maps API endpoint and decode the JSON response.
+
+    Parameters:
+        api (str): Short name of the API for the request counters (e.g. "places", "geocode", "distancematrix").
+        url (str): Endpoint URL.
+        params (dict): Query string parameters.
+        timeout (float): Seconds to wait for each attempt.
+        retries (int): How many times to retry on 429/5xx responses or connection errors.
+
+    Returns:
+        dict: The decoded response, or None if the request still failed after all retries.
+              The body's "status" is then never OVER_QUERY_LIMIT or one of ERROR_STATUSES.
+
+    Raises:
+        QuotaExceeded: If the API's daily quota is used up (see scheduler.py).
+        MapsApiError: If the API answered with one of ERROR_STATUSES.
+    """
+    key = (url, tuple(sorted((name, str(value)) for name, value in params.items())))
+    with _inflight_lock:
+        call = _inflight.get(key)
+        leader = call is None
+        if leader:
+            call = _inflight[key] = _Call()
+
+    if not leader:
+        count("api_coalesced_total", help="Requests answered by an identical request already in flight", api=api)
+        call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    try:
+        with span(f"api.{api}"):  # Whole call including rate limiting, retries and backoff, see metrics.py
+            call.result = _get_json(api, url, params, timeout, retries)
+        return call.result
+    except Exception as error:  # E.g. QuotaExceeded: the requests that waited for this one get it too
+        call.error = error
+        raise
+    finally:
+        with _inflight_lock:
+            del _inflight[key]
+        call.done.set()
+
+
+def _get_json(api, url, params, timeout, retries):
+    cost = request_cost(api, params)
+    for attempt in range(retries + 1):
+        scheduler.acquire(api, cost)  # Raises QuotaExceeded when the day's budget is spent, then waits for a rate limit token
+        with _counts_lock:
+            REQUEST_COUNTS[api] += 1
+        try:
+            with _slots:  # Only hold a slot while the request is actually on the wire
+                response = _session.get(url, params=params, timeout=timeout)
+        except (requests.ConnectionError, requests.Timeout) as error:
+            status, retry_after = type(error).__name__, None
+        else:
+            if response.status_code == 200:
+                body = response.json()
+                body_status = body.get("status")
+                if body_status in ERROR_STATUSES:
+                    count("api_failures_total", help="Maps API calls that still failed after all retries", api=api, status=body_status)
+                    raise MapsApiError(f"{body_status} from {api}: {body.get('error_message', '')}".rstrip(": "))
+                if body_status != THROTTLED_STATUS:
+                    if RECORD_FIXTURES and body_status in ("OK", "ZERO_RESULTS"):
+                        save_fixture(RECORD_FIXTURES, url, params, body)
+                    return body
+                status, retry_after = body_status, None
+            else:
+                status, retry_after = response.status_code, response.headers.get("Retry-After")
+            if status in (429, THROTTLED_STATUS):
+                scheduler.penalize(api)  # Our limit is too high for the server right now, slow every process down
+            if status not in RETRY_STATUSES and status != THROTTLED_STATUS:
+                break
+            scheduler.refund(api, cost)  # Turned away (429 / 5xx / OVER_QUERY_LIMIT), not billed
+
+        if attempt < retries:
+            # Exponential backoff with a bit of jitter so parallel callers don't retry in lockstep
+            delay = float(retry_after) if retry_after and retry_after.isdigit() else BACKOFF_SECONDS * 2 ** attempt
+            time.sleep(delay * random.uniform(0.8, 1.2))
+
+    log("api_failed", level=logging.ERROR, api=api, status=status)
+    count("api_failures_total", help="Maps API calls that still failed after all retries", api=api, status=status)
+    return None
+
+
+def map_concurrent(fn, items, max_workers=MAX_CONCURRENCY):
+    """
+    Run fn over items on a thread pool and return the results in the same order as items.
+
+    The shared semaphore in get_json still caps the total number of requests in flight,
+    so nesting calls to map_concurrent can't flood the API.
+    """
+    items = list(items)
+    if len(items) <= 1:
+        return [fn(item) for item in items]
+    # Every task runs in a copy of the caller's context, so logs from the pool threads keep the request id
+    contexts = [contextvars.copy_context() for _ in items]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as pool:
+        return list(pool.map(lambda context, item: context.run(fn, item), contexts, items))
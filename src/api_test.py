@@ -1,12 +1,17 @@
 # Testing script to check if the API key works
 
 from graph_builder import create_graph, visualize_graph
+from geo_cache import cache, address_key, places_key
+import utils
+from utils import place_from_result
+from api_client import get_json, map_concurrent
+from metrics import log
 
 from dotenv import load_dotenv
+import heapq
+import logging
 import os
-
-import requests
-import json
+import time
 
 # Note: Fix the Pylance issues with this import
 
@@ -15,6 +20,9 @@ load_dotenv()
 API_KEY = os.getenv('API_KEY')
 # Make sure to keep this API keep secret/secure ^^
 
+MAX_PAGES = 3             # The Places API never returns more than 3 pages (60 results) per search
+PAGE_TOKEN_DELAY = 2.0 if utils.MAPS_BACKEND == "google" else 0.0  # Seconds before a next_page_token becomes valid on Google's side
+
 def get_nearby_places(location, radius, place_type):
     """
     Fetch nearby places using Google Places API.
@@ -25,9 +33,9 @@ def get_nearby_places(location, radius, place_type):
         place_type (str): Type of place to search (e.g., "museum", "restaurant").
 
     Returns:
-        list: A list of places with name, address, and rating.
+        list: A list of Place dicts with name, address, rating, lat/lon, place_id, types and price_level.
     """
-    base_url = "https://maps.googleapis.com/maps/api/place/nearbysearch/json"
+    base_url = f"{utils.maps_api_url()}/place/nearbysearch/json"
     params = {
         "location": location,
         "radius": radius,
@@ -37,22 +45,179 @@ def get_nearby_places(location, radius, place_type):
     
     # Note: Do some more research on the other params of the API
 
-    response = requests.get(base_url, params=params)
+    key = places_key(location, radius, place_type)
+    cached = cache.get("places", key)
+    if cached is not None:
+        return cached
 
-    if response.status_code == 200:
-        data = response.json()
+    data = get_json("places", base_url, params)
+
+    # Only a real answer is cached: an error's empty results would hide the city's places for a day
+    if data is not None and data.get("status") in (None, "OK", "ZERO_RESULTS"):
         places = []
         for result in data.get("results", []):
-            places.append({
-                "name": str(result.get("name")),
-                "address": str(result.get("vicinity")),
-                "rating": result.get("rating", 0),
-            })
+            # Keep geometry.location so we don't have to geocode every place again later
+            places.append(place_from_result(result))
+        cache.set("places", key, places)
         return places
     else:
-        print(f"Error: {response.status_code}")
         return None
 
+
+def iter_nearby_pages(location, radius, place_type, max_pages=MAX_PAGES):
+    """
+    Generator over the result pages of one nearby search, following next_page_token.
+
+    A page is only requested when the caller asks for it, so stopping early saves the remaining calls.
+    Pages are cached without their next_page_token (Google's tokens die within minutes): a page that
+    isn't cached after one that was is reached by walking the search again from page 0.
+
+    Parameters:
+        location (str): Latitude and longitude of the location (e.g., "40.7128,-74.0060").
+        radius (int): Search radius in meters.
+        place_type (str): Type of place to search (e.g., "museum", "restaurant").
+        max_pages (int): Stop after this many pages.
+
+    Yields:
+        list: The Place dicts of one page.
+    """
+    key = places_key(location, radius, place_type)
+    token = None  # Token of the next page, only known right after this walk requested the page before it
+
+    for page in range(max_pages):
+        cached = cache.get("places", f"{key}|page{page}")
+        if cached is not None and "more" in cached:
+            places, more = cached["places"], cached["more"]
+            token = None
+        else:
+            if page > 0 and token is None:
+                token = _walk_to_page(location, radius, place_type, page)
+                if token is None:
+                    return
+            fetched = _fetch_page(location, radius, place_type, token)
+            if fetched is None:
+                return
+            places, token = fetched
+            more = token is not None
+            cache.set("places", f"{key}|page{page}", {"places": places, "more": more})
+        yield places
+
+        if not more:
+            return
+
+
+def _fetch_page(location, radius, place_type, token=None):
+    # One page of a nearby search: (places, next_page_token or None), or None if it couldn't be fetched
+    base_url = f"{utils.maps_api_url()}/place/nearbysearch/json"
+    if token:
+        params = {"pagetoken": token, "key": API_KEY}
+        time.sleep(PAGE_TOKEN_DELAY)  # A token is only valid a moment after the page that handed it out
+    else:
+        params = {"location": location, "radius": radius, "type": place_type, "key": API_KEY}
+
+    data = get_json("places", base_url, params)
+    # A brand new token answers INVALID_REQUEST for a moment, give it one more try
+    if data is not None and data.get("status") == "INVALID_REQUEST" and token:
+        time.sleep(PAGE_TOKEN_DELAY)
+        data = get_json("places", base_url, params)
+    if data is None or data.get("status") not in (None, "OK", "ZERO_RESULTS"):
+        # The search ends here with fewer places than it has, say so instead of planning quietly with less
+        log("places_page_failed", level=logging.WARNING, type=place_type, next_page=bool(token),
+            status=data and data.get("status"))
+        return None
+    return [place_from_result(result) for result in data.get("results", [])], data.get("next_page_token")
+
+
+def _walk_to_page(location, radius, place_type, page):
+    # Request pages 0 .. page - 1 again (refreshing their cache entries) for a live token of the given page
+    key = places_key(location, radius, place_type)
+    token = None
+    for earlier in range(page):
+        fetched = _fetch_page(location, radius, place_type, token)
+        if fetched is None:
+            return None
+        places, token = fetched
+        cache.set("places", f"{key}|page{earlier}", {"places": places, "more": token is not None})
+        if token is None:
+            return None  # The search got shorter since those pages were cached
+    return token
+
+
+def iter_places(location, radius, interests, max_pages=MAX_PAGES):
+    """
+    Stream places page by page across all interests (round robin), without duplicates.
+
+    Each round fetches the next page of every interest that still has pages left, all at the same time.
+
+    Parameters:
+        location (str): Latitude and longitude of the location (e.g., "40.7128,-74.0060").
+        radius (int): Search radius in meters.
+        interests (list): Place types to search for (e.g., ["museum", "restaurant"]).
+        max_pages (int): Max pages per interest.
+
+    Yields:
+        dict: One Place at a time.
+    """
+    streams = [iter_nearby_pages(location, radius, interest, max_pages) for interest in dict.fromkeys(interests)]
+    seen = set()
+    try:
+        while streams:
+            pages = map_concurrent(lambda stream: next(stream, None), streams)
+            streams = [stream for stream, page in zip(streams, pages) if page is not None]
+            for page in pages:
+                for place in page or []:
+                    key = _place_key(place)
+                    if key not in seen:
+                        seen.add(key)
+                        yield place
+    finally:
+        for stream in streams:
+            stream.close()
+
+
+def collect_places(stream, max_places, rank_by="rating", oversample=2):
+    """
+    Keep the best max_places from a place stream and stop pulling (and requesting) once we have enough.
+
+    Parameters:
+        stream (iterator): Places, e.g. from iter_places().
+        max_places (int): How many places the budget allows.
+        rank_by (str): Place attribute to keep the best of (None keeps the first max_places).
+        oversample (int): Look at up to max_places * oversample candidates before stopping,
+                          so there's something to choose from when ranking.
+
+    Returns:
+        list: Up to max_places places, best first when ranking.
+    """
+    if max_places <= 0:
+        _close(stream)
+        return []
+    limit = max_places * (oversample if rank_by else 1)
+
+    best = []  # Min-heap of (score, -arrival, place), the worst kept place is always at best[0]
+    for arrival, place in enumerate(stream):
+        score = (place.get(rank_by) or 0) if rank_by else -arrival
+        entry = (score, -arrival, place)
+        if len(best) < max_places:
+            heapq.heappush(best, entry)
+        elif entry[:2] > best[0][:2]:
+            heapq.heapreplace(best, entry)
+        if arrival + 1 >= limit:
+            break
+    _close(stream)  # Closing the generator cancels the pages we didn't need
+
+    return [place for _, _, place in sorted(best, key=lambda entry: entry[:2], reverse=True)]
+
+
+def _close(stream):
+    if hasattr(stream, "close"):
+        stream.close()
+
+
+def _place_key(place):
+    # Same place found by two interests (e.g. museum + tourist_attraction) should only be kept once
+    return place.get("place_id") or (place["name"], place["address"])
+
 def get_lat_lon(address):
     """
     Convert an address into latitude and longitude using the Geocoding API.
@@ -63,24 +228,28 @@ def get_lat_lon(address):
     Returns:
         tuple: (latitude, longitude) as floats.
     """
-    base_url = "https://maps.googleapis.com/maps/api/geocode/json"
+    base_url = f"{utils.maps_api_url()}/geocode/json"
     params = {
         "address": address,
         "key": API_KEY,
     }
 
-    response = requests.get(base_url, params=params)
+    key = address_key(address)
+    cached = cache.get("geocode", key)
+    if cached is not None:
+        return tuple(cached)
+
+    data = get_json("geocode", base_url, params)
 
-    if response.status_code == 200:
-        data = response.json()
-        if data["results"]:
+    if data is not None:
+        if data.get("results"):
             location = data["results"][0]["geometry"]["location"]
+            cache.set("geocode", key, [location["lat"], location["lng"]])
             return location["lat"], location["lng"]
         else:
             print("No results found for the given address.")
             return None, None
     else:
-        print(f"Error: {response.status_code}")
         return None, None
 
 # Example Usage
@@ -1,10 +1,20 @@
-from flask import Flask, render_template, request
-from graph_builder import create_graph, visualize_graph, visualize_graph_interactive
-from dfs_algorithm import dfs_path
-from dijkstra_algorithm import dijkstra_path
-from api_test import get_nearby_places, get_lat_lon
-import networkx as nx
+from flask import Flask, abort, g, jsonify, render_template, request, send_file, stream_with_context, url_for
+from planner import STAGES, VIEWS, PlanError, check_budget, get_plan, render_payload, render_view, run_plan
+from jobs import JobQueue, plan_key
+from plan_api import BulkPlanner, parse_spec, plan_record, read_specs
+from geo_cache import cache
+from utils import REQUEST_COUNTS
+from scheduler import scheduler
+from markupsafe import Markup
+import artifacts
+import assets
+import metrics
+import gzip
+import json
+import mimetypes
 import os
+import time
+import uuid
 
 # Note: Fix the Pylance issues with this import
 # Note: Do some more research with Flask routing for new ideas
@@ -16,173 +26,237 @@ app = Flask(__name__)
 static_dir = os.path.join(app.root_path, "static")
 os.makedirs(static_dir, exist_ok=True)
 
+INTERACTIVE_VIEWS = ("dfs", "dijkstra", "full")
+PAYLOAD_MAX_AGE = 24 * 3600          # Graphs and payloads never change for a plan id, browsers can keep them a day
+PLOTLY_JS_MAX_AGE = 30 * 24 * 3600
+BACKGROUND_IMAGE = "images/1619851207_shutterstock_1725788194.jpg"  # Behind every page (see style.css .backdrop)
+
+# Worker pool for /plan/async
+jobs = JobQueue(run_plan, STAGES, expected_errors=(PlanError,))
+
+# Process pool for /api/plan/bulk (started by the first bulk request)
+bulk = BulkPlanner()
+
+# Instrumentation (see metrics.py): structured logs, request timing, /metrics and sampled profiling
+metrics.configure_logging()
+PROFILE_ALLOW_HEADER = os.getenv("PROFILE_ALLOW_HEADER") == "1"  # Lets an "X-Profile: 1" header force profiling one request
+
+
+@app.before_request
+def start_request():
+    g.request_id = request.headers.get("X-Request-Id") or uuid.uuid4().hex[:16]
+    g.request_token = metrics.request_id.set(g.request_id)
+    g.started = time.perf_counter()
+    force = PROFILE_ALLOW_HEADER and request.headers.get("X-Profile") == "1"
+    g.profile = metrics.maybe_profile(request.endpoint or "unknown", force=force)
+
+
+@app.after_request
+def finish_request(response):
+    seconds = time.perf_counter() - g.started
+    endpoint = request.endpoint or "unknown"
+    metrics.observe("http_request_seconds", seconds, help="Time to answer each request", endpoint=endpoint)
+    metrics.count("http_requests_total", help="Requests answered", endpoint=endpoint, method=request.method, status=response.status_code)
+    metrics.log("request", method=request.method, path=request.path, endpoint=endpoint, status=response.status_code, seconds=round(seconds, 4))
+    response.headers["X-Request-Id"] = g.request_id
+    return response
+
+
+@app.teardown_request
+def end_request(error=None):
+    profile = g.pop("profile", None)
+    if profile is not None:
+        profile.stop()
+    token = g.pop("request_token", None)
+    if token is not None:
+        metrics.request_id.reset(token)
+
+
+def collect_app_metrics():
+    # Values that already live elsewhere, read when /metrics is scraped
+    yield ("outbound_requests_total", "counter", "HTTP requests sent to the Maps API, retries included",
+           [({"api": api}, total) for api, total in REQUEST_COUNTS.items()])
+
+    stats = dict(cache.stats)
+    namespaces = sorted({key.split(".")[0] for key in stats if "." in key})
+    yield ("cache_lookups_total", "counter", "Geo cache lookups by namespace and result",
+           [({"namespace": key.split(".")[0], "result": key.split(".")[1]}, value) for key, value in stats.items() if "." in key])
+    yield ("cache_hit_ratio", "gauge", "Fraction of geo cache lookups answered from memory or disk",
+           [({"namespace": namespace}, cache.hit_ratio(namespace)) for namespace in namespaces])
+    yield ("cache_evictions_total", "counter", "Geo cache entries evicted",
+           [({"tier": "memory"}, stats.get("memory_evictions", 0)), ({"tier": "disk"}, stats.get("disk_evictions", 0))])
+    yield ("graph_artifacts_total", "counter", "Graph files rendered vs. reused from the artifact store",
+           [({"outcome": "rendered"}, artifacts.store.rendered), ({"outcome": "reused"}, artifacts.store.reused)])
+    yield ("plan_jobs_coalesced_total", "counter", "Async plan requests answered by an existing job", [({}, jobs.coalesced)])
+    yield ("maps_quota_used", "gauge", "Maps API tokens used today (requests, or elements for the Distance Matrix)",
+           [({"api": api}, used) for api, used in scheduler.quota_used().items()])
+
+
+metrics.register_collector(collect_app_metrics)
+
+
+# Built assets (see assets.py): hashed and compressed copies after `python src/assets.py build`, the plain files before
+def asset_url(name, fallback=None):
+    return assets.url(name) or fallback or url_for("static", filename=name)
+
+
+def asset_picture(name, **options):
+    return Markup(assets.picture(name, fallback_url=url_for("static", filename=name), **options))
+
+
+app.jinja_env.globals.update(asset_url=asset_url, asset_picture=asset_picture, background_image=BACKGROUND_IMAGE)
+
 # Home route
 @app.route("/")
 def home():
     return render_template("index.html")
 
 
-# Process user input
-@app.route("/plan", methods=["POST"])
-def plan():
+def read_plan_form():
     # Get user input from form
     destination = request.form.get("destination")
     budget = request.form.get("budget")
     duration = request.form.get("duration")
     interests = request.form.getlist("interests")
+    return destination, budget, duration, interests
+
+
+# Process user input
+@app.route("/plan", methods=["POST"])
+def plan():
+    destination, budget, duration, interests = read_plan_form()
+
+    # The pipeline itself lives in planner.py so the background jobs below can run it too
+    try:
+        result = run_plan(destination, budget, duration, interests)
+    except PlanError as error:
+        return render_template("index.html", error=str(error))
+
+    # Render results in a new template
+    return render_template("results.html", **result)
+
+
+# Same plan, but run on the job queue: returns a job id right away, then poll /plan/status/<job_id>
+@app.route("/plan/async", methods=["POST"])
+def plan_async():
+    destination, budget, duration, interests = read_plan_form()
 
     is_valid_budget, min_budget = check_budget(budget, duration)
     if not is_valid_budget:
-        return render_template("index.html", error=f"Error: Budget is too low. Minimum budget is ${min_budget} for {duration} days.")
-    
-    # Geocode the destination
-    lat, lon = get_lat_lon(destination)
-    if lat is None or lon is None:
-        return render_template("index.html", error="Error: Unable to determine location. Please try again.")
-    
-    # Convert to location string
-    location = f"{lat}, {lon}"
-    radius = 5000  # 5 km search radius
-    
-    
-    # For offline inputs
-    """
-    # Mock location for further testing
-    location = "29.647324, -82.346011"  # Latitude and Longitude of UF Reitz Union
-    radius = 5000  # 5 km search radius
-    place_type = interests[0] if interests else "tourist_attraction" # To allow for the input bias
-    """
-
-    if not interests:
-        interests = ["tourist_attraction"]  # Default interest if none are selected
-
-    # Fetch places for each interest using API
-    places = []
-    for interest in interests:
-        places += get_nearby_places(location, radius, interest)
-    
-    # Limit the output within budget (example: $50 per location per day)
-    max_places = int(budget) // (10 * int(duration))
-    places = places[:max_places]
-
-    # Add latitude/longitude to each place (mock data if not available)
-    for place in places:
-        place["lat"], place["lon"] = get_lat_lon(place["address"])
-    
-    # Create graph
-    graph = create_graph(places)
-
-    # Run DFS
-    dfs_result = dfs_path(graph, start_node=0, preference="rating")
-    dfs_edges = [(u, v) for u, v in zip(dfs_result[:-1], dfs_result[1:])]
-
-    dfs_graph_path = os.path.join(static_dir, "dfs_graph.html") # Create html file for DFS graph visualization
-    dijkstra_graph_path = os.path.join(static_dir, "dijkstra_graph.html") # Create html file for Dijkstra's graph visualization
-   
-    
-    # Run Dijkstra's n times for n number of days
-    all_short_paths = {}
-    # Nodes default number just to ensure retrieving shortest path of all possible paths btwn 2 nodes
-    start_node = 0 
-    end_node = len(places) - 1
-    
-    for i in range(int(duration)):
-        shortest_path = []
-        dijkstra_path(graph, shortest_path, start_node, end_node)
-        # Retrieve a new unique shortest path
-        start_node += 1
-        end_node -= 1
-        all_short_paths[i] = shortest_path
-    
-    dijkstra_result = []
-    for path in all_short_paths.keys():
-        print(all_short_paths[path])
-        dijkstra_result += all_short_paths[path]
-
-
-    visualize_graph_interactive(
-        graph,
-        filename=dfs_graph_path,
-        edge_highlight=dfs_edges,
-        node_order=dfs_result,
-        title="DFS Traversal Visualization"
-    )
-
-    # Say your trip is 5 days, then we find the 5 shortest paths so one unique path per day
-    shortest_path_edges = [(u, v) for u, v in zip(dijkstra_result[:-1], dijkstra_result[1:])]
-
-    visualize_graph_interactive(
-        graph,
-        filename=dijkstra_graph_path,
-        edge_highlight=shortest_path_edges,
-        title="Dijkstra's Shortest Path Visualization"
-    )
-
-    print("DFS Result:", dfs_result)
-    print("Dijkstra Result:", dijkstra_result)
-
-    #visualize graph to user
-    visualize_graph(graph)
-    visualize_graph_interactive(graph)
-
-   #split result into days
-    def split_days(result, duration):
-
-        if not result or duration <= 0:
-            return [[] for _ in range(duration)]
-
-        # calculates places to visit per day by dividing length of list of places by amount of days
-        # uses max to ensure that there is at least one destination per day
-        places_per_day = max(1, len(result)//duration)
-
-        # splits the results into days
-        # skips places per day each loop for no repetition
-        # slices result up until places per day
-        days = [result[i:i + places_per_day] for i in range(0, len(result), places_per_day)]
-
-        # If number of days is greater than duration, merge the extra days with the second-to-last day.
-        while len(days) > duration:
-            days[-2].extend(days[-1])   # Merges last day into second to last day
-            days.pop()   # Removes empty last day
-
-        # Adds extra empty days if not enough places
-        while len(days) < duration:
-            days.append([])
-        return days
-
-    dfs_itinerary = split_days(dfs_result, int(duration))
-    dijkstra_itinerary = split_days(dijkstra_result, int(duration))
-
-    # Mock data for demonstration
-    # This section was to use sample testing data
-    """
-    places = [
-        {"name": "Museum A", "address": "123 Main St", "rating": 4.5},
-        {"name": "Park B", "address": "456 Elm St", "rating": 4.2},
-        {"name": "Restaurant C", "address": "789 Oak St", "rating": 4.8},
-    ]
-    graph = create_graph(places)
-
-    # Run DFS and Dijkstra
-    dfs_result = dfs_path(graph, start_node=0, preference="rating")
-    dijkstra_path(graph, shortest_path, start_node=0, end_node=len(places) - 1)
-    dijkstra_result = shortest_path
-    """
+        return jsonify(error=f"Error: Budget is too low. Minimum budget is ${min_budget} for {duration} days."), 400
+
+    job = jobs.submit(plan_key(destination, budget, duration, interests), destination, budget, duration, interests)
+    return jsonify({**job.to_dict(), "status_url": url_for("plan_status", job_id=job.id),
+        "result_url": url_for("plan_result", job_id=job.id)}), 202
+
+
+@app.route("/plan/status/<job_id>")
+def plan_status(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify(error="Unknown job"), 404
+    return jsonify(job.to_dict())
+
+
+@app.route("/plan/result/<job_id>")
+def plan_result(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return render_template("index.html", error="Error: That plan has expired. Please try again."), 404
+    if job.status == "failed":
+        return render_template("index.html", error=job.error)
+    if job.status != "done":
+        return jsonify(job.to_dict()), 202  # Not ready yet, keep polling
+    return render_template("results.html", **job.result)
+
+
+# JSON API: one plan as a compact record (the places once, the itineraries as indices into them)
+@app.route("/api/plan", methods=["POST"])
+def api_plan():
+    try:
+        spec = parse_spec(request.get_json(silent=True))
+        record = plan_record(run_plan(**spec), **spec)
+    except PlanError as error:
+        return jsonify(error=str(error)), 400
+    record["links"] = {view: url_for("plan_graph", plan_id=record["plan_id"], view=view) for view in VIEWS}
+    return jsonify(record)
+
+
+# Many plans at once, planned on the process pool; one NDJSON line per plan, sent as soon as it's done
+@app.route("/api/plan/bulk", methods=["POST"])
+def api_plan_bulk():
+    try:
+        specs = read_specs(request.get_data(as_text=True), request.content_type)
+    except PlanError as error:
+        return jsonify(error=str(error)), 400
+    lines = (json.dumps(record, separators=(",", ":")) + "\n" for record in bulk.run(specs))
+    return app.response_class(stream_with_context(lines), mimetype="application/x-ndjson")
 
-    # Render results in a new template
-    return render_template("results.html", dfs_itinerary=dfs_itinerary, dijkstra_itinerary=dijkstra_itinerary, G=graph, dfs_graph_path="/static/dfs_graph.html",
-        dijkstra_graph_path="/static/dijkstra_graph.html")
 
-def check_budget(budget, duration): #tells user if budget is too low based on destination and duration
-    min_budget = 50 * int(duration) #at least 50 dollars a day (can change later)
-    if int (budget) < min_budget:
-        return False, min_budget
-    return True, min_budget
+@app.route("/metrics")
+def metrics_endpoint():
+    return app.response_class(metrics.render_prometheus(), mimetype="text/plain; version=0.0.4")
 
 
 @app.route("/graph/interactive")
 def graph_interactive():
-    return render_template("graph.html")
+    # ?plan=<id>&view=<dfs|dijkstra|full> draws one view of a stored plan in the browser (see templates/graph.html)
+    plan_id = request.args.get("plan")
+    view = request.args.get("view", "full")
+    if plan_id is not None and (get_plan(plan_id) is None or view not in INTERACTIVE_VIEWS):
+        abort(404)
+    data_url = url_for("plan_graph_data", plan_id=plan_id, view=view) if plan_id else None
+    return render_template("graph.html", data_url=data_url)
+
+
+# Compact graph payload for graph.html (see graph_export.py), stored gzipped and sent as is to browsers that accept it
+@app.route("/graph/<plan_id>/<view>/data")
+def plan_graph_data(plan_id, view):
+    plan = get_plan(plan_id)
+    if plan is None or view not in INTERACTIVE_VIEWS:
+        abort(404)
+    file = render_payload(plan, view)  # Already open, so evicting the file meanwhile can't break the response
+    if "gzip" in request.headers.get("Accept-Encoding", ""):
+        response = send_file(file, mimetype="application/json", max_age=PAYLOAD_MAX_AGE)
+        response.headers["Content-Encoding"] = "gzip"
+    else:
+        with file:
+            response = app.response_class(gzip.decompress(file.read()), mimetype="application/json")
+        response.cache_control.max_age = PAYLOAD_MAX_AGE
+    response.vary.add("Accept-Encoding")
+    return response
+
+
+# plotly.js from the installed plotly package, so graph.html matches its version and the browser downloads it only once
+@app.route("/vendor/plotly.min.js")
+def plotly_js():
+    return send_file(assets.PLOTLY_JS, mimetype="text/javascript", max_age=PLOTLY_JS_MAX_AGE)
+
+
+# Files from the asset build: their names change with their content, so browsers can keep them for a year
+@app.route("/assets/<path:filename>")
+def built_asset(filename):
+    path, encoding = assets.locate(filename, request.headers.get("Accept-Encoding", ""))
+    if path is None:
+        abort(404)
+    response = send_file(path, mimetype=mimetypes.guess_type(filename)[0], max_age=assets.MAX_AGE)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    if encoding:
+        response.headers["Content-Encoding"] = encoding  # Precompressed copy (.br / .gz), nothing compressed per request
+    response.vary.add("Accept-Encoding")
+    return response
+
+
+# Graphs are only rendered when someone opens them (and reused afterwards, see artifacts.py)
+# Sent from here rather than redirected to /static/graphs, where the file could be evicted before the browser asks
+@app.route("/graph/<plan_id>/<view>")
+def plan_graph(plan_id, view):
+    plan = get_plan(plan_id)
+    if plan is None or view not in VIEWS:
+        abort(404)
+    return send_file(render_view(plan, view), mimetype="image/png" if view == "image" else "text/html",
+                     max_age=PAYLOAD_MAX_AGE)
 
 
 if __name__ == "__main__":
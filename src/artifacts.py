@@ -0,0 +1,171 @@
+# Content-addressed storage for the rendered graphs (the Plotly HTML files and the Matplotlib PNG)
+# Every file is named after a hash of the graph plus what is highlighted on it, so:
+#   - concurrent users never overwrite each other's graphs (different plans -> different files)
+#   - the same plan asked for again reuses the files that are already there instead of rendering them again
+# Old files are evicted by age and by total size of the folder
+
+import hashlib
+import os
+import threading
+import time
+import uuid
+
+import numpy as np
+
+from compact_graph import CompactGraph
+
+ARTIFACT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "graphs")
+MAX_BYTES = 200 * 1024 * 1024     # Total size of the folder before the least recently used files go
+MAX_AGE = 7 * 24 * 3600           # Files not used for this long go (seconds)
+
+
+def graph_fingerprint(graph):
+    """
+    Hash of everything the renderers draw: node attributes, edges and weights.
+
+    Parameters:
+        graph (CompactGraph or nx.Graph): The graph (networkx graphs get converted first).
+
+    Returns:
+        str: Hex digest, the same for equal graphs.
+    """
+    graph = graph if isinstance(graph, CompactGraph) else CompactGraph.from_networkx(graph)
+    digest = hashlib.sha256()
+    for array in (graph.indptr, graph.indices, graph.weights, graph.table.rating, graph.table.lat, graph.table.lon):
+        digest.update(np.ascontiguousarray(array).tobytes())
+    for column in (graph.table.name, graph.table.address):
+        digest.update("\x1f".join(map(str, column)).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def artifact_key(fingerprint, kind, highlight=None, order=None, title=None):
+    """
+    Name of one rendered artifact: graph fingerprint + renderer + highlighted path.
+
+    Parameters:
+        fingerprint (str): graph_fingerprint of the graph.
+        kind (str): Renderer ("interactive", "png", ...), so different outputs of the same graph don't clash.
+        highlight (list of tuples): Highlighted edges.
+        order (list): Traversal order shown on the nodes.
+        title (str): Title drawn on the figure.
+    """
+    parts = [fingerprint, kind, repr([tuple(map(int, edge)) for edge in highlight or []]),
+             repr([int(node) for node in order or []]), title or ""]
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()[:32]
+
+
+class ArtifactStore:
+    """
+    Folder of rendered files named by artifact_key, with size/age eviction.
+
+    Parameters:
+        directory (str): Where the files go.
+        max_bytes (int): Size limit of the whole folder.
+        max_age (float): Seconds a file can go unused before it's evicted.
+    """
+
+    def __init__(self, directory=ARTIFACT_DIR, max_bytes=MAX_BYTES, max_age=MAX_AGE):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.rendered = 0   # Files actually rendered
+        self.reused = 0     # Requests answered by an existing file
+        self._lock = threading.Lock()
+        self._rendering = {}  # name -> Lock, so two plans asking for the same file render it once
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key, ext):
+        return os.path.join(self.directory, f"{key}.{ext}")
+
+    def exists(self, key, ext):
+        return os.path.exists(self.path(key, ext))
+
+    def get_or_render(self, key, ext, render):
+        """
+        The artifact, rendering it first if it isn't stored yet.
+
+        The file is opened before evict can get to it, so the caller can still read all of it
+        if another request evicts it right after (a path could already be gone by then).
+
+        Parameters:
+            key (str): artifact_key of the file.
+            ext (str): File extension ("html", "png").
+            render (callable): render(filename) writing the file; only called on a miss.
+
+        Returns:
+            file: The file open for reading in binary mode; the caller closes it.
+        """
+        name = f"{key}.{ext}"
+        with self._lock:
+            lock = self._rendering.setdefault(name, threading.Lock())
+
+        try:
+            with lock:
+                path = self.path(key, ext)
+                try:
+                    file = open(path, "rb")
+                except FileNotFoundError:
+                    file = None
+                if file is not None:
+                    try:
+                        os.utime(path)  # Mark as recently used for the eviction
+                    except FileNotFoundError:
+                        pass  # Evicted since, what's open can still be read
+                    self.reused += 1
+                    return file
+
+                # Render next to the final file, then move it in place so nobody ever sees half a file
+                temp = os.path.join(self.directory, f".{key}.{uuid.uuid4().hex}.{ext}")
+                try:
+                    render(temp)
+                    file = open(temp, "rb")
+                    try:
+                        os.replace(temp, path)
+                    except BaseException:
+                        file.close()
+                        raise
+                finally:
+                    if os.path.exists(temp):
+                        os.remove(temp)
+                self.rendered += 1
+        finally:
+            with self._lock:
+                self._rendering.pop(name, None)
+
+        self.evict()
+        return file
+
+    def evict(self):
+        """
+        Remove files unused for longer than max_age, then the least recently used ones until the folder fits in max_bytes.
+
+        Returns:
+            int: Number of files removed.
+        """
+        now = time.time()
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file():
+                stat = entry.stat()
+                if entry.name.startswith(".") and now - stat.st_mtime <= self.max_age:
+                    continue  # Still being rendered
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        files.sort()  # Least recently used first
+
+        removed = 0
+        total = sum(size for _, size, _ in files)
+        for mtime, size, path in files:
+            if now - mtime <= self.max_age and total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass  # Another worker got there first
+            except OSError:
+                continue  # Still open somewhere (Windows won't remove it), try again next time
+            total -= size
+            removed += 1
+        return removed
+
+
+store = ArtifactStore()
@@ -0,0 +1,279 @@
+# Static asset build: run once before deploying, the app serves whatever it finds in the build folder
+#   - images in static/images get resized AVIF/WebP variants (plus a JPEG fallback) for <picture> / srcset
+#   - CSS and JS are copied under a hash of their content and precompressed with gzip (and brotli if it's installed)
+#   - every built file name has a content hash in it, so /assets/ can tell browsers to cache it forever (immutable)
+# manifest.json maps each source file ("style.css", "images/x.jpg") to what was built for it, and lists every built
+# file with its precompressed encodings (only those files are ever served).
+# Without a build the templates simply fall back to the plain /static files.
+# Usage: python src/assets.py build [--dir data/assets]   |   python src/assets.py list
+
+import argparse
+import gzip
+import hashlib
+import importlib.util
+import io
+import json
+import mimetypes
+import os
+import re
+import shutil
+import tempfile
+from html import escape
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+BUILD_DIR = os.getenv("ASSET_BUILD_DIR") or os.path.join(ROOT, "data", "assets")
+MANIFEST = "manifest.json"
+URL_PREFIX = "/assets/"
+
+# plotly.js from the installed plotly package (found without importing plotly itself, that's slow)
+PLOTLY_JS = os.path.join(os.path.dirname(importlib.util.find_spec("plotly").origin), "package_data", "plotly.min.js")
+
+IMAGE_WIDTHS = (480, 960, 1440, 1920)  # srcset widths; bigger than the original are skipped
+FALLBACK_WIDTH = 1440                    # JPEG for browsers without AVIF/WebP
+QUALITY = {"avif": 50, "webp": 75, "jpeg": 80}
+TEXT_TYPES = (".css", ".js", ".svg", ".json", ".html")
+IMAGE_TYPES = (".jpg", ".jpeg", ".png", ".webp")
+MIN_COMPRESS_SIZE = 512  # Smaller files aren't worth a compressed copy
+MAX_AGE = 365 * 24 * 3600
+
+mimetypes.add_type("image/avif", ".avif")  # Not in every system's mime.types yet
+mimetypes.add_type("image/webp", ".webp")
+
+_manifest = (None, {})  # ((path, mtime), manifest) of the last manifest read
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()[:10]
+
+
+def hashed_name(name, data, suffix=None):
+    """
+    "images/photo.jpg" -> "images/photo.<hash>.jpg" (or "...<hash><suffix>" with a suffix like ".960w.webp").
+    """
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{content_hash(data)}{suffix or ext}"
+
+
+def image_formats():
+    """
+    Modern formats this Pillow can write, best first.
+    """
+    from PIL import features
+    return [fmt for fmt in ("avif", "webp") if features.check(fmt)]
+
+
+def build_image(name, path, out_dir):
+    """
+    Resized AVIF/WebP variants of one image plus a JPEG fallback.
+
+    Returns:
+        dict: {"width", "height", "fallback": file, "sources": {mime type: [[file, width], ...]}} (files relative to out_dir)
+    """
+    from PIL import Image
+
+    with Image.open(path) as source:
+        image = source.convert("RGB")
+    widths = [width for width in IMAGE_WIDTHS if width < image.width] + [min(image.width, IMAGE_WIDTHS[-1])]
+
+    def save(width, fmt):
+        resized = image if width == image.width else image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+        buffer = io.BytesIO()
+        options = {"progressive": True, "optimize": True} if fmt == "jpeg" else {}
+        resized.save(buffer, fmt.upper(), quality=QUALITY[fmt], **options)
+        data = buffer.getvalue()
+        file = hashed_name(name, data, f".{width}w.{'jpg' if fmt == 'jpeg' else fmt}")
+        _write(out_dir, file, data)
+        return file
+
+    entry = {"width": widths[-1], "height": round(image.height * widths[-1] / image.width), "sources": {}}
+    for fmt in image_formats():
+        entry["sources"][f"image/{fmt}"] = [[save(width, fmt), width] for width in widths]
+    entry["fallback"] = save(min(FALLBACK_WIDTH, widths[-1]), "jpeg")
+    return entry
+
+
+def build_text(name, data, out_dir):
+    """
+    Hashed copy of a text asset, plus .gz / .br copies of it.
+
+    Returns:
+        dict: {"file": hashed file, "encodings": ["br", "gzip"] (the compressed copies that were worth keeping)}
+    """
+    file = hashed_name(name, data)
+    _write(out_dir, file, data)
+    encodings = []
+    if len(data) >= MIN_COMPRESS_SIZE:
+        for encoding, compressed in (("br", _brotli(data)), ("gzip", gzip.compress(data, 9, mtime=0))):
+            if compressed is not None and len(compressed) < len(data):
+                _write(out_dir, file + (".br" if encoding == "br" else ".gz"), compressed)
+                encodings.append(encoding)
+    return {"file": file, "encodings": encodings}
+
+
+def build(static_dir=STATIC_DIR, out_dir=None, extra=None):
+    """
+    Build every asset into out_dir (replaced as a whole, so a half-finished build is never served).
+
+    Parameters:
+        static_dir (str): Folder of the source files (src/static).
+        out_dir (str): Build folder the app serves /assets/ from.
+        extra (dict): More text assets to build, name -> source path (default: plotly.js as "vendor/plotly.min.js").
+
+    Returns:
+        dict: The manifest that was written.
+    """
+    out_dir = out_dir or BUILD_DIR
+    extra = {"vendor/plotly.min.js": PLOTLY_JS} if extra is None else extra
+    parent = os.path.dirname(os.path.abspath(out_dir))
+    os.makedirs(parent, exist_ok=True)
+    work = tempfile.mkdtemp(prefix=".assets-", dir=parent)
+    manifest = {"images": {}, "text": {}, "files": {}}
+    try:
+        for name in _source_files(static_dir):
+            if name.lower().endswith(IMAGE_TYPES):
+                manifest["images"][name] = build_image(name, os.path.join(static_dir, name), work)
+
+        # Text last, so url(...) references to images in CSS can point at the built files
+        sources = {name: os.path.join(static_dir, name) for name in _source_files(static_dir) if name.lower().endswith(TEXT_TYPES)}
+        sources.update(extra)
+        for name, path in sorted(sources.items()):
+            with open(path, "rb") as file:
+                data = file.read()
+            if name.endswith(".css"):
+                data = _rewrite_css(data, manifest["images"])
+            manifest["text"][name] = build_text(name, data, work)
+
+        manifest["files"].update((entry["file"], entry["encodings"]) for entry in manifest["text"].values())
+        for entry in manifest["images"].values():
+            for file in [entry["fallback"]] + [file for files in entry["sources"].values() for file, _ in files]:
+                manifest["files"][file] = []
+
+        with open(os.path.join(work, MANIFEST), "w") as file:
+            json.dump(manifest, file, indent=1)
+        if os.path.exists(out_dir):
+            shutil.rmtree(out_dir)
+        os.replace(work, out_dir)
+    except BaseException:
+        shutil.rmtree(work, ignore_errors=True)
+        raise
+    return manifest
+
+
+def load_manifest(out_dir=None):
+    """
+    Manifest of the current build ({} if there is none), re-read only when the file changes.
+    """
+    out_dir = out_dir or BUILD_DIR
+    global _manifest
+    path = os.path.join(out_dir, MANIFEST)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return {}
+    if _manifest[0] != (path, mtime):
+        with open(path) as file:
+            _manifest = ((path, mtime), json.load(file))
+    return _manifest[1]
+
+
+def url(name, out_dir=None):
+    """
+    URL of the built copy of a source file (e.g. "style.css"), or None if it wasn't built.
+    """
+    out_dir = out_dir or BUILD_DIR
+    manifest = load_manifest(out_dir)
+    if name in manifest.get("text", {}):
+        return URL_PREFIX + manifest["text"][name]["file"]
+    if name in manifest.get("images", {}):
+        return URL_PREFIX + manifest["images"][name]["fallback"]
+    return None
+
+
+def picture(name, alt="", sizes="100vw", css_class=None, fallback_url=None, out_dir=None):
+    """
+    <picture> HTML for an image: AVIF/WebP sources with srcset when it was built, a plain <img> otherwise.
+
+    Parameters:
+        name (str): Image path relative to static/ (e.g. "images/photo.jpg").
+        sizes (str): The sizes attribute (how wide the image is shown).
+        fallback_url (str): URL of the original file, used when there's no build.
+    """
+    out_dir = out_dir or BUILD_DIR
+    entry = load_manifest(out_dir).get("images", {}).get(name)
+    class_attr = f' class="{escape(css_class)}"' if css_class else ""
+    if entry is None:
+        return f'<picture{class_attr}><img src="{escape(fallback_url or "")}" alt="{escape(alt)}"></picture>'
+
+    sources = "".join(
+        f'<source type="{mime}" srcset="{", ".join(f"{URL_PREFIX}{file} {width}w" for file, width in files)}" sizes="{escape(sizes)}">'
+        for mime, files in entry["sources"].items()
+    )
+    return (f'<picture{class_attr}>{sources}<img src="{URL_PREFIX}{entry["fallback"]}" alt="{escape(alt)}" '
+            f'width="{entry["width"]}" height="{entry["height"]}" decoding="async"></picture>')
+
+
+def locate(filename, accept_encoding="", out_dir=None):
+    """
+    Find a built file for /assets/<filename>, preferring a precompressed copy the browser accepts.
+
+    Returns:
+        tuple: (path, content encoding or None), or (None, None) for anything not in the manifest.
+    """
+    out_dir = out_dir or BUILD_DIR
+    encodings = load_manifest(out_dir).get("files", {}).get(filename)
+    if encodings is None:
+        return None, None
+    accepted = {part.split(";")[0].strip() for part in accept_encoding.split(",")}
+    for encoding in encodings:  # Best (smallest) first
+        if encoding in accepted:
+            return os.path.join(out_dir, filename + (".br" if encoding == "br" else ".gz")), encoding
+    return os.path.join(out_dir, filename), None
+
+
+def _source_files(static_dir):
+    # Files under static/, relative and with "/" separators; generated graphs aren't assets
+    for folder, dirs, files in os.walk(static_dir):
+        dirs[:] = sorted(d for d in dirs if d != "graphs")
+        for file in sorted(files):
+            yield os.path.relpath(os.path.join(folder, file), static_dir).replace(os.sep, "/")
+
+
+def _rewrite_css(data, images):
+    # url('/static/images/x.jpg') -> the hashed JPEG fallback of that image
+    def replace(match):
+        entry = images.get(match.group(2))
+        return f"url({match.group(1)}{URL_PREFIX}{entry['fallback']}{match.group(1)})" if entry else match.group(0)
+    return re.sub(r"""url\((['"]?)/static/([^'")]+)\1\)""", replace, data.decode("utf-8")).encode("utf-8")
+
+
+def _brotli(data):
+    try:
+        import brotli  # Optional: pip install brotli to also get .br files
+    except ImportError:
+        return None
+    return brotli.compress(data, quality=11)
+
+
+def _write(out_dir, name, data):
+    path = os.path.join(out_dir, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as file:
+        file.write(data)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build hashed, compressed and resized static assets.")
+    parser.add_argument("command", choices=["build", "list"])
+    parser.add_argument("--dir", default=BUILD_DIR, help="Build folder (default: data/assets or ASSET_BUILD_DIR)")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        manifest = build(out_dir=args.dir)
+        print(f"Built {len(manifest['images'])} images and {len(manifest['text'])} text assets into {args.dir}")
+
+    for name, entry in load_manifest(args.dir).get("images", {}).items():
+        variants = sum(len(files) for files in entry["sources"].values())
+        print(f"{name}: {variants} variants ({', '.join(entry['sources'])}) + {entry['fallback']}")
+    for name, entry in load_manifest(args.dir).get("text", {}).items():
+        print(f"{name}: {entry['file']} ({', '.join(entry['encodings']) or 'uncompressed'})")
@@ -0,0 +1,303 @@
+# Precomputed city packs: popular destinations fetched once, offline, instead of on every /plan
+# A pack is a folder of NumPy arrays that /plan memory-maps (nothing is read until it's used):
+#   coords.npy     (n, 2) float64  [lat, lon] of every place
+#   distances.npy  (n, n) float32  road distances in meters (inf if unreachable), same as the live graph
+#   ratings.npy    (n,)   float32
+#   types.npy      (n,)   uint32   bit i set if the place matches interest i of meta.json's "interests"
+#   strings.bin + string_offsets.npy  UTF-8 string table: name, address, place_id of every place
+#   meta.json      destination, center, radius, interests, version
+# Build packs with: python src/city_packs.py build "New York" "Paris" ... (see the bottom of this file)
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+
+import numpy as np
+
+from api_client import map_concurrent
+from api_test import MAX_PAGES, get_lat_lon, iter_nearby_pages, _place_key
+from compact_graph import CompactGraph, NodeTable
+from distance_providers import ApiProvider, HaversineProvider, HybridProvider, to_coords
+from metrics import log, span
+from scheduler import background
+from utils import REQUEST_COUNTS
+
+PACK_VERSION = 1
+PACK_DIR = os.getenv("CITY_PACK_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "packs"))
+INTEREST_TYPES = ["tourist_attraction", "museum", "restaurant", "shopping_mall"]  # The interests on the form
+RADIUS = 5000  # Same search radius as planner.run_plan
+STRING_FIELDS = ("name", "address", "place_id")
+
+_loaded = {}  # folder -> (meta.json mtime, CityPack), so every request shares the same memory maps
+_loaded_lock = threading.Lock()
+
+
+def pack_name(destination):
+    """
+    Folder name of a destination's pack ("  New  York " and "new york" share one pack).
+    """
+    words = " ".join(str(destination).lower().split())
+    return "".join(c if c.isalnum() else "-" for c in words).strip("-") or "unnamed"
+
+
+class CityPack:
+    """
+    One destination's places and distance matrix, memory-mapped from disk.
+
+    Parameters:
+        path (str): The pack's folder.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as file:
+            self.meta = json.load(file)
+        if self.meta.get("version") != PACK_VERSION:
+            raise ValueError(f"{path} is a version {self.meta.get('version')} pack, expected {PACK_VERSION}")
+
+        def load(name):
+            return np.load(os.path.join(path, name), mmap_mode="r")
+
+        self.coords = load("coords.npy")
+        self.distances = load("distances.npy")
+        self.ratings = load("ratings.npy")
+        self.types = load("types.npy")
+        self.string_offsets = load("string_offsets.npy")
+        self.strings = np.memmap(os.path.join(path, "strings.bin"), dtype=np.uint8, mode="r") \
+            if self.string_offsets[-1] > 0 else np.zeros(0, dtype=np.uint8)  # np.memmap can't map an empty file
+        self.interests = self.meta["interests"]
+
+    def __len__(self):
+        return len(self.ratings)
+
+    def covers(self, interests):
+        """
+        True if the pack was built with every one of these interests (otherwise plan it live).
+        """
+        return all(interest in self.interests for interest in interests)
+
+    def select(self, interests, max_places):
+        """
+        Indices of the best rated places matching any of the interests, best first (like collect_places).
+        """
+        bits = np.uint32(sum(1 << self.interests.index(interest) for interest in set(interests)))
+        candidates = np.flatnonzero(self.types & bits)
+        order = np.argsort(-self.ratings[candidates], kind="stable")  # Ties keep the pack's order
+        return candidates[order[:max(0, max_places)]]
+
+    def string(self, place, field):
+        i = len(STRING_FIELDS) * int(place) + STRING_FIELDS.index(field)
+        return bytes(self.strings[self.string_offsets[i]:self.string_offsets[i + 1]]).decode("utf-8")
+
+    def places(self, nodes):
+        """
+        The chosen places as Place dicts (the same shape the Places API client returns).
+        """
+        return [{
+            "name": self.string(node, "name"),
+            "address": self.string(node, "address"),
+            "rating": float(self.ratings[node]),
+            "lat": float(self.coords[node, 0]),
+            "lon": float(self.coords[node, 1]),
+            "place_id": self.string(node, "place_id") or None,
+        } for node in nodes]
+
+    def graph(self, nodes):
+        """
+        CompactGraph of the chosen places, node i being nodes[i]. Only their rows and columns of the
+        distance matrix are read from disk.
+        """
+        nodes = np.asarray(nodes, dtype=np.int64)
+        table = NodeTable(
+            name=[self.string(node, "name") for node in nodes],
+            address=[self.string(node, "address") for node in nodes],
+            rating=self.ratings[nodes],
+            lat=self.coords[nodes, 0],
+            lon=self.coords[nodes, 1],
+        )
+        distances = self.distances[np.ix_(nodes, nodes)]
+        rows, cols = np.triu_indices(len(nodes), k=1)
+        weights = distances[rows, cols]
+        reachable = np.isfinite(weights)  # Same as edge_arrays: unreachable pairs get no edge
+        return CompactGraph.from_edges(table, rows[reachable], cols[reachable], weights[reachable])
+
+
+def load_pack(destination, directory=None):
+    """
+    The pack of a destination, or None if there isn't one (or it can't be read).
+    Packs are opened once and shared; a rebuilt pack is picked up on the next call.
+    """
+    path = os.path.join(directory or PACK_DIR, pack_name(destination))
+    try:
+        mtime = os.stat(os.path.join(path, "meta.json")).st_mtime_ns
+    except OSError:
+        return None
+
+    with _loaded_lock:
+        cached = _loaded.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+    try:
+        with span("pack.load"):
+            pack = CityPack(path)
+    except (OSError, ValueError, KeyError) as error:
+        log("pack_ignored", level=logging.WARNING, path=path, error=str(error))
+        return None
+    with _loaded_lock:
+        _loaded[path] = (mtime, pack)
+    return pack
+
+
+def fetch_places(location, radius, interests, max_pages=MAX_PAGES):
+    """
+    Every place of every interest around a location, each with the bitmask of interests it matches.
+
+    Returns:
+        tuple: (list of places, list of bitmasks)
+    """
+    def search(interest):
+        return [place for page in iter_nearby_pages(location, radius, interest, max_pages) for place in page]
+
+    places, masks, index = [], [], {}
+    for bit, found in enumerate(map_concurrent(search, interests)):
+        for place in found or []:
+            key = _place_key(place)
+            if key not in index:
+                index[key] = len(places)
+                places.append(place)
+                masks.append(0)
+            masks[index[key]] |= 1 << bit
+
+    # A restaurant found by the tourist_attraction search is still a restaurant
+    for i in index.values():
+        types = places[i].get("types") or []
+        masks[i] |= sum(1 << bit for bit, interest in enumerate(interests) if interest in types)
+    return places, masks
+
+
+def build_pack(destination, interests=None, radius=RADIUS, max_pages=MAX_PAGES, provider=None, directory=None):
+    """
+    Fetch a destination's places for all interests, compute their distance matrix and write the pack.
+
+    Parameters:
+        destination (str): Where the trip goes (as typed on the form).
+        interests (list): Place types to include (defaults to every interest on the form).
+        radius (int): Search radius in meters.
+        max_pages (int): Result pages per interest.
+        provider (DistanceProvider): Where distances come from (defaults to the Distance Matrix API, like /plan).
+        directory (str): Folder of the packs (defaults to PACK_DIR).
+
+    Returns:
+        str: Folder of the new pack, or None if the destination couldn't be geocoded or has no places.
+    """
+    interests = list(dict.fromkeys(interests or INTEREST_TYPES))
+    if len(interests) > 32:
+        raise ValueError("A pack holds at most 32 interests")
+    directory = directory or PACK_DIR
+
+    lat, lon = get_lat_lon(destination)
+    if lat is None or lon is None:
+        return None
+
+    places, masks = fetch_places(f"{lat}, {lon}", radius, interests, max_pages)
+    for place in places:
+        if place.get("lat") is None or place.get("lon") is None:
+            place["lat"], place["lon"] = get_lat_lon(place["address"])
+    keep = [i for i, place in enumerate(places) if place["lat"] is not None and place["lon"] is not None]
+    places, masks = [places[i] for i in keep], [masks[i] for i in keep]
+    if not places:
+        return None
+
+    coords = to_coords(places)
+    distances = (provider or ApiProvider()).matrix(coords).astype(np.float32)
+
+    encoded = [str(place.get(field) or "").encode("utf-8") for place in places for field in STRING_FIELDS]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+
+    # Written to a temporary folder and swapped in at the end, so /plan never sees half a pack
+    os.makedirs(directory, exist_ok=True)
+    name = pack_name(destination)
+    temp = os.path.join(directory, f".{name}.{uuid.uuid4().hex}")
+    os.makedirs(temp)
+    np.save(os.path.join(temp, "coords.npy"), coords)
+    np.save(os.path.join(temp, "distances.npy"), distances)
+    np.save(os.path.join(temp, "ratings.npy"), np.array([place.get("rating") or 0 for place in places], dtype=np.float32))
+    np.save(os.path.join(temp, "types.npy"), np.array(masks, dtype=np.uint32))
+    np.save(os.path.join(temp, "string_offsets.npy"), offsets)
+    with open(os.path.join(temp, "strings.bin"), "wb") as file:
+        file.write(b"".join(encoded))
+    with open(os.path.join(temp, "meta.json"), "w", encoding="utf-8") as file:
+        json.dump({"version": PACK_VERSION, "destination": " ".join(destination.split()), "center": [lat, lon], "radius": radius,
+                   "interests": interests, "places": len(places), "created": time.time()}, file, indent=2)
+
+    path = os.path.join(directory, name)
+    old = f"{temp}.old"
+    if os.path.exists(path):
+        os.rename(path, old)  # Requests still holding the old memory maps keep working
+    os.rename(temp, path)
+    shutil.rmtree(old, ignore_errors=True)
+    return path
+
+
+def list_packs(directory=None):
+    """
+    meta.json of every pack in the folder, plus its size on disk.
+    """
+    directory = directory or PACK_DIR
+    packs = []
+    for name in sorted(os.listdir(directory)) if os.path.isdir(directory) else []:
+        path = os.path.join(directory, name)
+        if name.startswith(".") or not os.path.isfile(os.path.join(path, "meta.json")):
+            continue
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as file:
+            meta = json.load(file)
+        meta["bytes"] = sum(entry.stat().st_size for entry in os.scandir(path))
+        packs.append(meta)
+    return packs
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build precomputed city packs for popular destinations.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="Fetch places and distances and write a pack per destination")
+    build.add_argument("destinations", nargs="*", help="Destinations, as users type them")
+    build.add_argument("--file", help="Text file with one destination per line")
+    build.add_argument("--interests", nargs="+", default=INTEREST_TYPES)
+    build.add_argument("--radius", type=int, default=RADIUS)
+    build.add_argument("--max-pages", type=int, default=MAX_PAGES)
+    build.add_argument("--provider", choices=["api", "haversine", "hybrid"], default="api",
+                       help="Road distances from the API (like /plan), great-circle distances, or both")
+    build.add_argument("--dir", default=None, help=f"Pack folder (default {PACK_DIR})")
+
+    listing = commands.add_parser("list", help="Show the packs that exist")
+    listing.add_argument("--dir", default=None)
+    args = parser.parse_args()
+
+    if args.command == "list":
+        for meta in list_packs(args.dir):
+            print(f"{meta['destination']:<30} {meta['places']:>5} places  {meta['bytes'] / 2 ** 20:>7.2f} MB  "
+                  f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(meta['created']))}  {', '.join(meta['interests'])}")
+    else:
+        destinations = list(args.destinations)
+        if args.file:
+            with open(args.file, encoding="utf-8") as file:
+                destinations += [line.strip() for line in file if line.strip() and not line.startswith("#")]
+        provider = {"api": ApiProvider, "haversine": HaversineProvider, "hybrid": HybridProvider}[args.provider]()
+
+        for destination in destinations:
+            start, before = time.perf_counter(), REQUEST_COUNTS.copy()
+            with background():  # Shares the rate limits with the app, but leaves room for people planning right now
+                path = build_pack(destination, args.interests, args.radius, args.max_pages, provider, args.dir)
+            if path is None:
+                print(f"{destination}: not found or no places, skipped")
+                continue
+            pack = CityPack(path)
+            print(f"{destination}: {len(pack)} places -> {path} in {time.perf_counter() - start:.1f} s, "
+                  f"API requests {dict(REQUEST_COUNTS - before)}")
@@ -0,0 +1,192 @@
+# Array-backed graph for the planning hot path (DFS / Dijkstra)
+# A networkx.Graph keeps a dict per node and a dict per edge; here the whole graph is a handful of NumPy arrays:
+#   adjacency in CSR form (indptr / indices / weights) and the node attributes as one column per attribute
+
+import networkx as nx
+import numpy as np
+
+
+class NodeTable:
+    """
+    Node attributes stored as columns (struct of arrays) instead of one dict per node.
+    """
+
+    __slots__ = ("name", "address", "rating", "lat", "lon")
+
+    def __init__(self, name, address, rating, lat, lon):
+        self.name = np.asarray(name, dtype=object)
+        self.address = np.asarray(address, dtype=object)
+        self.rating = np.asarray(rating, dtype=np.float64)
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lon = np.asarray(lon, dtype=np.float64)
+
+    @classmethod
+    def from_places(cls, places):
+        return cls(
+            name=[place["name"] for place in places],
+            address=[place["address"] for place in places],
+            rating=[place.get("rating") or 0 for place in places],
+            lat=[place["lat"] for place in places],
+            lon=[place["lon"] for place in places],
+        )
+
+    def __len__(self):
+        return len(self.name)
+
+    def column(self, attribute, default=0):
+        """
+        Whole attribute column as an array (a column of defaults if the attribute doesn't exist).
+        """
+        if attribute in self.__slots__:
+            return getattr(self, attribute)
+        return np.full(len(self), default)
+
+    def row(self, node):
+        """
+        Attributes of one node as a dict, same shape as networkx's G.nodes[node].
+        """
+        return {
+            "name": self.name[node],
+            "address": self.address[node],
+            "rating": float(self.rating[node]),
+            "lat": float(self.lat[node]),
+            "lon": float(self.lon[node]),
+        }
+
+
+class NodeView:
+    """
+    Read-only stand-in for networkx's G.nodes, so templates can keep using G.nodes[node].get("name").
+    """
+
+    __slots__ = ("_table",)
+
+    def __init__(self, table):
+        self._table = table
+
+    def __getitem__(self, node):
+        return self._table.row(node)
+
+    def __contains__(self, node):
+        return isinstance(node, (int, np.integer)) and 0 <= node < len(self._table)
+
+    def __iter__(self):
+        return iter(range(len(self._table)))
+
+    def __len__(self):
+        return len(self._table)
+
+    def __call__(self):
+        return iter(self)
+
+
+class CompactGraph:
+    """
+    Undirected weighted graph in compressed sparse row (CSR) form.
+
+    The neighbours of node u are indices[indptr[u]:indptr[u + 1]] (sorted ascending)
+    and the matching edge weights are weights[indptr[u]:indptr[u + 1]].
+    Every undirected edge is stored once in each direction.
+    """
+
+    __slots__ = ("indptr", "indices", "weights", "table")
+
+    def __init__(self, indptr, indices, weights, table):
+        self.indptr = indptr
+        self.indices = indices
+        self.weights = weights
+        self.table = table
+
+    @classmethod
+    def from_edges(cls, table, rows, cols, weights):
+        """
+        Build the CSR arrays from an undirected edge list.
+
+        Parameters:
+            table (NodeTable): Node attributes, one row per node.
+            rows, cols (np.ndarray): Edge endpoints (each undirected edge once).
+            weights (np.ndarray): Edge weights.
+        """
+        n = len(table)
+        rows, cols = np.asarray(rows, dtype=np.int32), np.asarray(cols, dtype=np.int32)
+        weights = np.asarray(weights, dtype=np.float32)
+
+        # Both directions, sorted by (source, target) so every neighbour list is ascending
+        sources = np.concatenate([rows, cols])
+        targets = np.concatenate([cols, rows])
+        both = np.concatenate([weights, weights])
+        order = np.lexsort((targets, sources))
+
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=n), out=indptr[1:])
+        return cls(indptr, targets[order], both[order], table)
+
+    @classmethod
+    def from_networkx(cls, G):
+        """
+        Convert a graph made by create_graph (nodes 0..n-1 with name/address/rating/lat/lon attributes).
+        """
+        nodes = [G.nodes[node] for node in range(G.number_of_nodes())]
+        table = NodeTable(
+            name=[node.get("name", "") for node in nodes],
+            address=[node.get("address", "") for node in nodes],
+            rating=[node.get("rating") or 0 for node in nodes],
+            lat=[node.get("lat", np.nan) for node in nodes],
+            lon=[node.get("lon", np.nan) for node in nodes],
+        )
+        edges = np.array([(u, v, w) for u, v, w in G.edges(data="weight", default=1)], dtype=np.float64).reshape(-1, 3)
+        return cls.from_edges(table, edges[:, 0], edges[:, 1], edges[:, 2])
+
+    def to_networkx(self):
+        """
+        Copy into a networkx.Graph, for the visualizations (Matplotlib/Plotly need the real thing).
+        The planning algorithms never need this.
+        """
+        G = nx.Graph()
+        G.add_nodes_from((node, self.table.row(node)) for node in range(len(self.table)))
+        sources = np.repeat(np.arange(len(self.table)), np.diff(self.indptr))
+        upper = sources < self.indices  # Each undirected edge once
+        G.add_weighted_edges_from(zip(sources[upper].tolist(), self.indices[upper].tolist(), self.weights[upper].tolist()))
+        return G
+
+    @property
+    def nodes(self):
+        return NodeView(self.table)
+
+    def number_of_nodes(self):
+        return len(self.table)
+
+    def number_of_edges(self):
+        return len(self.indices) // 2
+
+    def neighbors(self, node):
+        return iter(self.indices[self.indptr[node]:self.indptr[node + 1]].tolist())
+
+    def neighbor_arrays(self, node):
+        """
+        (neighbours, weights) of a node as array slices (views, no copy).
+        """
+        start, stop = self.indptr[node], self.indptr[node + 1]
+        return self.indices[start:stop], self.weights[start:stop]
+
+    def edge_weight(self, u, v):
+        neighbours, weights = self.neighbor_arrays(u)
+        position = np.searchsorted(neighbours, v)
+        if position < len(neighbours) and neighbours[position] == v:
+            return float(weights[position])
+        raise KeyError((u, v))
+
+    def __contains__(self, node):
+        return node in self.nodes
+
+    def __len__(self):
+        return len(self.table)
+
+    @property
+    def nbytes(self):
+        """
+        Approximate memory used by the arrays (the name/address strings themselves not included).
+        """
+        arrays = (self.indptr, self.indices, self.weights, self.table.name, self.table.address,
+                  self.table.rating, self.table.lat, self.table.lon)
+        return sum(array.nbytes for array in arrays)
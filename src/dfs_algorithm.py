@@ -1,38 +1,88 @@
 import networkx as nx
+import numpy as np
+
+from compact_graph import CompactGraph
 
 # Note: Fix the Pylance issues with this import
 
-def dfs_path(graph, start_node, preference=None):
+def dfs_path(graph, start_node, preference=None, max_depth=None, max_nodes=None):
     """
     Perform a Depth-First Search (DFS) to explore paths in the graph.
 
+    Iterative (explicit stack of neighbour generators), so deep graphs don't hit Python's recursion limit.
+
     Parameters:
-        graph (nx.Graph): The graph to search.
+        graph (nx.Graph or CompactGraph): The graph to search.
         start_node (int): The starting node for the search.
         preference (str): Optional attribute to prioritize during traversal (e.g., "rating").
+        max_depth (int): Optional; nodes this many steps from the start are visited but not explored further.
+        max_nodes (int): Optional; stop once this many nodes have been visited.
     
     Returns:
         path (list) : A path traversed by DFS.
     """
-    visited = set() # We <3 sets in coding; Avoid revisiting same node
-    path = [] # Stores order of nodes in DFS traversal
-
-    def dfs(node):
-        if node not in visited:
-            visited.add(node)
-            path.append(node)
-
-            neighbors = list(graph.neighbors(node))
-            if preference:
-                # Sort neighbors based on preference, like descending ratings, if provided
-                neighbors.sort(key=lambda n: graph.nodes[n].get(preference, 0), reverse=True)
-                
-            for neighbor in neighbors:
-                dfs(neighbor)
-
-    dfs(start_node) # Call dfs on start node
+    ordered_neighbors = _neighbor_orderer(graph, preference)
+
+    visited = {start_node} # We <3 sets in coding; Avoid revisiting same node
+    path = [start_node] # Stores order of nodes in DFS traversal
+    stack = [ordered_neighbors(start_node)] # One lazy neighbour generator per node on the current DFS branch
+
+    while stack and (max_nodes is None or len(path) < max_nodes):
+        # Resume the deepest node where it left off: go down into its next unvisited neighbour...
+        for neighbor in stack[-1]:
+            if neighbor not in visited:
+                visited.add(neighbor)
+                path.append(neighbor)
+                if max_depth is None or len(stack) < max_depth:
+                    stack.append(ordered_neighbors(neighbor))
+                break
+        else:
+            stack.pop() # ...or backtrack once it has none left
+
     return path
 
+
+def _neighbor_orderer(graph, preference):
+    """
+    Returns a function node -> iterator over its neighbours, best preference first.
+
+    The preference ranking of every node is computed once up front (ties keep node order);
+    after that each node only orders its own neighbours, lazily where that's cheaper.
+    """
+    if isinstance(graph, CompactGraph):
+        if not preference:
+            return lambda node: iter(graph.neighbor_arrays(node)[0].tolist())
+        scores = graph.table.column(preference)
+        order = np.argsort(-scores, kind="stable")  # Best first, ties keep node order like list.sort does
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+        rank_list = rank.tolist()
+
+        def ordered(node):
+            neighbors, _ = graph.neighbor_arrays(node)
+            if len(neighbors) <= 32:
+                # NumPy call overhead isn't worth it for a handful of neighbours
+                return iter(sorted(neighbors.tolist(), key=rank_list.__getitem__))
+            return iter(neighbors[np.argsort(rank[neighbors], kind="stable")].tolist())
+        return ordered
+
+    if not preference:
+        return lambda node: iter(graph.neighbors(node))
+
+    # Sort neighbors based on preference, like descending ratings, if provided
+    order = sorted(graph.nodes, key=lambda n: graph.nodes[n].get(preference, 0), reverse=True)
+    rank = {node: position for position, node in enumerate(order)}
+    dense_degree = max(1, len(order) // 4)
+
+    def ordered(node):
+        adjacency = set(graph.adj[node])
+        if len(adjacency) >= dense_degree:
+            # Most nodes are neighbours (e.g. the complete graphs from create_graph): walk the global ranking
+            # and stop as soon as the caller has what it needs, instead of sorting every neighbour list
+            return (other for other in order if other in adjacency)
+        return iter(sorted(adjacency, key=rank.__getitem__))
+    return ordered
+
 # Example usage
 if __name__ == "__main__":
     # Create a sample directed graph
@@ -1,16 +1,29 @@
 import networkx as nx
+import numpy as np
 import heapq 
 
+from compact_graph import CompactGraph
+from distance_providers import haversine_matrix
+
 # Note: Fix the Pylance issues with this import
 
-def dijkstra_path(graph, path, start_node, end_node):
+# A* guesses the rest of the way with the great-circle distance, a bit scaled down so float32 rounding of the
+# weights can never end up shorter than the guess (the search would no longer be exact).
+# That only holds when every edge is at least as long as the great-circle distance between its two places,
+# which is true for HaversineProvider weights. Distance Matrix road distances are measured between the points
+# the API snapped to the nearest road, so they can be shorter than that; no fixed scale makes those safe.
+HEURISTIC_SCALE = 0.999
+
+
+def dijkstra_path(graph, path, start_node, end_node, stats=None):
     """
     Perform Dijkstra's algorithm to find the shortest path between two nodes in the graph.
 
     Parameters:
-        graph (nx.Graph): The graph to search.
+        graph (nx.Graph or CompactGraph): The graph to search.
         start_node (int): The starting node.
         end_node (int): The destination node.
+        stats (dict): Optional, gets "settled" (nodes taken off the queue for good) and "relaxed" (edges looked at).
     
     Modifies (mutable object):
         path (list) : The shortest path from start_node to end_node; example it returns [0,2,6,5] for path from node 0 to 5
@@ -24,42 +37,273 @@ def dijkstra_path(graph, path, start_node, end_node):
         print("Start/end node not in graph")
         return None
 
-    pq = [(0, start_node)] # priority queue to store (distance, node)
+    # Fill the distance/predecessor tables from the start node (stops as soon as end node is settled)
+    if isinstance(graph, CompactGraph):
+        distances, predecessor = _compact_search(graph, start_node, end_node, stats=stats)
+    else:
+        distances, predecessor = _search(graph, start_node, end_node, stats=stats)
+
+    return _build_path(path, end_node, distances, predecessor)
+
+
+def astar_path(graph, path, start_node, end_node, stats=None, scale=HEURISTIC_SCALE):
+    """
+    A* search: Dijkstra's, but places closer (as the crow flies) to end_node are tried first.
+
+    The path is the same shortest path dijkstra_path finds (after settling far fewer nodes) only as long as
+    scale * the great-circle distance to end_node never overestimates the distance left. That holds for
+    great-circle weights in meters (HaversineProvider), not for Distance Matrix road distances, which can be
+    shorter between road-snapped points: use dijkstra_path or bidirectional_dijkstra_path for those.
+    Nodes without lat/lon get no guidance.
+
+    Parameters:
+        Same as dijkstra_path.
+        scale (float): Multiplies the great-circle guess (lower is safer but guides less, 0 is plain Dijkstra's).
+
+    Modifies (mutable object):
+        path (list) : The shortest path from start_node to end_node
+
+    Returns (immutable object):
+        total_length (int) : The total length of the shortest path
+    """
+    if start_node not in graph.nodes or end_node not in graph.nodes:
+        print("Start/end node not in graph")
+        return None
+
+    heuristic = _great_circle_to(graph, end_node, scale)
+    if isinstance(graph, CompactGraph):
+        distances, predecessor = _compact_search(graph, start_node, end_node, heuristic, stats)
+    else:
+        distances, predecessor = _search(graph, start_node, end_node, heuristic, stats)
+
+    return _build_path(path, end_node, distances, predecessor)
+
+
+def bidirectional_dijkstra_path(graph, path, start_node, end_node, stats=None):
+    """
+    Dijkstra's from both ends at once, stopping when the two searches meet.
+
+    Each side only has to cover about half the distance, so far fewer nodes get settled than with dijkstra_path.
+    Works on any weights (no coordinates needed).
+
+    Parameters:
+        Same as dijkstra_path.
+
+    Modifies (mutable object):
+        path (list) : The shortest path from start_node to end_node
+
+    Returns (immutable object):
+        total_length (int) : The total length of the shortest path
+    """
+    if start_node not in graph.nodes or end_node not in graph.nodes:
+        print("Start/end node not in graph")
+        return None
+
+    if isinstance(graph, CompactGraph):
+        total_length, meeting, predecessors = _compact_bidirectional_search(graph, start_node, end_node, stats)
+    else:
+        total_length, meeting, predecessors = _bidirectional_search(graph, start_node, end_node, stats)
+
+    if meeting is None:  # Not connected: same result as dijkstra_path
+        path.append(end_node)
+        return total_length
+
+    # Forward half from the start node to the meeting edge, then the backward half on to the end node
+    forward_node, backward_node = meeting
+    forward, backward = [], []
+    while forward_node is not None:
+        forward.append(forward_node)
+        forward_node = predecessors[0][forward_node]
+    while backward_node is not None:
+        backward.append(backward_node)
+        backward_node = predecessors[1][backward_node]
+    path.extend(reversed(forward))
+    path.extend(backward if backward[0] != forward[0] else backward[1:])  # start == end meets in one node
+    return total_length
+
+
+def _build_path(path, end_node, distances, predecessor):
+    # Build path by going backwards from end node to start node
+    current_node = end_node
+    while current_node is not None:
+        path.append(current_node)
+        current_node = predecessor[current_node] 
+
+    path.reverse() # Reverse to get in correct order from start to end
+    return distances[end_node] # Length of the whole path (inf if end node can't be reached)
+
+
+def _great_circle_to(graph, end_node, scale=HEURISTIC_SCALE):
+    # Scaled great-circle distance from every node to end_node (0 for nodes without coordinates)
+    if isinstance(graph, CompactGraph):
+        coords = np.column_stack([graph.table.lat, graph.table.lon])
+        target = coords[end_node]
+    else:
+        nodes = list(graph.nodes)
+        coords = np.array([[graph.nodes[node].get("lat", np.nan), graph.nodes[node].get("lon", np.nan)]
+                           for node in nodes], dtype=np.float64).reshape(-1, 2)
+        target = coords[nodes.index(end_node)]
+    estimate = np.nan_to_num(haversine_matrix(coords, target[None, :])[:, 0] * scale, nan=0.0)
+    return estimate if isinstance(graph, CompactGraph) else dict(zip(nodes, estimate.tolist()))
+
+
+def _count(stats, settled, relaxed):
+    if stats is not None:
+        stats["settled"] = stats.get("settled", 0) + settled
+        stats["relaxed"] = stats.get("relaxed", 0) + relaxed
+
+
+def _search(graph, start_node, target=None, heuristic=None, stats=None):
+    # Dijkstra's on a networkx.Graph, returns the distance and predecessor tables
+    # With a target, only the nodes settled before the target have their final distance
+    # With a heuristic (node -> estimated distance left to the target) it's A*: the queue is ordered by distance + estimate
+    pq = [(0, 0, start_node)] # priority queue to store (priority, distance, node)
 
     # Initialize table with d[v] = infinity (distance); p[v] = None (predecessor)
     distances = {node: float('inf') for node in graph.nodes}
     predecessor = {node: None for node in graph.nodes}
     distances[start_node] = 0 # Initialize source node distance
+    settled = relaxed = 0
 
     # Perform Dijkstra's til pq is empty
     while pq: 
         # Extract next temporary source node
-        min_distance, min_node = heapq.heappop(pq) 
+        _, min_distance, min_node = heapq.heappop(pq) 
         # If current node is bigger than recorded, continue
         if min_distance > distances[min_node]:
             continue
+        settled += 1
+        # Target popped means its shortest path is final, nothing left to improve it
+        if min_node == target:
+            break
 
         # Perform edge relaxation for current node (min node) neighbors
         for neighbor in graph.neighbors(min_node): 
+            relaxed += 1
             new_distance = min_distance + graph[min_node][neighbor]['weight']
             # Found new shorter path
             if new_distance < distances[neighbor]:
                 distances[neighbor] = new_distance
                 predecessor[neighbor] = min_node
-                heapq.heappush(pq, (new_distance, neighbor)) # Add new distance and node pair
-                  
-    # Build path by going backwards from end node to start node
-    total_length = 0
-    current_node = end_node
-    while current_node is not None:
-        path.append(current_node)
-        total_length += distances[current_node] # Add distance to total length
-        current_node = predecessor[current_node] 
+                priority = new_distance if heuristic is None else new_distance + heuristic[neighbor]
+                heapq.heappush(pq, (priority, new_distance, neighbor)) # Add new distance and node pair
 
-    path.reverse() # Reverse to get in correct order from start to end
-    if path[0] != start_node: path = None # Confirm that path is valid since it should start with start node
-    
-    return total_length # Return the total length of that path       
+    _count(stats, settled, relaxed)
+    return distances, predecessor
+
+
+def _compact_search(graph, start_node, target=None, heuristic=None, stats=None):
+    # Dijkstra's on a CompactGraph: same algorithm, but all neighbours of a node are relaxed at once with NumPy
+    # heuristic is an array of estimates per node here (A*, see _search)
+    n = graph.number_of_nodes()
+    distances = np.full(n, np.inf)
+    predecessor = np.full(n, -1, dtype=np.int64)
+    distances[start_node] = 0
+    pq = [(0.0, 0.0, start_node)]
+    settled = relaxed = 0
+
+    while pq:
+        _, min_distance, min_node = heapq.heappop(pq)
+        if min_distance > distances[min_node]:
+            continue
+        settled += 1
+        if min_node == target:
+            break
+
+        neighbors, weights = graph.neighbor_arrays(min_node)
+        relaxed += len(neighbors)
+        new_distances = min_distance + weights.astype(np.float64)
+        shorter = new_distances < distances[neighbors]
+        if shorter.any():
+            improved = neighbors[shorter]
+            distances[improved] = new_distances[shorter]
+            predecessor[improved] = min_node
+            priorities = new_distances[shorter] if heuristic is None else new_distances[shorter] + heuristic[improved]
+            for priority, distance, neighbor in zip(priorities.tolist(), new_distances[shorter].tolist(), improved.tolist()):
+                heapq.heappush(pq, (priority, distance, neighbor))
+
+    _count(stats, settled, relaxed)
+    # Same table shapes as _search (None for "no predecessor")
+    return distances.tolist(), [None if node < 0 else node for node in predecessor.tolist()]
+
+
+def _bidirectional_search(graph, start_node, end_node, stats=None):
+    # Bidirectional Dijkstra's on a networkx.Graph (undirected, so the backward search uses the same edges)
+    # Returns (length, (forward node, backward node) of the best meeting edge or None, (forward, backward) predecessors)
+    distances = ({start_node: 0}, {end_node: 0})
+    predecessor = ({start_node: None}, {end_node: None})
+    done = (set(), set())
+    pq = ([(0, start_node)], [(0, end_node)])
+    best, meeting = (0, (start_node, end_node)) if start_node == end_node else (float('inf'), None)
+    settled = relaxed = 0
+
+    # No path through unsettled nodes can beat best once the two queue fronts add up to it
+    while pq[0] and pq[1] and pq[0][0][0] + pq[1][0][0] < best:
+        side = 0 if pq[0][0][0] <= pq[1][0][0] else 1  # Grow the side that is behind
+        min_distance, min_node = heapq.heappop(pq[side])
+        if min_node in done[side]:
+            continue
+        done[side].add(min_node)
+        settled += 1
+
+        other = distances[1 - side]
+        for neighbor in graph.neighbors(min_node):
+            relaxed += 1
+            new_distance = min_distance + graph[min_node][neighbor]['weight']
+            if new_distance < distances[side].get(neighbor, float('inf')):
+                distances[side][neighbor] = new_distance
+                predecessor[side][neighbor] = min_node
+                heapq.heappush(pq[side], (new_distance, neighbor))
+            # The other side already reached neighbor: a full path over this edge
+            if neighbor in other and new_distance + other[neighbor] < best:
+                best = new_distance + other[neighbor]
+                meeting = (min_node, neighbor) if side == 0 else (neighbor, min_node)
+
+    _count(stats, settled, relaxed)
+    return best, meeting, predecessor
+
+
+def _compact_bidirectional_search(graph, start_node, end_node, stats=None):
+    # Bidirectional Dijkstra's on a CompactGraph, neighbours relaxed with NumPy (same results as _bidirectional_search)
+    n = graph.number_of_nodes()
+    distances = (np.full(n, np.inf), np.full(n, np.inf))
+    predecessor = (np.full(n, -1, dtype=np.int64), np.full(n, -1, dtype=np.int64))
+    done = (np.zeros(n, dtype=bool), np.zeros(n, dtype=bool))
+    distances[0][start_node] = distances[1][end_node] = 0
+    pq = ([(0.0, start_node)], [(0.0, end_node)])
+    best, meeting = (0.0, (start_node, end_node)) if start_node == end_node else (float('inf'), None)
+    settled = relaxed = 0
+
+    while pq[0] and pq[1] and pq[0][0][0] + pq[1][0][0] < best:
+        side = 0 if pq[0][0][0] <= pq[1][0][0] else 1
+        min_distance, min_node = heapq.heappop(pq[side])
+        if done[side][min_node]:
+            continue
+        done[side][min_node] = True
+        settled += 1
+
+        neighbors, weights = graph.neighbor_arrays(min_node)
+        relaxed += len(neighbors)
+        new_distances = min_distance + weights.astype(np.float64)
+        shorter = new_distances < distances[side][neighbors]
+        if shorter.any():
+            improved = neighbors[shorter]
+            distances[side][improved] = new_distances[shorter]
+            predecessor[side][improved] = min_node
+            for distance, neighbor in zip(new_distances[shorter].tolist(), improved.tolist()):
+                heapq.heappush(pq[side], (distance, neighbor))
+
+        through = new_distances + distances[1 - side][neighbors]  # inf where the other side hasn't been yet
+        if len(through):
+            k = int(np.argmin(through))
+            if through[k] < best:
+                best = float(through[k])
+                neighbor = int(neighbors[k])
+                meeting = (min_node, neighbor) if side == 0 else (neighbor, min_node)
+
+    _count(stats, settled, relaxed)
+    # Same table shapes as _bidirectional_search (None for "no predecessor")
+    return best, meeting, tuple([None if node < 0 else node for node in table.tolist()] for table in predecessor)
 
 
 # Sample usage
@@ -0,0 +1,215 @@
+# Builds the full place-to-place distance matrix with as few Distance Matrix API calls as possible
+# (the old way was one HTTP call per pair of places which is n*(n-1)/2 calls)
+
+import math
+
+import numpy as np
+
+import utils
+from api_client import MapsApiError, get_json, map_concurrent, MAX_CONCURRENCY
+from geo_cache import cache, distance_key
+
+# Google's per-request limits for the Distance Matrix API (standard plan)
+MAX_ORIGINS = 25
+MAX_DESTINATIONS = 25
+MAX_ELEMENTS = 100
+
+# Square tiles are best since we only request the upper half of the matrix (10 x 10 = 100 elements)
+TILE_SIZE = min(MAX_ORIGINS, MAX_DESTINATIONS, math.isqrt(MAX_ELEMENTS))
+
+
+def plan_tiles(n, tile_size=TILE_SIZE):
+    """
+    Split an n x n distance matrix into the tiles that need to be requested.
+
+    Only tiles on or above the diagonal are returned, the lower half is mirrored from the upper half.
+
+    Parameters:
+        n (int): Number of places.
+        tile_size (int): Max number of origins/destinations in a single tile.
+
+    Returns:
+        list: A list of (origin_indices, destination_indices) tuples, one per request.
+    """
+    blocks = [range(start, min(start + tile_size, n)) for start in range(0, n, tile_size)]
+    tiles = []
+    for bi, origin_block in enumerate(blocks):
+        for destination_block in blocks[bi:]:
+            tiles.append((origin_block, destination_block))
+    return tiles
+
+
+def fetch_tile(coords, origin_idx, destination_idx, base_url=None):
+    """
+    Request one tile of the distance matrix.
+
+    Parameters:
+        coords (list): All places as "latitude,longitude" strings.
+        origin_idx (range): Indices of the origins in this tile.
+        destination_idx (range): Indices of the destinations in this tile.
+        base_url (str): Root of the Maps API (defaults to utils.maps_api_url()).
+
+    Returns:
+        np.ndarray: A len(origin_idx) x len(destination_idx) array of distances in meters, inf where there is no
+        route (ZERO_RESULTS) and nan where the API couldn't answer for that pair (e.g. NOT_FOUND),
+        or None if the request failed or its status isn't OK.
+    """
+    base_url = base_url or utils.maps_api_url()
+    params = {
+        "origins": "|".join(coords[i] for i in origin_idx),
+        "destinations": "|".join(coords[j] for j in destination_idx),
+        "key": utils.API_KEY,
+    }
+    tile = np.full((len(origin_idx), len(destination_idx)), np.nan)
+
+    data = get_json("distancematrix", f"{base_url}/distancematrix/json", params)
+    if data is None or data.get("status") != "OK":
+        return None  # Counted as a failed tile, never as a tile of unreachable pairs
+
+    for row, row_data in enumerate(data.get("rows", [])):
+        for col, element in enumerate(row_data.get("elements", [])):
+            if element.get("status") == "OK":
+                tile[row, col] = element["distance"]["value"]  # Distance in meters
+            elif element.get("status") == "ZERO_RESULTS":
+                tile[row, col] = np.inf  # Really no route between the two
+    return tile
+
+
+def build_distance_matrix(coords, base_url=None, max_workers=MAX_CONCURRENCY, tile_size=TILE_SIZE):
+    """
+    Build a dense, symmetric distance matrix between every pair of places.
+
+    The matrix is split into tiles that respect the API's per-request limits, only the upper
+    half is requested and the tiles are fetched concurrently.
+
+    Parameters:
+        coords (list): Places as "latitude,longitude" strings.
+        base_url (str): Root of the Maps API (defaults to utils.maps_api_url()).
+        max_workers (int): Max number of requests in flight at once.
+        tile_size (int): Max number of origins/destinations per request.
+
+    Returns:
+        np.ndarray: An n x n array of distances in meters; 0 on the diagonal and inf for unreachable pairs.
+
+    Raises:
+        MapsApiError: If a request failed for good (a missing distance is never passed off as unreachable).
+    """
+    n = len(coords)
+    matrix = np.full((n, n), np.inf)
+    np.fill_diagonal(matrix, 0)
+    if n < 2:
+        return matrix
+
+    # Fill in every pair we already know from the cache
+    rows, cols = np.triu_indices(n, k=1)
+    keys = [distance_key(coords[i], coords[j]) for i, j in zip(rows, cols)]
+    known = cache.get_many("distances", keys)
+    cached = np.zeros((n, n), dtype=bool)
+    for i, j, key in zip(rows, cols, keys):
+        if key in known:
+            matrix[i, j] = known[key]
+            cached[i, j] = True
+
+    # Only request the tiles that still have unknown pairs in their upper half
+    tiles = []
+    for origin_idx, destination_idx in plan_tiles(n, tile_size):
+        block = cached[origin_idx.start:origin_idx.stop, destination_idx.start:destination_idx.stop]
+        needed = np.triu(~block, k=1) if origin_idx == destination_idx else ~block
+        if needed.any():
+            tiles.append((origin_idx, destination_idx))
+    if not tiles:
+        return _mirror(matrix)
+
+    def run(tile):
+        origin_idx, destination_idx = tile
+        return tile, fetch_tile(coords, origin_idx, destination_idx, base_url)
+
+    failed = 0
+    for (origin_idx, destination_idx), values in map_concurrent(run, tiles, max_workers):
+        if values is None:
+            failed += 1  # The tiles that did arrive are still cached below, so a retry only asks for the rest
+            continue
+        block = matrix[origin_idx.start:origin_idx.stop, destination_idx.start:destination_idx.stop]
+        # Diagonal tile: keep the i < j half like the old pairwise loop did
+        keep = np.triu(np.ones(values.shape, dtype=bool), k=1) if origin_idx == destination_idx else np.ones(values.shape, dtype=bool)
+        block[keep] = np.where(np.isnan(values[keep]), np.inf, values[keep])
+        # Pairs without an answer are unreachable for this plan, but aren't cached (the next request may get one)
+        cache.set_many("distances", {
+            distance_key(coords[origin_idx[r]], coords[destination_idx[c]]): float(values[r, c])
+            for r, c in zip(*np.nonzero(keep & ~np.isnan(values)))
+        })
+
+    if failed:
+        # A missing tile used to be left as inf, which silently dropped those edges from the graph
+        raise MapsApiError(f"{failed} of {len(tiles)} distance matrix requests failed")
+    return _mirror(matrix)
+
+
+def build_distance_block(origins, destinations, base_url=None, max_workers=MAX_CONCURRENCY, tile_size=TILE_SIZE):
+    """
+    Distances from some places to some others, e.g. from places just added to a plan to the ones it already has
+    (k x n elements instead of rebuilding the whole matrix).
+
+    Parameters:
+        origins (list): Places as "latitude,longitude" strings (the rows).
+        destinations (list): Places as "latitude,longitude" strings (the columns).
+        base_url (str): Root of the Maps API (defaults to utils.maps_api_url()).
+        max_workers (int): Max number of requests in flight at once.
+        tile_size (int): Max number of origins/destinations per request.
+
+    Returns:
+        np.ndarray: A len(origins) x len(destinations) array of distances in meters (inf for unreachable pairs).
+
+    Raises:
+        MapsApiError: If a request failed for good (a missing distance is never passed off as unreachable).
+    """
+    k, n = len(origins), len(destinations)
+    block = np.full((k, n), np.inf)
+    if k == 0 or n == 0:
+        return block
+
+    # Either direction of a pair counts as known (the full matrix only stores one of them)
+    keys = [[distance_key(origin, destination) for destination in destinations] for origin in origins]
+    flipped = [[distance_key(destination, origin) for destination in destinations] for origin in origins]
+    known = cache.get_many("distances", [key for row in keys + flipped for key in row])
+    cached = np.zeros((k, n), dtype=bool)
+    for i in range(k):
+        for j in range(n):
+            value = known.get(keys[i][j], known.get(flipped[i][j]))
+            if value is not None:
+                block[i, j] = value
+                cached[i, j] = True
+
+    # fetch_tile takes indices into one list, so the destinations go after the origins
+    coords = list(origins) + list(destinations)
+    tiles = [(range(r, min(r + tile_size, k)), range(k + c, k + min(c + tile_size, n)))
+             for r in range(0, k, tile_size) for c in range(0, n, tile_size)
+             if not cached[r:r + tile_size, c:c + tile_size].all()]
+
+    def run(tile):
+        origin_idx, destination_idx = tile
+        return tile, fetch_tile(coords, origin_idx, destination_idx, base_url)
+
+    failed = 0
+    for (origin_idx, destination_idx), values in map_concurrent(run, tiles, max_workers):
+        if values is None:
+            failed += 1
+            continue
+        rows = slice(origin_idx.start, origin_idx.stop)
+        cols = slice(destination_idx.start - k, destination_idx.stop - k)
+        block[rows, cols] = np.where(np.isnan(values), np.inf, values)
+        cache.set_many("distances", {
+            distance_key(coords[origin_idx[r]], coords[destination_idx[c]]): float(values[r, c])
+            for r, c in zip(*np.nonzero(~np.isnan(values)))
+        })
+    if failed:
+        raise MapsApiError(f"{failed} of {len(tiles)} distance matrix requests failed")
+    return block
+
+
+def _mirror(matrix):
+    # Copy the upper half onto the lower half
+    n = len(matrix)
+    lower = np.tril_indices(n, k=-1)
+    matrix[lower] = matrix.T[lower]
+    return matrix
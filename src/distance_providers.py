@@ -0,0 +1,193 @@
+# Different ways of getting the distances between places, so create_graph doesn't always have to call the API
+#   HaversineProvider: straight-line (great-circle) distances, computed locally with NumPy, no API calls at all
+#   ApiProvider:       road distances from the Distance Matrix API (what create_graph always used to do)
+#   HybridProvider:    great-circle everywhere, then asks the API for road distances to each place's k nearest neighbours
+
+import logging
+
+import numpy as np
+
+from api_client import MapsApiError, map_concurrent
+from distance_matrix import MAX_DESTINATIONS, build_distance_block, build_distance_matrix
+from metrics import log
+from utils import get_distances
+
+EARTH_RADIUS_M = 6371008.8
+
+
+def to_coords(places):
+    """
+    Turn a list of places (dicts with lat/lon) into an (n, 2) float array of [lat, lon].
+    """
+    return np.array([[place["lat"], place["lon"]] for place in places], dtype=np.float64).reshape(-1, 2)
+
+
+def haversine_matrix(coords, other=None):
+    """
+    Great-circle distance in meters between every pair of points, vectorized.
+
+    Parameters:
+        coords (np.ndarray): (n, 2) array of [lat, lon] in degrees.
+        other (np.ndarray): Optional (m, 2) array; defaults to coords.
+
+    Returns:
+        np.ndarray: (n, m) array of distances in meters.
+    """
+    a = np.radians(np.asarray(coords, dtype=np.float64))
+    b = a if other is None else np.radians(np.asarray(other, dtype=np.float64))
+    lat1, lon1 = a[:, 0:1], a[:, 1:2]
+    lat2, lon2 = b[:, 0], b[:, 1]
+    h = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(h, 0, 1)))
+
+
+def haversine_pairs(coords, i, j):
+    """
+    Great-circle distance in meters for the point pairs (i[k], j[k]).
+    """
+    a = np.radians(np.asarray(coords, dtype=np.float64))
+    lat1, lon1 = a[i, 0], a[i, 1]
+    lat2, lon2 = a[j, 0], a[j, 1]
+    h = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(h, 0, 1)))
+
+
+class DistanceProvider:
+    """
+    Base class: turns (n, 2) [lat, lon] coordinates into distances in meters.
+    """
+
+    def matrix(self, coords):
+        """
+        Returns:
+            np.ndarray: Dense, symmetric (n, n) matrix; 0 on the diagonal and inf for unreachable pairs.
+        """
+        raise NotImplementedError
+
+    def pairs(self, coords, i, j):
+        """
+        Distances for just the pairs (i[k], j[k]), for graphs that don't need every pair.
+
+        Returns:
+            np.ndarray: One distance per pair (inf for unreachable pairs).
+        """
+        i, j = np.asarray(i), np.asarray(j)
+        return self.matrix(coords)[i, j]
+
+    def block(self, coords, other):
+        """
+        Distances from every point of coords to every point of other, e.g. from places just added
+        to a plan to the ones it already has.
+
+        Returns:
+            np.ndarray: (n, m) array of distances (inf for unreachable pairs).
+        """
+        n, m = len(coords), len(other)
+        combined = np.concatenate([np.asarray(coords, dtype=np.float64).reshape(-1, 2), np.asarray(other, dtype=np.float64).reshape(-1, 2)])
+        i, j = np.repeat(np.arange(n), m), np.tile(np.arange(n, n + m), n)
+        return self.pairs(combined, i, j).reshape(n, m)
+
+
+class HaversineProvider(DistanceProvider):
+    """
+    Great-circle distances, no API calls.
+
+    Parameters:
+        road_factor (float): Multiply every distance by this to roughly account for roads not being straight.
+                             Keep it at 1.0 if the distances are used as a lower bound (e.g. for pruning).
+    """
+
+    def __init__(self, road_factor=1.0):
+        self.road_factor = road_factor
+
+    def matrix(self, coords):
+        return haversine_matrix(coords) * self.road_factor
+
+    def pairs(self, coords, i, j):
+        return haversine_pairs(coords, np.asarray(i), np.asarray(j)) * self.road_factor
+
+    def block(self, coords, other):
+        return haversine_matrix(coords, other) * self.road_factor
+
+
+class ApiProvider(DistanceProvider):
+    """
+    Road distances from the Distance Matrix API (batched and cached, see distance_matrix.py).
+    """
+
+    def matrix(self, coords):
+        return build_distance_matrix(_coord_strings(coords))
+
+    def block(self, coords, other):
+        return build_distance_block(_coord_strings(coords), _coord_strings(other))
+
+    def pairs(self, coords, i, j):
+        # Group the pairs by origin so each request covers up to MAX_DESTINATIONS destinations of one origin
+        strings = _coord_strings(coords)
+        by_origin = {}
+        for k, (origin, destination) in enumerate(zip(np.asarray(i).tolist(), np.asarray(j).tolist())):
+            by_origin.setdefault(origin, []).append((k, destination))
+
+        batches = []
+        for origin, targets in by_origin.items():
+            for start in range(0, len(targets), MAX_DESTINATIONS):
+                batches.append((origin, targets[start:start + MAX_DESTINATIONS]))
+
+        def run(batch):
+            origin, targets = batch
+            return targets, get_distances(strings[origin], [strings[destination] for _, destination in targets])
+
+        result = np.full(len(np.asarray(i)), np.inf)
+        for targets, distances in map_concurrent(run, batches):  # get_distances raises MapsApiError on a failure
+            for (k, _), distance in zip(targets, distances):
+                result[k] = distance
+        return result
+
+
+class HybridProvider(DistanceProvider):
+    """
+    Great-circle distances for every pair, refined with API road distances for each place's k nearest neighbours.
+
+    That's about n * k API elements instead of n * (n - 1) / 2, and the pairs that matter most
+    for short routes (the close ones) still get real road distances.
+
+    Parameters:
+        k (int): Number of nearest neighbours per place to refine.
+        estimate (DistanceProvider): Provider for the unrefined pairs (defaults to HaversineProvider).
+        refine (DistanceProvider): Provider for the refined pairs (defaults to ApiProvider).
+    """
+
+    def __init__(self, k=5, estimate=None, refine=None):
+        self.k = k
+        self.estimate = estimate or HaversineProvider()
+        self.refine = refine or ApiProvider()
+
+    def matrix(self, coords):
+        matrix = self.estimate.matrix(coords)
+        n = len(matrix)
+        k = min(self.k, n - 1)
+        if k <= 0:
+            return matrix
+
+        # k nearest neighbours of every place (the diagonal is masked so a place is never its own neighbour)
+        masked = matrix + np.diag(np.full(n, np.inf))
+        nearest = np.argpartition(masked, k - 1, axis=1)[:, :k]
+        i = np.repeat(np.arange(n), k)
+        j = nearest.ravel()
+
+        # Each undirected pair only needs refining once
+        pairs = np.unique(np.sort(np.stack([i, j], axis=1), axis=1), axis=0)
+        try:
+            refined = self.refine.pairs(coords, pairs[:, 0], pairs[:, 1])
+        except MapsApiError as error:
+            log("refine_failed", level=logging.WARNING, error=str(error))  # Keep the estimates: every edge is still there, just less exact
+            return matrix
+
+        ok = np.isfinite(refined)  # Keep the estimate where the API couldn't answer
+        matrix[pairs[ok, 0], pairs[ok, 1]] = refined[ok]
+        matrix[pairs[ok, 1], pairs[ok, 0]] = refined[ok]
+        return matrix
+
+
+def _coord_strings(coords):
+    return [f"{lat},{lon}" for lat, lon in np.asarray(coords).tolist()]
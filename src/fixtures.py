@@ -0,0 +1,54 @@
+# Recorded Maps API responses, one JSON file per request
+# api_client.get_json saves every successful response here when MAPS_RECORD_FIXTURES is set,
+# and mock_maps_server.py replays them so a recorded city can be planned again offline
+# Layout: <directory>/<endpoint>/<hash of the query parameters>.json (the API key is never part of the hash)
+
+import hashlib
+import json
+import os
+from urllib.parse import urlparse
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "fixtures")
+IGNORED_PARAMS = {"key"}
+
+
+def endpoint_name(url):
+    """
+    Short name of a Maps endpoint from its URL or path ("/maps/api/place/nearbysearch/json" -> "nearbysearch").
+    """
+    parts = [part for part in urlparse(url).path.split("/") if part]
+    return parts[-2] if len(parts) >= 2 else (parts[-1] if parts else "root")
+
+
+def fixture_path(directory, url, params):
+    """
+    Where the response to one request is stored.
+
+    Parameters:
+        directory (str): Fixture folder.
+        url (str): Endpoint URL (or just its path).
+        params (dict): Query parameters, in any order.
+    """
+    relevant = {key: str(value) for key, value in params.items() if key not in IGNORED_PARAMS}
+    digest = hashlib.sha256(json.dumps(relevant, sort_keys=True).encode("utf-8")).hexdigest()[:24]
+    return os.path.join(directory, endpoint_name(url), f"{digest}.json")
+
+
+def save_fixture(directory, url, params, body):
+    path = fixture_path(directory, url, params)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp = f"{path}.{os.getpid()}.tmp"
+    with open(temp, "w", encoding="utf-8") as file:
+        json.dump(body, file)
+    os.replace(temp, path)  # Never leave half a fixture behind
+
+
+def load_fixture(directory, url, params):
+    """
+    Recorded response of a request, or None if it was never recorded.
+    """
+    try:
+        with open(fixture_path(directory, url, params), encoding="utf-8") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
@@ -0,0 +1,220 @@
+# Shared cache for Maps API results so repeated destinations don't hit the network again
+# Two tiers: an in-process LRU (fast) in front of an SQLite file on disk (survives restarts, shared between workers)
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+
+# How long each kind of result stays valid (seconds)
+DEFAULT_TTLS = {
+    "geocode": 30 * 24 * 3600,    # Addresses basically never move
+    "places": 24 * 3600,          # Ratings and open/closed places change more often
+    "distances": 7 * 24 * 3600,   # Road network changes slowly
+}
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "geo_cache.sqlite")
+
+_MISSING = object()  # Sentinel so that None can be a cached value
+
+
+class _Json(str):
+    # A list or dict in the memory tier, kept as JSON text so every hit decodes a copy of its own
+    # (callers add fields to cached places; that must not change what the next lookup gets)
+    pass
+
+
+class GeoCache:
+    """
+    Two-tier (memory LRU + SQLite) cache with per-namespace TTLs and size-bounded eviction.
+
+    Parameters:
+        path (str): SQLite file for the disk tier; None or "" keeps everything in memory only.
+        max_memory_entries (int): Max entries kept in the in-process LRU.
+        max_disk_entries (int): Max entries kept on disk; least recently used ones are evicted first.
+        ttls (dict): Seconds each namespace stays valid (see DEFAULT_TTLS).
+    """
+
+    def __init__(self, path=DEFAULT_PATH, max_memory_entries=50000, max_disk_entries=200000, ttls=None):
+        self.path = path
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.stats = Counter()  # Keys look like "geocode.memory_hits", "places.misses", ...
+
+        self._memory = OrderedDict()  # (namespace, key) -> (expires_at, value or _Json text)
+        self._lock = threading.RLock()
+        self._db = None
+        self._writes_since_evict = 0
+
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+            self._db.execute("PRAGMA journal_mode=WAL")  # Lets several worker processes read while one writes
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "namespace TEXT, key TEXT, value TEXT, expires_at REAL, last_access REAL, "
+                "PRIMARY KEY (namespace, key))"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS cache_last_access ON cache (last_access)")
+            self._db.commit()
+
+    def get(self, namespace, key, default=None):
+        """
+        Look up a single key.
+
+        Returns:
+            The cached value, or default if it's missing or expired.
+        """
+        value = self.get_many(namespace, [key]).get(key, _MISSING)
+        return default if value is _MISSING else value
+
+    def get_many(self, namespace, keys):
+        """
+        Look up many keys of the same namespace at once (one SQL query per 500 keys instead of one per key).
+
+        Returns:
+            dict: key -> value for every key that was found and not expired (lists and dicts are fresh copies).
+        """
+        now = time.time()
+        found = {}
+        with self._lock:
+            pending = []
+            for key in keys:
+                entry = self._memory.get((namespace, key))
+                if entry is not None and entry[0] > now:
+                    self._memory.move_to_end((namespace, key))
+                    found[key] = json.loads(entry[1]) if isinstance(entry[1], _Json) else entry[1]
+                else:
+                    pending.append(key)
+            self.stats[f"{namespace}.memory_hits"] += len(found)
+
+            if pending and self._db is not None:
+                for start in range(0, len(pending), 500):
+                    chunk = pending[start:start + 500]
+                    marks = ",".join("?" * len(chunk))
+                    rows = self._db.execute(
+                        f"SELECT key, value, expires_at FROM cache WHERE namespace = ? AND key IN ({marks}) AND expires_at > ?",
+                        [namespace, *chunk, now],
+                    ).fetchall()
+                    hit_keys = []
+                    for key, value, expires_at in rows:
+                        found[key] = json.loads(value)
+                        self._remember(namespace, key, expires_at, found[key], value)
+                        hit_keys.append(key)
+                    self.stats[f"{namespace}.disk_hits"] += len(rows)
+                    if hit_keys:
+                        self._db.executemany(
+                            "UPDATE cache SET last_access = ? WHERE namespace = ? AND key = ?",
+                            [(now, namespace, key) for key in hit_keys],
+                        )
+                self._db.commit()
+
+            self.stats[f"{namespace}.misses"] += len(keys) - len(found)
+        return found
+
+    def set(self, namespace, key, value):
+        """
+        Store a single value.
+        """
+        self.set_many(namespace, {key: value})
+
+    def set_many(self, namespace, items):
+        """
+        Store many values of the same namespace at once.
+
+        Parameters:
+            namespace (str): Kind of result ("geocode", "places", "distances", ...); picks the TTL.
+            items (dict): key -> JSON-serializable value.
+        """
+        if not items:
+            return
+        now = time.time()
+        expires_at = now + self.ttls.get(namespace, 24 * 3600)
+        texts = {key: json.dumps(value) for key, value in items.items()}
+        with self._lock:
+            for key, value in items.items():
+                self._remember(namespace, key, expires_at, value, texts[key])
+            if self._db is not None:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                    [(namespace, key, texts[key], expires_at, now) for key in items],
+                )
+                self._db.commit()
+                self._writes_since_evict += len(items)
+                if self._writes_since_evict >= 1000:
+                    self.evict()
+
+    def evict(self):
+        """
+        Drop expired entries from disk and trim it back to max_disk_entries (least recently used first).
+        """
+        if self._db is None:
+            return
+        with self._lock:
+            self._writes_since_evict = 0
+            self._db.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+            count = self._db.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+            if count > self.max_disk_entries:
+                self._db.execute(
+                    "DELETE FROM cache WHERE rowid IN (SELECT rowid FROM cache ORDER BY last_access LIMIT ?)",
+                    (count - self.max_disk_entries,),
+                )
+                self.stats["disk_evictions"] += count - self.max_disk_entries
+            self._db.commit()
+
+    def clear(self):
+        """
+        Remove everything from both tiers and reset the counters.
+        """
+        with self._lock:
+            self._memory.clear()
+            self.stats.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM cache")
+                self._db.commit()
+
+    def hit_ratio(self, namespace):
+        """
+        Fraction of lookups in a namespace that were answered from either tier.
+        """
+        hits = self.stats[f"{namespace}.memory_hits"] + self.stats[f"{namespace}.disk_hits"]
+        total = hits + self.stats[f"{namespace}.misses"]
+        return hits / total if total else 0.0
+
+    def _remember(self, namespace, key, expires_at, value, text):
+        # Numbers and strings can't be changed by callers, anything else is kept as its JSON text
+        self._memory[(namespace, key)] = (expires_at, _Json(text) if isinstance(value, (list, dict)) else value)
+        self._memory.move_to_end((namespace, key))
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)  # Least recently used
+            self.stats["memory_evictions"] += 1
+
+
+# Cache key helpers, these make "New York, NY" and "new york,  ny" the same lookup
+
+def address_key(address):
+    return " ".join(str(address).lower().split())
+
+
+def coord_key(location, precision=5):
+    # ~1 m precision at 5 decimals; accepts "lat,lon" / "lat, lon" strings or (lat, lon) tuples
+    if isinstance(location, str):
+        location = location.split(",")
+    lat, lon = (float(value) for value in location)
+    return f"{lat:.{precision}f},{lon:.{precision}f}"
+
+
+def places_key(location, radius, place_type):
+    # Coarser rounding (~10 m) since nearby searches from almost the same spot give the same results
+    return f"{coord_key(location, precision=4)}|{int(radius)}|{place_type}"
+
+
+def distance_key(origin, destination):
+    return f"{coord_key(origin)}|{coord_key(destination)}"
+
+
+# Shared instance used by api_test, utils and distance_matrix (set GEO_CACHE_PATH="" to keep it in memory only)
+cache = GeoCache(os.getenv("GEO_CACHE_PATH", DEFAULT_PATH))
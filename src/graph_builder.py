@@ -1,21 +1,27 @@
 from dfs_algorithm import dfs_path
-from utils import get_distances
+from distance_providers import ApiProvider, haversine_pairs, to_coords
+from spatial_index import connect_pairs, neighbor_pairs
+from compact_graph import CompactGraph, NodeTable
+from layout import graph_layout
 
 import networkx as nx
-import matplotlib.pyplot as plt
-import plotly.graph_objects as go
-import itertools
+import numpy as np
 
 import os
 
 # Note: Fix the Pylance issues with these imports
 
-def create_graph(places):
+def create_graph(places, provider=None, k=None, radius=None):
     """
     Create a graph from a list of places.
     
     Parameters:
-        places (list): A list of places with attributes (name, address, rating).
+        places (list): A list of places with attributes (name, address, rating, lat, lon).
+        provider (DistanceProvider): Where the edge distances come from (see distance_providers.py).
+                                     Defaults to road distances from the Distance Matrix API.
+        k (int): If given, only connect each place to its k nearest neighbours instead of to every other place.
+        radius (float): If given, only connect places closer than this many meters (can be combined with k).
+                        Sparse graphs are always connected: components get bridged by their closest pair.
         
     Returns:
         nx.Graph: A graph with places as nodes and edges based on distances.
@@ -24,19 +30,11 @@ def create_graph(places):
 
     # Add nodes with attributes
     for idx, place in enumerate(places):
-        G.add_node(idx, name=place["name"], address=place["address"], rating=place["rating"])
-
-    # Calculate distances from the origin to each place
-    destinations = [f"{place['lat']},{place['lon']}" for place in places]
+        G.add_node(idx, name=place["name"], address=place["address"], rating=place["rating"], lat=place["lat"], lon=place["lon"])
 
     # Add edges with distances as weights
-    # Iterate through all unique pairs of places (no duplicate edges) using itertools.combinations
-    for i, j in itertools.combinations(range(len(places)), 2):
-        # Calculate distance between place i and place j
-        distances = get_distances(destinations[i], [destinations[j]])
-        # Don't includes edges that are empty or equal to infinity
-        if distances and distances[0] != float('inf'):
-            G.add_edge(i, j, weight=distances[0])  # Add edge with distance[0] as weight
+    rows, cols, weights = edge_arrays(places, provider, k, radius)
+    G.add_weighted_edges_from(zip(rows.tolist(), cols.tolist(), weights.tolist()))
 
     # Old implementation that creates an unweighted graph (each edge has weight of 1 so it's technically unweighted)
     """
@@ -48,19 +46,81 @@ def create_graph(places):
     
     return G 
 
-def visualize_graph(G, filename="static/graph.png"):
+
+def create_compact_graph(places, provider=None, k=None, radius=None):
+    """
+    Same as create_graph, but returns an array-backed CompactGraph (see compact_graph.py).
+
+    dfs_path and dijkstra_path run on it directly; call .to_networkx() on it only when visualizing.
+
+    Returns:
+        CompactGraph: A graph with places as nodes and edges based on distances.
+    """
+    rows, cols, weights = edge_arrays(places, provider, k, radius)
+    return CompactGraph.from_edges(NodeTable.from_places(places), rows, cols, weights)
+
+
+def edge_arrays(places, provider=None, k=None, radius=None):
+    """
+    Compute the edges of the place graph (see create_graph for the parameters).
+
+    Returns:
+        tuple: (rows, cols, weights) arrays with one entry per reachable undirected edge, rows < cols.
+    """
+    provider = provider or ApiProvider()
+    coords = to_coords(places)
+
+    if k or radius:
+        # Sparse graph: only ask for the distances of nearby pairs (found with a KD-tree)
+        pairs = neighbor_pairs(coords, k=k, radius=radius)
+        rows, cols = pairs[:, 0], pairs[:, 1]
+        weights = provider.pairs(coords, rows, cols)
+    else:
+        # Calculate distances between every pair of places at once
+        distances = provider.matrix(coords)
+        # All unique pairs of places (no duplicate edges), same order as itertools.combinations
+        rows, cols = np.triu_indices(len(places), k=1)
+        weights = distances[rows, cols]
+
+    reachable = np.isfinite(weights)  # Don't includes edges that are unreachable (infinity)
+    rows, cols, weights = rows[reachable], cols[reachable], weights[reachable]
+    if (k or radius) and not reachable.all():
+        # A dropped edge may have been the bridge that kept the sparse graph in one piece
+        rows, cols, weights = _reconnect(coords, rows, cols, weights, provider)
+    return rows, cols, weights
+
+
+def _reconnect(coords, rows, cols, weights, provider):
+    # Bridge the components left after dropping unreachable edges. A new bridge gets its distance from the
+    # provider, or the great-circle estimate if the provider has none (the graph must stay connected).
+    pairs = connect_pairs(coords, np.column_stack([rows, cols]))
+    known = set(zip(rows.tolist(), cols.tolist()))
+    new = np.array([pair for pair in pairs.tolist() if tuple(pair) not in known], dtype=np.int64).reshape(-1, 2)
+    if not len(new):
+        return rows, cols, weights
+    bridge_weights = provider.pairs(coords, new[:, 0], new[:, 1])
+    bridge_weights = np.where(np.isfinite(bridge_weights), bridge_weights, haversine_pairs(coords, new[:, 0], new[:, 1]))
+    return (np.concatenate([rows, new[:, 0]]), np.concatenate([cols, new[:, 1]]),
+            np.concatenate([weights, bridge_weights]))
+
+
+def visualize_graph(G, filename="static/graph.png", pos=None):
     """
     Visualize the graph using Matplotlib.
     
     Parameters:
         G (nx.Graph): The graph to visualize.
+        pos (dict): Node positions from layout.graph_layout (computed here if not given).
     """
 
+    import matplotlib.pyplot as plt  # Imported here so the app starts without loading Matplotlib (only needed for the PNG)
+
     # Create dictionary (labels) where key=Node index, value=Node name
     labels = nx.get_node_attributes(G, 'name')
 
     # Draw the graph
-    pos = nx.spring_layout(G)  # Spring layout where nodes repel eachother more with greater distances
+    if pos is None:
+        pos = graph_layout(G)  # The places' map positions (see layout.py), same picture every time
     nx.draw(G, pos, with_labels=False, node_size=3000, node_color='lightpink', font_size=8)
     nx.draw_networkx_labels(G, pos, labels=labels, font_size=8)
 
@@ -69,7 +129,7 @@ def visualize_graph(G, filename="static/graph.png"):
     plt.close()
 
 
-def visualize_graph_interactive(G, filename="static/interactive_graph.html", edge_highlight=None, node_order=None, title="Interactive Graph"):
+def visualize_graph_interactive(G, filename="static/interactive_graph.html", edge_highlight=None, node_order=None, title="Interactive Graph", pos=None):
     """
     Create an interactive graph visualization and save it as an HTML file.
 
@@ -79,15 +139,23 @@ def visualize_graph_interactive(G, filename="static/interactive_graph.html", edg
         edge_highlight (list of tuples): List of edges to highlight (e.g., DFS or Dijkstra edges).
         node_order (list): The order of nodes for labeling traversal steps.
         title (str): Title of the interactive graph.
+        pos (dict): Node positions from layout.graph_layout (computed here if not given).
     """
-    pos = nx.spring_layout(G)  # spring layout to position nodes in graph
+    import plotly.graph_objects as go  # Imported here so the app starts without loading Plotly
+
+    if pos is None:
+        pos = graph_layout(G)  # The places' map positions (see layout.py), same picture every time
 
     highlighted_edges = []
     default_edges = []
+    # Both directions of every highlighted edge in a set, so checking an edge doesn't scan the whole list
+    highlight_set = set()
+    for u, v in edge_highlight or []:
+        highlight_set.update(((u, v), (v, u)))
 
     # Separates highlighted and default edges
     for edge in G.edges():
-        if edge_highlight and (edge in edge_highlight or (edge[1], edge[0]) in edge_highlight):
+        if edge in highlight_set:
             highlighted_edges.append(edge)
         else:
             default_edges.append(edge)
@@ -130,11 +198,16 @@ def visualize_graph_interactive(G, filename="static/interactive_graph.html", edg
 
     # Create node coordinates and labels
     node_x, node_y = zip(*[pos[node] for node in G.nodes()])   # Gets the x and y positions of each node
+    # Traversal step of every node (first visit), looked up in a dict instead of node_order.index
+    steps = {}
+    for step, node in enumerate(node_order or [], start=1):
+        steps.setdefault(node, step)
+
     node_labels = []
     for node in G.nodes():
         name = G.nodes[node].get("name", f"Node {node}")
-        if node_order and node in node_order:   # Checks if node is part of the traversal
-            order = node_order.index(node) + 1  # Gets the order number of the traversal
+        if node in steps:   # Checks if node is part of the traversal
+            order = steps[node]  # Gets the order number of the traversal
             node_labels.append(f"{name} (Order: {order})")   # Append name and order
         else:  # This is if node is not part of traversal
             node_labels.append(name)
@@ -170,7 +243,6 @@ def visualize_graph_interactive(G, filename="static/interactive_graph.html", edg
 
     # Save the interactive graph as an HTML file
     fig.write_html(filename)
-    print(f"Interactive graph successfully saved at {filename}")
 
 if __name__ == "__main__":
     # Example list of places
@@ -182,9 +254,10 @@ if __name__ == "__main__":
 
     # Create and visualize the graph
     G = create_graph(places)
-    
-    dfs_result = dfs_path(G, start_node=2, preference="address")
-    print("DFS Result:", dfs_result)
+
+    from metrics import configure_logging, log
+    configure_logging()
+    log("dfs_result", path=dfs_path(G, start_node=2, preference="address"))
     
     visualize_graph(G)
 
@@ -0,0 +1,81 @@
+# Compact graph payload for the browser (templates/graph.html draws it with plotly.js)
+# fig.write_html embeds all of plotly.js (several MB) plus every coordinate as JSON text in each file;
+# this payload only has the graph itself, as flat typed arrays (base64) and a bitset of the highlighted edges,
+# and gets gzipped once and stored with the other artifacts (see artifacts.py)
+
+import base64
+import gzip
+import json
+
+import numpy as np
+
+from compact_graph import CompactGraph
+
+PAYLOAD_VERSION = 1
+
+
+def graph_payload(graph, pos, edge_highlight=None, node_order=None, title="Interactive Graph"):
+    """
+    Everything graph.html needs to draw one view of a graph.
+
+    Parameters:
+        graph (CompactGraph or nx.Graph): The graph (networkx graphs get converted first).
+        pos (dict): Node positions (from layout.graph_layout).
+        edge_highlight (list of tuples): Edges to highlight (e.g. DFS or Dijkstra edges).
+        node_order (list): Traversal order shown next to the node names.
+        title (str): Title of the graph.
+
+    Returns:
+        dict: JSON-ready payload. Typed arrays are base64 of little-endian data:
+              x, y (float32 per node), edges (uint32 pairs, each undirected edge once),
+              highlight (bitset over edges, bit i = edge i, least significant bit first),
+              order (int32 per node, 1-based traversal step, 0 if not visited).
+    """
+    graph = graph if isinstance(graph, CompactGraph) else CompactGraph.from_networkx(graph)
+    n = graph.number_of_nodes()
+
+    # Each undirected edge once (the CSR arrays store both directions)
+    sources = np.repeat(np.arange(n), np.diff(graph.indptr))
+    upper = sources < graph.indices
+    u, v = sources[upper], graph.indices[upper].astype(np.int64)
+
+    # Highlighted edges as a set of (min, max) codes: one vectorized membership test instead of a list scan per edge
+    highlighted = np.zeros(len(u), dtype=bool)
+    if edge_highlight:
+        pairs = np.sort(np.asarray(edge_highlight, dtype=np.int64).reshape(-1, 2), axis=1)
+        highlighted = np.isin(u * n + v, pairs[:, 0] * n + pairs[:, 1])
+
+    # First step at which every node is visited (dict lookups instead of node_order.index)
+    order = np.zeros(n, dtype=np.int32)
+    first_step = {}
+    for step, node in enumerate(node_order or [], start=1):
+        first_step.setdefault(int(node), step)
+    if first_step:
+        order[list(first_step)] = list(first_step.values())
+
+    xy = np.array([pos[node] for node in range(n)], dtype=np.float64).reshape(-1, 2)
+    return {
+        "version": PAYLOAD_VERSION,
+        "title": title,
+        "nodes": n,
+        "edges_count": int(len(u)),
+        "names": [str(name) for name in graph.table.name],
+        "x": _encode(xy[:, 0], "<f4"),
+        "y": _encode(xy[:, 1], "<f4"),
+        "edges": _encode(np.column_stack([u, v]).ravel(), "<u4"),
+        "highlight": base64.b64encode(np.packbits(highlighted, bitorder="little").tobytes()).decode("ascii"),
+        "order": _encode(order, "<i4"),
+    }
+
+
+def write_payload(payload, filename):
+    """
+    Save a payload as gzipped JSON (served as is with Content-Encoding: gzip).
+    """
+    data = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    with open(filename, "wb") as file:
+        file.write(gzip.compress(data, compresslevel=6, mtime=0))  # 9 is ~10x slower here for no gain
+
+
+def _encode(array, dtype):
+    return base64.b64encode(np.ascontiguousarray(array, dtype=dtype).tobytes()).decode("ascii")
@@ -0,0 +1,268 @@
+# Turns the place graph into a day-by-day itinerary with short daily routes
+#   1. Split the places into one geographic cluster per day (balanced k-means on their coordinates)
+#   2. Order every day with a nearest-neighbour route, then improve it with 2-opt and Or-opt moves
+# Both steps have fixed iteration caps (plus an optional time budget) so the solve time stays bounded
+
+import time
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+
+from compact_graph import CompactGraph
+
+KMEANS_ITERATIONS = 20
+MAX_PASSES = 50          # Max improvement passes of 2-opt + Or-opt per day
+TIME_BUDGET = 0.5        # Seconds for the whole improvement phase (None for no limit)
+
+
+def split_days(result, duration):
+    """
+    Split a list of places into duration days of (roughly) the same size, keeping their order.
+
+    Parameters:
+        result (list): Places (nodes) in visiting order.
+        duration (int): Number of days.
+
+    Returns:
+        list: duration lists of places.
+    """
+    if not result or duration <= 0:
+        return [[] for _ in range(duration)]
+
+    # calculates places to visit per day by dividing length of list of places by amount of days
+    # uses max to ensure that there is at least one destination per day
+    places_per_day = max(1, len(result)//duration)
+
+    # splits the results into days
+    # skips places per day each loop for no repetition
+    # slices result up until places per day
+    days = [result[i:i + places_per_day] for i in range(0, len(result), places_per_day)]
+
+    # If number of days is greater than duration, merge the extra days with the second-to-last day.
+    while len(days) > duration:
+        days[-2].extend(days[-1])   # Merges last day into second to last day
+        days.pop()   # Removes empty last day
+
+    # Adds extra empty days if not enough places
+    while len(days) < duration:
+        days.append([])
+    return days
+
+
+def travel_matrix(graph):
+    """
+    Shortest travel distance between every pair of nodes (follows edges, so it also works on sparse graphs).
+
+    Parameters:
+        graph (CompactGraph or nx.Graph): Graph from create_compact_graph / create_graph.
+
+    Returns:
+        np.ndarray: (n, n) distances in meters (inf between disconnected nodes).
+    """
+    graph = graph if isinstance(graph, CompactGraph) else CompactGraph.from_networkx(graph)
+    n = graph.number_of_nodes()
+    matrix = csr_matrix((graph.weights, graph.indices, graph.indptr), shape=(n, n))
+    return dijkstra(matrix, directed=False)
+
+
+def route_length(matrix, days):
+    """
+    Total distance travelled when visiting every day's places in order (days start fresh, no travel between days).
+    """
+    return float(sum(matrix[u, v] for day in days for u, v in zip(day[:-1], day[1:])))
+
+
+def plan_itinerary(graph, duration, max_passes=MAX_PASSES, time_budget=TIME_BUDGET, matrix=None):
+    """
+    Build a multi-day itinerary: one geographic cluster of places per day, each visited in a short order.
+
+    Parameters:
+        graph (CompactGraph or nx.Graph): Graph from create_compact_graph / create_graph (nodes need lat/lon).
+        duration (int): Number of days.
+        max_passes (int): Max improvement passes per day (keeps the result deterministic and the latency bounded).
+        time_budget (float): Seconds allowed for the improvement passes of all days together (None for no limit).
+        matrix (np.ndarray): Precomputed travel_matrix(graph), computed here if not given.
+
+    Returns:
+        list: duration lists of nodes in visiting order.
+    """
+    graph = graph if isinstance(graph, CompactGraph) else CompactGraph.from_networkx(graph)
+    n = graph.number_of_nodes()
+    if duration <= 0:
+        return []
+    if n == 0:
+        return [[] for _ in range(duration)]
+
+    matrix = travel_matrix(graph) if matrix is None else matrix
+    # Disconnected pairs get a big finite cost so the arithmetic below stays finite
+    finite = np.isfinite(matrix)
+    cost = np.where(finite, matrix, (matrix[finite].max() if finite.any() else 1.0) * 10)
+
+    coords = np.column_stack([graph.table.lat, graph.table.lon])
+    if np.isfinite(coords).all():
+        clusters = cluster_days(coords, duration)
+    else:
+        # No coordinates: cut one nearest-neighbour route over every place into consecutive days instead
+        clusters = split_days(nearest_neighbour_route(cost, list(range(n))), duration)
+
+    deadline = None if time_budget is None else time.perf_counter() + time_budget
+    days = []
+    for members in clusters:
+        route = nearest_neighbour_route(cost, members)
+        days.append(improve_route(cost, route, max_passes, deadline))
+    return days
+
+
+def cluster_days(coords, duration, iterations=KMEANS_ITERATIONS):
+    """
+    Split places into duration geographic clusters of (nearly) equal size.
+
+    Deterministic k-means: farthest-point initialisation, then balanced assignment where every
+    cluster takes at most ceil(n / duration) places, closest place-centroid pairs first.
+
+    Parameters:
+        coords (np.ndarray): (n, 2) [lat, lon] in degrees.
+        duration (int): Number of clusters.
+
+    Returns:
+        list: duration lists of node indices (some empty if there are fewer places than days).
+    """
+    n = len(coords)
+    k = min(duration, n)
+    # Local flat projection in meters, good enough inside a city
+    lat0 = np.radians(coords[:, 0].mean())
+    points = np.column_stack([coords[:, 1] * np.cos(lat0) * 111320.0, coords[:, 0] * 110540.0])
+
+    # Farthest-point init, starting from the place closest to the middle
+    centers = [int(np.argmin(((points - points.mean(axis=0)) ** 2).sum(axis=1)))]
+    closest = ((points - points[centers[0]]) ** 2).sum(axis=1)
+    while len(centers) < k:
+        centers.append(int(np.argmax(closest)))
+        closest = np.minimum(closest, ((points - points[centers[-1]]) ** 2).sum(axis=1))
+    centroids = points[centers]
+
+    capacity = -(-n // k)  # ceil(n / k)
+    labels = np.full(n, -1)
+    for _ in range(iterations):
+        distances = ((points[:, None, :] - centroids[None, :, :]) ** 2).sum(axis=2)
+        new_labels = np.full(n, -1)
+        sizes = np.zeros(k, dtype=int)
+        # Closest (place, cluster) pairs first, skipping full clusters
+        for flat in np.argsort(distances, axis=None, kind="stable"):
+            place, cluster = divmod(int(flat), k)
+            if new_labels[place] < 0 and sizes[cluster] < capacity:
+                new_labels[place] = cluster
+                sizes[cluster] += 1
+        if (new_labels == labels).all():
+            break
+        labels = new_labels
+        centroids = np.array([points[labels == c].mean(axis=0) if (labels == c).any() else centroids[c] for c in range(k)])
+
+    clusters = [np.flatnonzero(labels == c).tolist() for c in range(k)]
+    return clusters + [[] for _ in range(duration - k)]
+
+
+def nearest_neighbour_route(cost, members):
+    """
+    Greedy route through members: start at the member farthest from the others' middle, always go to the closest unvisited one.
+    """
+    if len(members) <= 2:
+        return list(members)
+    members = np.asarray(members)
+    sub = cost[np.ix_(members, members)]
+    start = int(np.argmax(sub.sum(axis=1)))  # An "edge" place, so the route sweeps across instead of starting in the middle
+    visited = np.zeros(len(members), dtype=bool)
+    route = [start]
+    visited[start] = True
+    for _ in range(len(members) - 1):
+        distances = np.where(visited, np.inf, sub[route[-1]])
+        nxt = int(np.argmin(distances))
+        route.append(nxt)
+        visited[nxt] = True
+    return members[route].tolist()
+
+
+def improve_route(cost, route, max_passes=MAX_PASSES, deadline=None):
+    """
+    Shorten an open route (no return to the start) with 2-opt and Or-opt moves.
+
+    A dummy stop at distance 0 from everything closes the route into a tour, so the usual
+    closed-tour moves also get to change where the route starts and ends.
+
+    Parameters:
+        cost (np.ndarray): Full cost matrix.
+        route (list): Nodes in visiting order.
+        max_passes (int): Max passes over all moves.
+        deadline (float): time.perf_counter() value to stop at (None for no limit).
+
+    Returns:
+        list: The improved route (never longer than the input).
+    """
+    m = len(route)
+    if m <= 3:
+        return list(route)
+
+    # Local matrix with the dummy stop as the last index
+    nodes = np.asarray(route)
+    d = np.zeros((m + 1, m + 1))
+    d[:m, :m] = cost[np.ix_(nodes, nodes)]
+    tour = np.arange(m + 1)  # Dummy at the end, so tour m -> 0 is the (free) wrap-around
+
+    for _ in range(max_passes):
+        improved = _two_opt_pass(d, tour) | _or_opt_pass(d, tour)
+        if not improved or (deadline is not None and time.perf_counter() > deadline):
+            break
+
+    # Cut the tour open at the dummy stop
+    dummy = int(np.flatnonzero(tour == m)[0])
+    order = np.concatenate([tour[dummy + 1:], tour[:dummy]])
+    return nodes[order].tolist()
+
+
+def _two_opt_pass(d, tour):
+    # Reverse tour[i+1..j] whenever that shortens the tour; best j for every i, in place
+    size = len(tour)
+    improved = False
+    for i in range(size - 2):
+        a, b = tour[i], tour[i + 1]
+        j = np.arange(i + 2, size if i > 0 else size - 1)  # (i = 0, j = last) would touch the same edge twice
+        c, e = tour[j], tour[(j + 1) % size]
+        delta = d[a, c] + d[b, e] - d[a, b] - d[c, e]
+        best = int(np.argmin(delta))
+        if delta[best] < -1e-9:
+            tour[i + 1:j[best] + 1] = tour[i + 1:j[best] + 1][::-1].copy()
+            improved = True
+    return improved
+
+
+def _or_opt_pass(d, tour):
+    # Move segments of 1-3 stops (optionally reversed) to the best other spot in the tour, in place
+    size = len(tour)
+    improved = False
+    for length in (1, 2, 3):
+        if size < length + 3:
+            break
+        i = 0
+        while i + length <= size:
+            segment = tour[i:i + length]
+            prev, nxt = tour[i - 1], tour[(i + length) % size]
+            removed_gain = d[prev, segment[0]] + d[segment[-1], nxt] - d[prev, nxt]
+
+            rest = np.concatenate([tour[i + length:], tour[:i]])  # Tour without the segment, starting after it
+            u, v = rest, np.roll(rest, -1)
+            forward = d[u, segment[0]] + d[segment[-1], v] - d[u, v]
+            backward = d[u, segment[-1]] + d[segment[0], v] - d[u, v]
+            forward[-1] = backward[-1] = np.inf  # Putting it back between prev and nxt is not a move
+
+            best_forward, best_backward = int(np.argmin(forward)), int(np.argmin(backward))
+            use_reverse = backward[best_backward] < forward[best_forward]
+            at = best_backward if use_reverse else best_forward
+            added = backward[at] if use_reverse else forward[at]
+
+            if added - removed_gain < -1e-9:
+                moved = segment[::-1] if use_reverse else segment
+                tour[:] = np.concatenate([rest[:at + 1], moved, rest[at + 1:]])
+                improved = True
+            i += 1
+    return improved
@@ -0,0 +1,158 @@
+# Background job queue for /plan/async
+# The planning pipeline runs on a small worker pool instead of inside the Flask request:
+#   - submit() returns a job right away, the browser polls its status (stage + progress) until it's done
+#   - identical requests that are still running share one job instead of planning twice
+#   - finished plans are cached for a while, keyed by (destination, budget, duration, interests)
+
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import count, log, request_id
+
+MAX_WORKERS = 2          # Plans running at the same time
+RESULT_TTL = 3600        # Seconds a finished plan is reused for
+MAX_JOBS = 256           # Finished jobs kept around (oldest forgotten first)
+
+
+def plan_key(destination, budget, duration, interests):
+    """
+    Cache key of a plan request: the same trip typed slightly differently gives the same key.
+    """
+    return (" ".join(str(destination).lower().split()), int(budget), int(duration), tuple(sorted(set(interests or []))))
+
+
+class Job:
+    """
+    One planning run and everything the status endpoint reports about it.
+    """
+
+    def __init__(self, key, stages):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.stages = stages
+        self.status = "queued"   # queued -> running -> done / failed
+        self.stage = None
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+        self._done = threading.Event()
+
+    @property
+    def progress(self):
+        # Fraction of the stages started so far (1.0 once done)
+        if self.status == "done":
+            return 1.0
+        if self.stage not in self.stages:
+            return 0.0
+        return self.stages.index(self.stage) / (len(self.stages) - 1)
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": round(self.progress, 3),
+            "error": self.error,
+        }
+
+
+class JobQueue:
+    """
+    Runs plans on a thread pool, coalescing identical in-flight requests and caching finished ones.
+
+    Parameters:
+        run (callable): run(*args, progress=callback) doing the actual work (planner.run_plan).
+        stages (list): Stage names run reports, in order (for the progress fraction).
+        max_workers (int): Jobs running at the same time.
+        result_ttl (float): Seconds a finished result is reused for identical requests.
+        max_jobs (int): Finished jobs remembered for the status endpoint.
+        expected_errors (tuple): Exception types whose message is shown to the user as is; anything else is logged.
+    """
+
+    def __init__(self, run, stages, max_workers=MAX_WORKERS, result_ttl=RESULT_TTL, max_jobs=MAX_JOBS, expected_errors=()):
+        self.run = run
+        self.stages = stages
+        self.result_ttl = result_ttl
+        self.max_jobs = max_jobs
+        self.expected_errors = tuple(expected_errors)
+        self.jobs = OrderedDict()   # id -> Job
+        self.by_key = {}            # key -> Job that is running or has a reusable result
+        self.coalesced = 0          # Requests answered by an existing job
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="plan")
+
+    def submit(self, key, *args):
+        """
+        Start a plan, or return the job already planning (or recently planned) the same trip.
+
+        Returns:
+            Job: The job to poll.
+        """
+        with self._lock:
+            job = self.by_key.get(key)
+            if job is not None and self._reusable(job):
+                self.coalesced += 1
+                return job
+
+            job = Job(key, self.stages)
+            self.jobs[job.id] = job
+            self.by_key[key] = job
+            self._prune()
+        self._pool.submit(self._work, job, args)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait)
+
+    def _reusable(self, job):
+        # Still running, or finished successfully not too long ago
+        if job.status in ("queued", "running"):
+            return True
+        return job.status == "done" and time.time() - job.finished < self.result_ttl
+
+    def _prune(self):
+        # Forget the oldest finished jobs (never the ones still running)
+        finished = [job for job in self.jobs.values() if job.finished is not None]
+        for job in finished[:max(0, len(self.jobs) - self.max_jobs)]:
+            del self.jobs[job.id]
+            if self.by_key.get(job.key) is job:
+                del self.by_key[job.key]
+
+    def _work(self, job, args):
+        def progress(stage):
+            job.stage = stage
+
+        request_id.set(job.id)  # Logs of this plan carry the job id (see metrics.py)
+        job.status = "running"
+        status = "failed"
+        try:
+            job.result = self.run(*args, progress=progress)
+            status = "done"
+        except self.expected_errors as error:
+            job.error = str(error)
+        except Exception as error:
+            log("plan_failed", level=logging.ERROR, error=repr(error))
+            job.error = "Error: Something went wrong while planning. Please try again."
+        finally:
+            # finished first: a concurrent submit() that sees "done" reads it right away in _reusable
+            job.finished = time.time()
+            job.status = status
+            if job.status == "failed":
+                with self._lock:
+                    # Failed plans are not cached, the next identical request tries again
+                    if self.by_key.get(job.key) is job:
+                        del self.by_key[job.key]
+            count("plan_jobs_total", help="Background plans by outcome", status=job.status)
+            job._done.set()
@@ -0,0 +1,80 @@
+# Node positions for the graph visualizations, computed once per graph and shared by every renderer
+# Places have real coordinates, so the default layout is just the map: lat/lon projected onto a plane
+# Only graphs without usable coordinates fall back to a (seeded, so always the same) spring layout
+
+import threading
+from collections import OrderedDict
+
+import networkx as nx
+import numpy as np
+
+from artifacts import graph_fingerprint
+from compact_graph import CompactGraph
+from metrics import span
+
+LAYOUT_SEED = 42          # Seed of the spring layout fallback
+MAX_CACHED_LAYOUTS = 128  # Layouts kept in memory (least recently used dropped first)
+
+_layouts = OrderedDict()  # (fingerprint, method) -> positions
+_lock = threading.Lock()
+
+
+def graph_layout(graph, method="auto", fingerprint=None):
+    """
+    Positions of the nodes for drawing, cached by graph fingerprint.
+
+    Parameters:
+        graph (CompactGraph or nx.Graph): Graph whose nodes have lat/lon attributes.
+        method (str): "geo" (projected lat/lon), "spring" (seeded spring layout) or "auto" (geo when every node has coordinates).
+        fingerprint (str): graph_fingerprint(graph) if already known (saves hashing the graph again).
+
+    Returns:
+        dict: node -> np.ndarray [x, y], scaled to [-1, 1] like networkx's layouts.
+    """
+    compact = graph if isinstance(graph, CompactGraph) else CompactGraph.from_networkx(graph)
+    coords = np.column_stack([compact.table.lat, compact.table.lon])
+    if method == "auto":
+        method = "geo" if len(coords) and np.isfinite(coords).all() else "spring"
+
+    key = (fingerprint or graph_fingerprint(compact), method)
+    with _lock:
+        if key in _layouts:
+            _layouts.move_to_end(key)
+            return _layouts[key]
+
+    with span(f"layout.{method}"):
+        if method == "geo":
+            positions = geo_layout(coords)
+        else:
+            G = graph if isinstance(graph, nx.Graph) else compact.to_networkx()
+            positions = nx.spring_layout(G, seed=LAYOUT_SEED)
+
+    with _lock:
+        _layouts[key] = positions
+        while len(_layouts) > MAX_CACHED_LAYOUTS:
+            _layouts.popitem(last=False)
+    return positions
+
+
+def geo_layout(coords):
+    """
+    Project [lat, lon] degrees onto a plane (equirectangular around the middle latitude, fine at city scale).
+
+    Parameters:
+        coords (np.ndarray): (n, 2) [lat, lon] in degrees.
+
+    Returns:
+        dict: node index -> np.ndarray [x, y] scaled to [-1, 1], north up.
+    """
+    coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+    if len(coords) == 0:
+        return {}
+    lat0 = np.radians(coords[:, 0].mean())
+    points = np.column_stack([coords[:, 1] * np.cos(lat0), coords[:, 0]])
+
+    # Same scaling as networkx's rescale_layout: centered, largest coordinate at 1 (keeps the map's aspect ratio)
+    points -= points.mean(axis=0)
+    extent = np.abs(points).max()
+    if extent > 0:
+        points /= extent
+    return dict(enumerate(points))
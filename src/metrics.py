@@ -0,0 +1,266 @@
+# Lightweight instrumentation for the hot path: spans (timers), counters, structured logs and sampled profiling
+#   - span("api.places") / Stages(...) time a block and record it in a histogram (and a debug log line)
+#   - count(...) bumps a counter; register_collector(...) adds values read at scrape time (cache hit ratios, ...)
+#   - render_prometheus() is the text served on /metrics (Prometheus exposition format, no extra dependency)
+#   - maybe_profile(...) runs cProfile + tracemalloc for a sample of requests (PROFILE_SAMPLE_RATE)
+
+import contextvars
+import cProfile
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from contextlib import contextmanager
+
+PREFIX = "trivagator_"
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)  # Seconds
+
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0))  # Fraction of requests profiled (0 = off)
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "profiles"))
+PROFILE_TOP_ALLOCATIONS = 10
+
+logger = logging.getLogger("trivagator")
+request_id = contextvars.ContextVar("request_id", default=None)  # Added to every log line of a request
+
+_lock = threading.Lock()
+_counters = defaultdict(float)    # (name, labels) -> value
+_histograms = {}                  # (name, labels) -> [bucket counts..., sum, count]
+_help = {}                        # name -> (type, help)
+_collectors = []                  # Functions returning extra samples at scrape time
+
+
+def _labels(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def count(name, amount=1, help="", **labels):
+    """
+    Add to a counter (created on first use).
+    """
+    key = (name, _labels(labels))
+    with _lock:
+        _help.setdefault(name, ("counter", help))
+        _counters[key] += amount
+
+
+def observe(name, seconds, help="", **labels):
+    """
+    Record a duration in a histogram (created on first use).
+    """
+    key = (name, _labels(labels))
+    with _lock:
+        _help.setdefault(name, ("histogram", help))
+        values = _histograms.get(key)
+        if values is None:
+            values = _histograms[key] = [0] * (len(BUCKETS) + 2)
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                values[i] += 1
+                break
+        values[-2] += seconds
+        values[-1] += 1
+
+
+@contextmanager
+def span(name, **fields):
+    """
+    Time a block: recorded in the span histogram and logged (at debug level) as one structured line.
+
+    Parameters:
+        name (str): What is being timed, e.g. "api.distancematrix" or "plan.graph".
+        fields: Extra values for the log line (not used as metric labels, so they can be anything).
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        observe("span_seconds", seconds, help="Time spent in each instrumented block", span=name)
+        if logger.isEnabledFor(logging.DEBUG):
+            log("span", level=logging.DEBUG, span=name, seconds=round(seconds, 6), **fields)
+
+
+class Stages:
+    """
+    Times consecutive stages of a pipeline: starting a stage ends the previous one.
+
+        stages = Stages("plan")
+        stages.start("geocode")   # ... then stages.start("places") etc.
+        stages.finish()
+
+    Each stage is recorded as span "<prefix>.<stage>"; durations stay readable afterwards for logging.
+    """
+
+    def __init__(self, prefix):
+        self.prefix = prefix
+        self.durations = {}
+        self._stage = None
+        self._started = None
+
+    def start(self, stage):
+        self.finish()
+        self._stage, self._started = stage, time.perf_counter()
+
+    def finish(self):
+        if self._stage is None:
+            return
+        seconds = time.perf_counter() - self._started
+        self.durations[self._stage] = seconds
+        observe("span_seconds", seconds, help="Time spent in each instrumented block", span=f"{self.prefix}.{self._stage}")
+        self._stage = None
+
+
+def log(event, level=logging.INFO, **fields):
+    """
+    One structured (JSON) log line, tagged with the current request id.
+    """
+    if not logger.isEnabledFor(level):
+        return
+    record = {"event": event, "request_id": request_id.get(), **fields}
+    logger.log(level, json.dumps(record, default=str))
+
+
+def configure_logging(level=None):
+    """
+    Send the structured logs to stderr as JSON lines (level from LOG_LEVEL, default INFO).
+    """
+    if logger.handlers:
+        return
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter('{"ts": "%(asctime)s", "level": "%(levelname)s", "log": %(message)s}'))
+    logger.addHandler(handler)
+    logger.setLevel(level or os.getenv("LOG_LEVEL", "INFO").upper())
+    logger.propagate = False
+
+
+def register_collector(collector):
+    """
+    Add a function called on every scrape. It returns (name, type, help, [(labels dict, value), ...]) tuples.
+    """
+    _collectors.append(collector)
+
+
+def render_prometheus():
+    """
+    Every metric in the Prometheus text exposition format (what /metrics serves).
+    """
+    lines = []
+    with _lock:
+        counters = dict(_counters)
+        histograms = {key: list(values) for key, values in _histograms.items()}
+        help_text = dict(_help)
+
+    by_name = defaultdict(list)
+    for (name, labels), value in counters.items():
+        by_name[name].append((dict(labels), value))
+    for name, samples in sorted(by_name.items()):
+        _header(lines, name, *help_text[name])
+        for labels, value in samples:
+            lines.append(f"{PREFIX}{name}{_format_labels(labels)} {_number(value)}")
+
+    by_name = defaultdict(list)
+    for (name, labels), values in histograms.items():
+        by_name[name].append((dict(labels), values))
+    for name, samples in sorted(by_name.items()):
+        _header(lines, name, *help_text[name])
+        for labels, values in samples:
+            cumulative = 0
+            for bound, bucket in zip(BUCKETS, values):
+                cumulative += bucket
+                lines.append(f"{PREFIX}{name}_bucket{_format_labels(dict(labels, le=bound))} {cumulative}")
+            lines.append(f"{PREFIX}{name}_bucket{_format_labels(dict(labels, le='+Inf'))} {values[-1]}")
+            lines.append(f"{PREFIX}{name}_sum{_format_labels(labels)} {_number(values[-2])}")
+            lines.append(f"{PREFIX}{name}_count{_format_labels(labels)} {values[-1]}")
+
+    for collector in _collectors:
+        for name, kind, help, samples in collector():
+            _header(lines, name, kind, help)
+            for labels, value in samples:
+                lines.append(f"{PREFIX}{name}{_format_labels(labels)} {_number(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def _header(lines, name, kind, help):
+    if help:
+        lines.append(f"# HELP {PREFIX}{name} {help}")
+    lines.append(f"# TYPE {PREFIX}{name} {kind}")
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (f'{re.sub(r"[^a-zA-Z0-9_]", "_", str(key))}="{_escape(value)}"' for key, value in labels.items())
+    return "{" + ",".join(escaped) + "}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) and not float(value).is_integer() else str(int(value))
+
+
+class RequestProfile:
+    """
+    cProfile + tracemalloc around one request. Writes a .prof file (open with snakeviz / pstats)
+    and logs the biggest allocations.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.profiler = cProfile.Profile()
+        self.started_tracemalloc = False
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracemalloc = True
+        self.profiler.enable()
+        return self
+
+    def stop(self):
+        self.profiler.disable()
+        snapshot = tracemalloc.take_snapshot() if tracemalloc.is_tracing() else None
+        if self.started_tracemalloc:
+            tracemalloc.stop()
+
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        safe_name = re.sub(r"[^a-zA-Z0-9_.-]", "_", self.name)
+        path = os.path.join(PROFILE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{safe_name}-{request_id.get() or os.getpid()}.prof")
+        self.profiler.dump_stats(path)
+
+        top = []
+        if snapshot is not None:
+            for stat in snapshot.statistics("lineno")[:PROFILE_TOP_ALLOCATIONS]:
+                frame = stat.traceback[0]
+                top.append({"where": f"{frame.filename}:{frame.lineno}", "kb": round(stat.size / 1024, 1)})
+        count("profiles_total", help="Requests profiled")
+        log("profile", name=self.name, path=path, top_allocations=top)
+        return path
+
+
+def maybe_profile(name, force=False, rate=None):
+    """
+    Start profiling this request for a sample of traffic.
+
+    Parameters:
+        name (str): What is profiled (e.g. the endpoint), used in the file name.
+        force (bool): Profile regardless of the sample rate.
+        rate (float): Sample rate, defaults to PROFILE_SAMPLE_RATE.
+
+    Returns:
+        RequestProfile: A started profile (call .stop() at the end), or None if this request isn't sampled.
+    """
+    rate = PROFILE_SAMPLE_RATE if rate is None else rate
+    if not force and (rate <= 0 or random.random() >= rate):
+        return None
+    try:
+        return RequestProfile(name).start()
+    except ValueError:
+        return None  # Another profiler is already running (e.g. a concurrent sampled request)
@@ -0,0 +1,299 @@
+# Small local stand-in for the Google Maps web services so we can benchmark and load-test without burning API quota
+#   - replays recorded responses (see fixtures.py) when it has them
+#   - otherwise makes up a synthetic city: a stable set of places of configurable size per search
+#   - latency, jitter and error rate are configurable, to see how the clients cope with a slow or flaky API
+#   - an optional rate limit per API answers 429 like Google does when a client sends too much at once
+# Usage: python mock_maps_server.py --port 8765   (then set MAPS_BACKEND=http://127.0.0.1:8765 in .env)
+# Or set MAPS_BACKEND=mock to have the app start one in its own process (configured with the MOCK_MAPS_* variables)
+
+import argparse
+import base64
+import hashlib
+import json
+import math
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from fixtures import FIXTURE_DIR, load_fixture
+
+EARTH_RADIUS_M = 6371000
+ROAD_FACTOR = 1.3  # Roads are never straight, so pretend they are ~30% longer than the great-circle distance
+PAGE_SIZE = 20     # Results per Places page, like the real API
+DEFAULT_CITY_SIZE = 60
+DEFAULT_CENTER = (40.7128, -74.0060)  # New York
+
+
+def haversine_m(a, b):
+    """
+    Great-circle distance between two "latitude,longitude" strings in meters.
+    """
+    lat1, lon1 = (math.radians(float(v)) for v in a.split(","))
+    lat2, lon2 = (math.radians(float(v)) for v in b.split(","))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(h))
+
+
+def _seed(*values):
+    # Stable seed (Python's hash() changes between runs)
+    return int(hashlib.md5("|".join(str(v) for v in values).encode()).hexdigest()[:8], 16)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # The default backlog of 5 overflows under concurrent clients (a 1 s SYN retry each time)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.request_count += 1
+            roll = server.rng.random()
+            delay = server.latency + (server.rng.uniform(0, server.jitter) if server.jitter else 0)
+        if delay:
+            time.sleep(delay)
+
+        if server.rate_limit and self.over_rate_limit(urlparse(self.path).path):
+            self.send_response(429)
+            self.send_header("Retry-After", "1")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        if roll < server.error_rate:
+            # Half rate limits (retry right away), half server errors, like a flaky upstream
+            with server.lock:
+                server.errors_served += 1
+            status = 429 if roll < server.error_rate / 2 else 503
+            self.send_response(status)
+            if status == 429:
+                self.send_header("Retry-After", "0")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        url = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+
+        body = load_fixture(server.fixtures, url.path, params) if server.fixtures else None
+        if body is not None:
+            with server.lock:
+                server.fixture_hits += 1
+        elif url.path.endswith("/distancematrix/json"):
+            body = self.distance_matrix(params)
+        elif url.path.endswith("/place/nearbysearch/json"):
+            body = self.nearby_search(params)
+        elif url.path.endswith("/geocode/json"):
+            body = self.geocode(params)
+        else:
+            self.send_error(404)
+            return
+
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def over_rate_limit(self, path):
+        # Fixed one-second windows per endpoint: more than rate_limit requests in the same second get a 429
+        server = self.server
+        window = int(time.monotonic())
+        with server.lock:
+            start, sent = server.rate_windows.get(path, (window, 0))
+            if start != window:
+                start, sent = window, 0
+            server.rate_windows[path] = (start, sent + 1)
+            if sent < server.rate_limit:
+                return False
+            server.rate_limited += 1
+            return True
+
+    def distance_matrix(self, params):
+        origins = params.get("origins", "").split("|")
+        destinations = params.get("destinations", "").split("|")
+        with self.server.lock:
+            self.server.elements_served += len(origins) * len(destinations)  # What Google bills the Distance Matrix by
+        rows = []
+        for origin in origins:
+            elements = []
+            for destination in destinations:
+                meters = round(haversine_m(origin, destination) * ROAD_FACTOR)
+                elements.append({"status": "OK", "distance": {"value": meters, "text": f"{meters / 1000:.1f} km"}})
+            rows.append({"elements": elements})
+        return {"status": "OK", "origin_addresses": origins, "destination_addresses": destinations, "rows": rows}
+
+    def nearby_search(self, params):
+        # Same location + type always gives the same city_size made-up places (20 per page) scattered within the radius
+        if "pagetoken" in params:
+            search = json.loads(base64.urlsafe_b64decode(params["pagetoken"]))
+        else:
+            search = {"location": params.get("location", "0,0"), "radius": params.get("radius", 1000),
+                      "type": params.get("type", "point_of_interest"), "page": 0}
+        lat, lon = (float(v) for v in search["location"].split(","))
+        radius = float(search["radius"])
+        place_type = search["type"]
+        page = search["page"]
+        rng = random.Random(_seed(lat, lon, place_type, page))
+        city_size = self.server.city_size
+        results = []
+        for i in range(page * PAGE_SIZE, min(page * PAGE_SIZE + PAGE_SIZE, city_size)):
+            dlat = rng.uniform(-1, 1) * radius / 111320
+            dlon = rng.uniform(-1, 1) * radius / (111320 * max(math.cos(math.radians(lat)), 0.01))
+            results.append({
+                "name": f"{place_type.replace('_', ' ').title()} {i + 1}",
+                "vicinity": f"{rng.randint(1, 999)} Mock St",
+                "rating": round(rng.uniform(3.0, 5.0), 1),
+                "place_id": f"mock-{place_type}-{i}-{_seed(lat, lon, place_type) % 100000}",
+                "types": [place_type, "point_of_interest"],
+                "price_level": rng.randint(0, 4),
+                "geometry": {"location": {"lat": lat + dlat, "lng": lon + dlon}},
+            })
+        body = {"status": "OK", "results": results}
+        if (page + 1) * PAGE_SIZE < city_size:
+            body["next_page_token"] = base64.urlsafe_b64encode(json.dumps(dict(search, page=page + 1)).encode()).decode()
+        return body
+
+    def geocode(self, params):
+        # Any address maps to a stable point near the city center
+        rng = random.Random(_seed(params.get("address", "")))
+        lat, lon = self.server.center
+        location = {"lat": lat + rng.uniform(-0.05, 0.05), "lng": lon + rng.uniform(-0.05, 0.05)}
+        return {"status": "OK", "results": [{"geometry": {"location": location}}]}
+
+    def log_message(self, format, *args):
+        pass  # Keep benchmark output readable
+
+
+class MockMapsServer:
+    """
+    Local HTTP server that answers Maps API requests, runs in a background thread.
+
+    Use it as a context manager:
+        with MockMapsServer() as server:
+            utils.MAPS_API_URL = server.url
+
+    Parameters:
+        host, port (str, int): Where to listen (port 0 picks a free one).
+        latency (float): Seconds of delay before every response.
+        jitter (float): Extra random delay of up to this many seconds per response.
+        error_rate (float): Fraction of requests answered with a 429 or 503 instead.
+        rate_limit (float): Requests per second each endpoint accepts before answering 429 (0 = no limit).
+        city_size (int): Places every nearby search has in total (20 per page).
+        fixtures (str): Folder of recorded responses to replay first (see fixtures.py).
+        center (tuple): (lat, lon) that geocoded addresses land around.
+        seed (int): Seed of the latency/error randomness, so runs can be repeated exactly.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, jitter=0.0, error_rate=0.0,
+                 city_size=DEFAULT_CITY_SIZE, fixtures=None, center=DEFAULT_CENTER, seed=0, rate_limit=0.0):
+        self.httpd = _Server((host, port), _Handler)
+        self.httpd.lock = threading.Lock()
+        self.httpd.request_count = 0
+        self.httpd.fixture_hits = 0
+        self.httpd.errors_served = 0
+        self.httpd.elements_served = 0
+        self.httpd.latency = latency  # Seconds to sleep before answering each request
+        self.httpd.jitter = jitter
+        self.httpd.error_rate = error_rate
+        self.httpd.rate_limit = rate_limit
+        self.httpd.rate_windows = {}  # Endpoint path -> (second, requests in it)
+        self.httpd.rate_limited = 0
+        self.httpd.city_size = city_size
+        self.httpd.fixtures = fixtures
+        self.httpd.center = center
+        self.httpd.rng = random.Random(seed)
+        self.thread = None
+
+    @classmethod
+    def from_env(cls, **overrides):
+        """
+        Server configured from the MOCK_MAPS_* environment variables (what MAPS_BACKEND=mock uses).
+        """
+        settings = {
+            "latency": float(os.getenv("MOCK_MAPS_LATENCY", 0)),
+            "jitter": float(os.getenv("MOCK_MAPS_JITTER", 0)),
+            "error_rate": float(os.getenv("MOCK_MAPS_ERROR_RATE", 0)),
+            "city_size": int(os.getenv("MOCK_MAPS_CITY_SIZE", DEFAULT_CITY_SIZE)),
+            "fixtures": os.getenv("MOCK_MAPS_FIXTURES") or None,
+            "seed": int(os.getenv("MOCK_MAPS_SEED", 0)),
+            "rate_limit": float(os.getenv("MOCK_MAPS_RATE_LIMIT", 0)),
+        }
+        settings.update(overrides)
+        return cls(**settings)
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def request_count(self):
+        return self.httpd.request_count
+
+    @property
+    def fixture_hits(self):
+        return self.httpd.fixture_hits
+
+    @property
+    def errors_served(self):
+        return self.httpd.errors_served
+
+    @property
+    def elements_served(self):
+        return self.httpd.elements_served
+
+    @property
+    def rate_limited(self):
+        return self.httpd.rate_limited
+
+    def reset_count(self):
+        with self.httpd.lock:
+            self.httpd.request_count = 0
+            self.httpd.fixture_hits = 0
+            self.httpd.errors_served = 0
+            self.httpd.elements_served = 0
+            self.httpd.rate_limited = 0
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local stand-in for the Google Maps web services.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds of delay added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random delay of up to this many seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 429/503")
+    parser.add_argument("--city-size", type=int, default=DEFAULT_CITY_SIZE, help="Places per nearby search")
+    parser.add_argument("--fixtures", nargs="?", const=FIXTURE_DIR, default=None,
+                        help="Folder of recorded responses to replay (data/fixtures if no folder is given)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="Requests per second per endpoint before 429s")
+    args = parser.parse_args()
+
+    server = MockMapsServer(args.host, args.port, args.latency, args.jitter, args.error_rate,
+                            args.city_size, args.fixtures, seed=args.seed, rate_limit=args.rate_limit)
+    print(f"Mock Maps server running at {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,187 @@
+# JSON planning API (/api/plan and /api/plan/bulk in app.py)
+#   - plan_record() turns a plan into a compact record: the places once, the itineraries as indices into them
+#   - BulkPlanner runs many plans on a process pool (plan_worker.py) and yields each record as soon as it's done;
+#     the workers share the geo cache's SQLite file, so a place or distance is only fetched once for all of them
+
+import json
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import api_test
+import utils
+from geo_cache import cache
+from metrics import count, log
+from planner import PlanError, check_budget
+from plan_worker import init_worker, plan_one
+from scheduler import scheduler
+from utils import REQUEST_COUNTS
+
+MAX_BULK_PLANS = 1000  # Specs accepted per bulk request
+# Worker processes of the bulk pool: two per CPU, since a plan spends a good part of its time waiting on the Maps API
+BULK_WORKERS = int(os.getenv("BULK_WORKERS", 0)) or 2 * (os.cpu_count() or 1)
+
+
+def parse_spec(spec):
+    """
+    Check one plan spec from a JSON body and turn it into run_plan's arguments.
+
+    Parameters:
+        spec (dict): {"destination": str, "budget": number, "duration": int, "interests": [str, ...]}
+
+    Returns:
+        dict: destination, budget, duration and interests, ready for run_plan(**spec).
+
+    Raises:
+        PlanError: If a field is missing or invalid, or the budget is too low.
+    """
+    if not isinstance(spec, dict):
+        raise PlanError("Error: Every plan must be a JSON object.")
+    destination = spec.get("destination")
+    if not isinstance(destination, str) or not destination.strip():
+        raise PlanError("Error: destination is required.")
+    try:
+        budget, duration = int(spec.get("budget")), int(spec.get("duration"))
+    except (TypeError, ValueError):
+        raise PlanError("Error: budget and duration must be whole numbers.") from None
+    if duration <= 0:
+        raise PlanError("Error: duration must be at least 1 day.")
+    interests = spec.get("interests") or []
+    if isinstance(interests, str):
+        interests = [interests]
+    if not isinstance(interests, list) or not all(isinstance(interest, str) for interest in interests):
+        raise PlanError("Error: interests must be a list of place types.")
+
+    is_valid_budget, min_budget = check_budget(budget, duration)
+    if not is_valid_budget:
+        raise PlanError(f"Error: Budget is too low. Minimum budget is ${min_budget} for {duration} days.")
+    return {"destination": destination, "budget": budget, "duration": duration, "interests": interests}
+
+
+def plan_record(result, destination, budget, duration, interests):
+    """
+    Compact, JSON-ready version of a run_plan result: every place once, the itineraries as indices into places.
+
+    Returns:
+        dict: plan_id, the request, places and itineraries ({"dfs", "dijkstra", "optimized"}: one list per day).
+    """
+    table = result["G"].table
+    places = [{
+        "name": str(name),
+        "address": str(address),
+        "rating": float(rating),
+        "lat": round(float(lat), 6),
+        "lon": round(float(lon), 6),
+    } for name, address, rating, lat, lon in zip(table.name, table.address, table.rating, table.lat, table.lon)]
+
+    def days(itinerary):
+        return [[int(node) for node in day] for day in itinerary]
+
+    return {
+        "plan_id": result["plan_id"],
+        "destination": destination,
+        "budget": int(budget),
+        "duration": int(duration),
+        "interests": list(interests or []),
+        "places": places,
+        "itineraries": {
+            "dfs": days(result["dfs_itinerary"]),
+            "dijkstra": days(result["dijkstra_itinerary"]),
+            "optimized": days(result["optimized_itinerary"]),
+        },
+    }
+
+
+def read_specs(body, content_type):
+    """
+    Plan specs of a bulk request: a JSON list, {"plans": [...]} or NDJSON (one spec per line).
+
+    Raises:
+        PlanError: If the body can't be read or has too many plans.
+    """
+    try:
+        if "ndjson" in (content_type or ""):
+            specs = [json.loads(line) for line in body.splitlines() if line.strip()]
+        else:
+            specs = json.loads(body or "null")
+            if isinstance(specs, dict):
+                specs = specs.get("plans")
+    except ValueError:
+        raise PlanError("Error: The body must be JSON or NDJSON.") from None
+    if not isinstance(specs, list) or not specs:
+        raise PlanError("Error: Send a list of plans.")
+    if len(specs) > MAX_BULK_PLANS:
+        raise PlanError(f"Error: At most {MAX_BULK_PLANS} plans per request.")
+    return specs
+
+
+class BulkPlanner:
+    """
+    Process pool for bulk plans, started on first use.
+
+    Parameters:
+        max_workers (int): Worker processes.
+    """
+
+    def __init__(self, max_workers=BULK_WORKERS):
+        self.max_workers = max_workers
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def pool(self):
+        with self._lock:
+            if self._pool is None:
+                # spawn, not fork: the app has threads and an open SQLite connection that a forked child can't safely share
+                # A spawned worker re-imports the script that started the app (python app.py) as __mp_main__ before
+                # init_worker runs. That only builds an idle Flask app: no server is started, the mock Maps server
+                # starts lazily (utils.maps_api_url) and the plan pool's threads only start with the first job.
+                # plan_worker.py itself never imports app.
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=init_worker,
+                    initargs=(utils.maps_api_url(), api_test.PAGE_TOKEN_DELAY, cache.path, scheduler.path),
+                )
+            return self._pool
+
+    def run(self, specs):
+        """
+        Plan every spec, yielding one record per spec in the order they finish.
+
+        Yields:
+            dict: {"index", "id", "status": "done", ...plan_record} or {"index", "id", "status": "failed", "error"}.
+        """
+        futures = {}
+        try:
+            for index, raw in enumerate(specs):
+                request_id = raw.get("id") if isinstance(raw, dict) else None
+                try:
+                    spec = parse_spec(raw)
+                except PlanError as error:
+                    count("bulk_plans_total", help="Bulk plans by outcome", status="failed")
+                    yield {"index": index, "id": request_id, "status": "failed", "error": str(error)}
+                    continue
+                futures[self.pool().submit(plan_one, index, spec)] = (index, request_id)
+
+            for future in as_completed(futures):
+                index, request_id = futures[future]
+                try:
+                    _, record, requests = future.result()
+                    REQUEST_COUNTS.update(requests)  # So /metrics counts the workers' API calls too
+                except Exception as error:  # A worker died (e.g. out of memory), the other plans carry on
+                    log("bulk_plan_failed", level=logging.ERROR, index=index, error=repr(error))
+                    record = {"error": "Error: Something went wrong while planning. Please try again."}
+                status = "failed" if "error" in record else "done"
+                count("bulk_plans_total", status=status)
+                yield {"index": index, "id": request_id, "status": status, **record}
+        finally:
+            for future in futures:
+                future.cancel()  # The client went away: don't plan what's still queued
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=wait, cancel_futures=True)
+                self._pool = None
@@ -0,0 +1,175 @@
+# Plan sessions: the places and distances of a destination kept between /plan requests
+# Users often plan the same city again with a higher budget or one more interest. Instead of rebuilding
+# the whole O(n^2) distance matrix, a session keeps every place it has seen with its distance rows:
+#   - places that are new get one row of distances to the places already known (k * n elements)
+#   - a smaller budget or fewer interests is just a slice of what's there, no API calls at all
+# The graph handed to the planning algorithms is always a fresh CompactGraph, so plans never share state.
+
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from api_test import _place_key, collect_places, get_lat_lon, iter_places
+from compact_graph import CompactGraph, NodeTable
+from distance_providers import ApiProvider, to_coords
+from metrics import count
+
+RADIUS = 5000               # Search radius in meters, same as city_packs.py
+MAX_SESSIONS = 64           # Destinations kept (least recently used dropped first)
+SESSION_TTL = 3600          # Seconds a session is reused for (places and ratings change slowly)
+MAX_SESSION_PLACES = 400    # Places kept per session; past that, places the current plan doesn't use are dropped
+
+_sessions = OrderedDict()   # session_key(destination) -> PlanSession
+_sessions_lock = threading.Lock()
+
+
+def session_key(destination):
+    return " ".join(str(destination).lower().split())
+
+
+class PlanSession:
+    """
+    The place set and distance matrix of one destination, grown and sliced as plans for it change.
+
+    Parameters:
+        destination (str): Where the trip goes.
+        lat, lon (float): The geocoded destination (center of the nearby searches).
+        radius (int): Search radius in meters.
+        provider (DistanceProvider): Where distances come from (defaults to the Distance Matrix API, like /plan).
+    """
+
+    def __init__(self, destination, lat, lon, radius=RADIUS, provider=None):
+        self.destination = destination
+        self.location = f"{lat}, {lon}"
+        self.radius = radius
+        self.provider = provider or ApiProvider()
+        self.created = time.time()
+        self.places = []                   # Row i of distances is places[i]
+        self.index = {}                    # _place_key -> row
+        self.coords = np.zeros((0, 2))
+        self.distances = np.zeros((0, 0))
+        self.lock = threading.Lock()       # One update at a time; the graphs handed out are copies
+
+    def __len__(self):
+        return len(self.places)
+
+    def add_places(self, places):
+        """
+        Add places (skipping known ones), fetching only the distances that involve the new ones.
+
+        Returns:
+            int: Number of places actually added.
+        """
+        new, seen = [], set()
+        for place in places:
+            key = _place_key(place)
+            if key in self.index or key in seen:
+                continue
+            if place.get("lat") is None or place.get("lon") is None:
+                place["lat"], place["lon"] = get_lat_lon(place["address"])
+                if place["lat"] is None or place["lon"] is None:
+                    continue
+            seen.add(key)
+            new.append(place)
+        if not new:
+            return 0
+
+        new_coords = to_coords(new)
+        across = self.provider.block(new_coords, self.coords)  # k x n: new places to the ones already here
+        among = self.provider.matrix(new_coords)                # k x k: the new places to each other
+
+        n, k = len(self.places), len(new)
+        distances = np.empty((n + k, n + k))
+        distances[:n, :n] = self.distances
+        distances[n:, :n] = across
+        distances[:n, n:] = across.T
+        distances[n:, n:] = among
+        self.distances = distances
+        self.coords = np.concatenate([self.coords, new_coords])
+        for place in new:
+            self.index[_place_key(place)] = len(self.places)
+            self.places.append(place)
+        return k
+
+    def remove_places(self, keys):
+        """
+        Forget places (by _place_key), dropping their rows and columns.
+
+        Returns:
+            int: Number of places removed.
+        """
+        drop = {self.index[key] for key in keys if key in self.index}
+        if not drop:
+            return 0
+        keep = np.array([row for row in range(len(self.places)) if row not in drop], dtype=np.int64)
+        self.distances = self.distances[np.ix_(keep, keep)]
+        self.coords = self.coords[keep]
+        self.places = [self.places[row] for row in keep]
+        self.index = {_place_key(place): row for row, place in enumerate(self.places)}
+        return len(drop)
+
+    def choose(self, interests, max_places):
+        """
+        The best max_places places for the interests, same ranking as a fresh plan (collect_places).
+        Result pages already fetched come from the geo cache, so only a bigger budget or a new interest
+        costs Places API calls.
+        """
+        return collect_places(iter_places(self.location, self.radius, interests), max_places)
+
+    def graph(self, places):
+        """
+        CompactGraph of the given places in this order, adding the ones the session doesn't know yet.
+        """
+        added = self.add_places(places)
+        count("session_places_total", added, help="Places of session plans, by whether their distances were fetched", outcome="fetched")
+
+        rows = [self.index[_place_key(place)] for place in places if _place_key(place) in self.index]
+        count("session_places_total", len(rows) - added, outcome="reused")
+        if len(self.places) > MAX_SESSION_PLACES:
+            wanted = set(rows)
+            self.remove_places([_place_key(place) for row, place in enumerate(self.places) if row not in wanted])
+            rows = [self.index[_place_key(place)] for place in places if _place_key(place) in self.index]
+        return self.slice(rows)
+
+    def slice(self, rows):
+        """
+        CompactGraph of some of the session's places (node i is rows[i]), same edges as create_compact_graph.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        chosen = [self.places[row] for row in rows]
+        distances = self.distances[np.ix_(rows, rows)]
+        i, j = np.triu_indices(len(rows), k=1)
+        weights = distances[i, j]
+        reachable = np.isfinite(weights)  # Same as edge_arrays: unreachable pairs get no edge
+        return CompactGraph.from_edges(NodeTable.from_places(chosen), i[reachable], j[reachable], weights[reachable])
+
+
+def open_session(destination, provider=None):
+    """
+    The session of a destination, geocoding it (and starting a new session) the first time.
+
+    Returns:
+        PlanSession: The session, or None if the destination can't be geocoded.
+    """
+    key = session_key(destination)
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is not None and time.time() - session.created < SESSION_TTL:
+            _sessions.move_to_end(key)
+            return session
+
+    lat, lon = get_lat_lon(destination)
+    if lat is None or lon is None:
+        return None
+    session = PlanSession(destination, lat, lon, provider=provider)
+    with _sessions_lock:
+        existing = _sessions.get(key)
+        if existing is not None and time.time() - existing.created < SESSION_TTL:
+            session = existing  # Another request started it meanwhile
+        _sessions[key] = session
+        _sessions.move_to_end(key)
+        while len(_sessions) > MAX_SESSIONS:
+            _sessions.popitem(last=False)
+    return session
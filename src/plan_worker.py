@@ -0,0 +1,48 @@
+# Worker side of the bulk planning API (plan_api.py): these functions run inside the process pool
+# Nothing from the project is imported at the top: a spawned worker imports this module before init_worker runs,
+# and importing utils / geo_cache before that would pick the wrong Maps backend and cache file
+
+import logging
+import os
+
+
+def init_worker(maps_api_url, page_token_delay, cache_path, scheduler_path):
+    """
+    Point a new worker at the same Maps backend, geo cache file and rate limits as the app that started it.
+    """
+    os.environ["MAPS_BACKEND"] = maps_api_url          # A URL, so a mock backend isn't started again in every worker
+    os.environ["GEO_CACHE_PATH"] = cache_path or ""      # Same SQLite file: every worker reuses what the others fetched
+    os.environ["SCHEDULER_DB_PATH"] = scheduler_path or ""  # Same token buckets: the app and its workers share one limit
+
+    import api_test
+    import metrics
+    import scheduler
+    import utils
+    utils.MAPS_API_URL = maps_api_url
+    api_test.PAGE_TOKEN_DELAY = page_token_delay
+    scheduler.lane.set(scheduler.BACKGROUND)  # Bulk plans only use what interactive /plan traffic leaves over
+    metrics.configure_logging()
+
+
+def plan_one(index, spec):
+    """
+    Run one plan and turn it into its compact record.
+
+    Returns:
+        tuple: (index, record or {"error": message}, Maps API requests this plan made)
+    """
+    from metrics import log
+    from planner import PlanError, run_plan
+    from plan_api import plan_record
+    from utils import REQUEST_COUNTS
+
+    before = REQUEST_COUNTS.copy()
+    try:
+        record = plan_record(run_plan(**spec), **spec)
+        record.pop("plan_id", None)  # The stored plan lives in this worker, its graph links wouldn't resolve in the app
+    except PlanError as error:
+        record = {"error": str(error)}
+    except Exception as error:
+        log("bulk_plan_failed", level=logging.ERROR, index=index, error=repr(error))
+        record = {"error": "Error: Something went wrong while planning. Please try again."}
+    return index, record, dict(REQUEST_COUNTS - before)
@@ -0,0 +1,253 @@
+# The whole /plan pipeline as one function, so it can run inside a Flask request or on a background worker (jobs.py)
+
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+from artifacts import artifact_key, graph_fingerprint, store
+from graph_export import PAYLOAD_VERSION, graph_payload, write_payload
+from graph_builder import visualize_graph, visualize_graph_interactive
+from dfs_algorithm import dfs_path
+from shortest_paths import ShortestPathService
+from layout import graph_layout
+from itinerary import plan_itinerary, split_days
+from api_client import MapsApiError
+from city_packs import load_pack
+from plan_session import open_session
+from utils import REQUEST_COUNTS
+from metrics import Stages, count, log, span
+from scheduler import QuotaExceeded
+
+# Pipeline stages in order, used for progress reporting
+STAGES = ["geocode", "places", "graph", "dfs", "dijkstra", "itinerary", "done"]
+
+# Visualizations a stored plan can be rendered as (see render_view)
+VIEWS = ("dfs", "dijkstra", "full", "image")
+MAX_STORED_PLANS = 256  # Finished plans kept for rendering later (least recently used dropped first)
+
+_plans = OrderedDict()  # plan_id -> what render_view needs
+_plans_lock = threading.Lock()
+
+
+class PlanError(Exception):
+    """
+    Something the user can fix (budget too low, unknown destination); the message is shown on the form.
+    """
+
+
+def check_budget(budget, duration): #tells user if budget is too low based on destination and duration
+    min_budget = 50 * int(duration) #at least 50 dollars a day (can change later)
+    if int (budget) < min_budget:
+        return False, min_budget
+    return True, min_budget
+
+
+def run_plan(destination, budget, duration, interests, progress=None):
+    """
+    Build the itineraries for a trip (the graph pictures are rendered later, on request, by render_view).
+
+    Parameters:
+        destination (str): Where the trip goes (any address the Geocoding API understands).
+        budget (int or str): Total budget in dollars.
+        duration (int or str): Number of days.
+        interests (list): Place types (e.g. ["museum", "restaurant"]); defaults to tourist attractions.
+        progress (callable): Optional progress(stage) callback, called as each stage in STAGES starts.
+
+    Returns:
+        dict: Everything results.html needs (G, dfs_itinerary, dijkstra_itinerary, optimized_itinerary, plan_id).
+
+    Raises:
+        PlanError: If the budget is too low, the destination can't be found or the Maps API can't answer
+                   (a plan is never built from a graph with missing distances).
+    """
+    stages = Stages("plan")  # Times every stage (see metrics.py)
+
+    def report(stage):
+        stages.start(stage)
+        if progress:
+            progress(stage)
+
+    requests_before = REQUEST_COUNTS.copy()
+
+    is_valid_budget, min_budget = check_budget(budget, duration)
+    if not is_valid_budget:
+        raise PlanError(f"Error: Budget is too low. Minimum budget is ${min_budget} for {duration} days.")
+
+    if not interests:
+        interests = ["tourist_attraction"]  # Default interest if none are selected
+
+    # Limit the output within budget (example: $50 per location per day)
+    max_places = int(budget) // (10 * int(duration))
+
+    # Popular destinations have a precomputed pack (see city_packs.py): no API calls at all, just slice it
+    pack = load_pack(destination)
+    if pack is not None and pack.covers(interests):
+        source = "pack"
+        report("places")
+        nodes = pack.select(interests, max_places)
+        report("graph")
+        graph = pack.graph(nodes)
+    else:
+        source = "live"
+        try:
+            graph = fetch_graph(destination, interests, max_places, report)
+        except QuotaExceeded:
+            raise PlanError("Error: We've reached today's limit of map searches. Please try again tomorrow.") from None
+        except MapsApiError:
+            # Better no plan than one built on a graph with missing edges
+            raise PlanError("Error: The maps service is busy right now. Please try again in a minute.") from None
+    count("plans_total", help="Plans by where their places came from", source=source)
+
+    # Run DFS
+    report("dfs")
+    dfs_result = dfs_path(graph, start_node=0, preference="rating")
+
+    # Run Dijkstra's n times for n number of days
+    # Day i goes from node i to node n-1-i; all days are solved in one batched search (see shortest_paths.py)
+    report("dijkstra")
+    all_short_paths = dict(enumerate(ShortestPathService(graph).day_paths(int(duration))))
+
+    dijkstra_result = []
+    for path in all_short_paths.keys():
+        dijkstra_result += all_short_paths[path]
+    log("plan_paths", level=logging.DEBUG, dfs=dfs_result, dijkstra=all_short_paths)
+
+    # The graphs are only drawn when someone opens them (/graph/<plan_id>/<view> in app.py), keep what they need
+    plan_id = save_plan(graph, dfs_result, dijkstra_result)
+
+    #split result into days
+    report("itinerary")
+    dfs_itinerary = split_days(dfs_result, int(duration))
+    dijkstra_itinerary = split_days(dijkstra_result, int(duration))
+
+    # One geographic cluster of places per day, each day visited in a short order (see itinerary.py)
+    optimized_itinerary = plan_itinerary(graph, int(duration))
+
+    report("done")
+    stages.finish()
+    log("plan", destination=destination, duration=int(duration), places=graph.number_of_nodes(), source=source,
+        requests=dict(REQUEST_COUNTS - requests_before), stages={stage: round(seconds, 4) for stage, seconds in stages.durations.items() if stage != "done"})
+    return {
+        "G": graph,
+        "dfs_itinerary": dfs_itinerary,
+        "dijkstra_itinerary": dijkstra_itinerary,
+        "optimized_itinerary": optimized_itinerary,
+        "plan_id": plan_id,
+    }
+
+
+def fetch_graph(destination, interests, max_places, report):
+    """
+    Build the place graph of a destination from live API calls (destinations without a city pack).
+
+    The destination's places and distances stay in a plan session (see plan_session.py), so planning it
+    again with another budget or interest only fetches the distances of places it hasn't seen yet.
+
+    Raises:
+        PlanError: If the destination can't be found.
+    """
+    # Geocode the destination (once per session)
+    report("geocode")
+    session = open_session(destination)
+    if session is None:
+        raise PlanError("Error: Unable to determine location. Please try again.")
+
+    with session.lock:
+        # Stream places for every interest page by page, keeping the best rated ones and stopping once we have enough
+        report("places")
+        places = session.choose(interests, max_places)
+
+        # Only the places new to the session get distances (k new rows instead of the whole matrix)
+        report("graph")
+        return session.graph(places)
+
+
+def save_plan(graph, dfs_result, dijkstra_result):
+    """
+    Keep a finished plan around so its graphs can be rendered later.
+
+    Returns:
+        str: Plan id, a hash of the graph and both paths (identical plans get the same id).
+    """
+    fingerprint = graph_fingerprint(graph)
+    plan_id = hashlib.sha256(f"{fingerprint}|{dfs_result}|{dijkstra_result}".encode("utf-8")).hexdigest()[:16]
+    with _plans_lock:
+        _plans[plan_id] = {
+            "graph": graph,
+            "fingerprint": fingerprint,
+            "dfs_result": dfs_result,
+            "dijkstra_result": dijkstra_result,
+        }
+        _plans.move_to_end(plan_id)
+        while len(_plans) > MAX_STORED_PLANS:
+            _plans.popitem(last=False)
+    return plan_id
+
+
+def get_plan(plan_id):
+    with _plans_lock:
+        return _plans.get(plan_id)
+
+
+def render_view(plan, view):
+    """
+    Render (or reuse) one visualization of a stored plan.
+
+    Every file is stored under a hash of the graph plus its highlighted path (see artifacts.py),
+    so identical plans reuse the files and concurrent plans never overwrite each other's graphs.
+
+    Parameters:
+        plan (dict): From get_plan.
+        view (str): One of VIEWS ("dfs", "dijkstra", "full", "image").
+
+    Returns:
+        file: The rendered HTML (or PNG for "image") open for reading; the caller closes it.
+    """
+    with span(f"render.{view}"):
+        return _render_view(plan, view)
+
+
+def _render_view(plan, view):
+    graph, fingerprint = plan["graph"], plan["fingerprint"]
+    pos = graph_layout(graph, fingerprint=fingerprint)  # One layout shared by every picture of this graph (see layout.py)
+
+    if view == "image":
+        # The plotting libraries need a real networkx graph, only built if the file actually has to be rendered
+        return store.get_or_render(artifact_key(fingerprint, "png"), "png",
+            lambda filename: visualize_graph(graph.to_networkx(), filename=filename, pos=pos))
+
+    edge_highlight, node_order, title = _view_options(plan, view)
+    key = artifact_key(fingerprint, "interactive", edge_highlight, node_order, title)
+    return store.get_or_render(key, "html", lambda filename: visualize_graph_interactive(
+        graph.to_networkx(), filename=filename, edge_highlight=edge_highlight, node_order=node_order, title=title, pos=pos))
+
+
+def render_payload(plan, view):
+    """
+    Build (or reuse) the gzipped JSON payload graph.html draws one view of a stored plan from (see graph_export.py).
+
+    Parameters:
+        plan (dict): From get_plan.
+        view (str): "dfs", "dijkstra" or "full".
+
+    Returns:
+        file: The .json.gz file open for reading; the caller closes it.
+    """
+    graph, fingerprint = plan["graph"], plan["fingerprint"]
+    edge_highlight, node_order, title = _view_options(plan, view)
+    key = artifact_key(fingerprint, f"payload-v{PAYLOAD_VERSION}", edge_highlight, node_order, title)
+    with span("render.payload"):
+        return store.get_or_render(key, "json.gz", lambda filename: write_payload(
+            graph_payload(graph, graph_layout(graph, fingerprint=fingerprint), edge_highlight, node_order, title), filename))
+
+
+def _view_options(plan, view):
+    # (edge_highlight, node_order, title) of an interactive view
+    if view == "dfs":
+        node_order = plan["dfs_result"]
+        return list(zip(node_order[:-1], node_order[1:])), node_order, "DFS Traversal Visualization"
+    if view == "dijkstra":
+        # Say your trip is 5 days, then we find the 5 shortest paths so one unique path per day
+        return list(zip(plan["dijkstra_result"][:-1], plan["dijkstra_result"][1:])), None, "Dijkstra's Shortest Path Visualization"
+    return None, None, "Interactive Graph"
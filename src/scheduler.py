@@ -0,0 +1,216 @@
+# Outbound request scheduler: every Maps API request waits here for its turn (see api_client.get_json)
+#   - token buckets per API, kept in SQLite so every worker process (gunicorn, the bulk pool) shares the same limit
+#   - two lanes: "interactive" (/plan) and "background" (bulk plans, city packs). Background requests always leave
+#     BACKGROUND_RESERVE of every bucket to interactive ones, in every process. Waiting interactive requests are
+#     only let through first within one process though: a bulk worker doesn't know the app process has some waiting.
+#   - a daily quota per API, so a runaway batch can't spend the whole day's budget. A request is checked against it
+#     before it waits for tokens, and throttled attempts (429 / OVER_QUERY_LIMIT, 5xx) are given back (refund)
+# Limits are in requests per second, except the Distance Matrix which Google meters in elements (origins x destinations).
+
+import contextvars
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from metrics import count, observe
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+
+# Google's default limits: ~50 QPS for Places and Geocoding, 60,000 Distance Matrix elements per minute.
+# Override with MAPS_RATE_LIMITS="places=10,geocode=50,distancematrix=1000" (0 turns a limit off).
+DEFAULT_RATE_LIMITS = {"places": 50, "geocode": 50, "distancematrix": 1000}
+# Daily budgets (same units), off unless set, e.g. MAPS_DAILY_QUOTAS="distancematrix=100000"
+DEFAULT_DAILY_QUOTAS = {}
+
+BURST_SECONDS = 1.0        # Bucket capacity: this many seconds worth of tokens can be spent at once
+BACKGROUND_RESERVE = 0.25  # Fraction of every bucket the background lane leaves for interactive requests
+MAX_SLEEP = 0.25           # Longest single sleep while waiting for tokens (re-checked after it)
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "scheduler.sqlite")
+
+lane = contextvars.ContextVar("lane", default=INTERACTIVE)  # Lane of the current request / job
+
+
+class QuotaExceeded(Exception):
+    """
+    The daily quota of an API is used up; no more requests until tomorrow (UTC).
+    """
+
+
+def parse_limits(text, defaults):
+    """
+    "places=10,distancematrix=1000" -> dict on top of the defaults.
+    """
+    limits = dict(defaults)
+    for item in (text or "").split(","):
+        if "=" in item:
+            api, value = item.split("=", 1)
+            limits[api.strip()] = float(value)
+    return {api: value for api, value in limits.items() if value > 0}
+
+
+def request_cost(api, params):
+    """
+    Tokens one request takes: 1, or origins x destinations for the Distance Matrix.
+    """
+    if api == "distancematrix":
+        return len(str(params.get("origins", "")).split("|")) * len(str(params.get("destinations", "")).split("|"))
+    return 1
+
+
+@contextmanager
+def background():
+    """
+    Run a block in the background lane (its requests yield to interactive ones).
+    """
+    token = lane.set(BACKGROUND)
+    try:
+        yield
+    finally:
+        lane.reset(token)
+
+
+class Scheduler:
+    """
+    Token-bucket rate limits and daily quotas per API, shared between processes through SQLite.
+
+    Parameters:
+        path (str): SQLite file shared by every process; None or "" keeps the buckets in this process only.
+        rate_limits (dict): api -> tokens per second.
+        daily_quotas (dict): api -> tokens per UTC day.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, rate_limits=None, daily_quotas=None):
+        self.path = path
+        self.rate_limits = dict(DEFAULT_RATE_LIMITS if rate_limits is None else rate_limits)
+        self.daily_quotas = dict(DEFAULT_DAILY_QUOTAS if daily_quotas is None else daily_quotas)
+        self._lock = threading.Lock()
+        self._interactive_waiting = 0  # Interactive requests of this process waiting for tokens
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path or ":memory:", check_same_thread=False, timeout=30, isolation_level=None)
+        if path:
+            self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS buckets (api TEXT PRIMARY KEY, tokens REAL, updated REAL)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS quota (api TEXT, day TEXT, used REAL, PRIMARY KEY (api, day))")
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            os.getenv("SCHEDULER_DB_PATH", DEFAULT_PATH),
+            parse_limits(os.getenv("MAPS_RATE_LIMITS"), DEFAULT_RATE_LIMITS),
+            parse_limits(os.getenv("MAPS_DAILY_QUOTAS"), DEFAULT_DAILY_QUOTAS),
+        )
+
+    def acquire(self, api, cost=1):
+        """
+        Charge the request to the daily quota, then block until it may be sent.
+        Call refund() if it turns out the API didn't bill it.
+
+        Raises:
+            QuotaExceeded: If the request would go over the API's daily quota (no rate limit tokens are taken then).
+        """
+        self._charge(api, cost)
+        interactive = lane.get() != BACKGROUND
+        rate = self.rate_limits.get(api)
+        start = time.perf_counter()
+        if rate:
+            capacity = rate * BURST_SECONDS
+            reserve = 0.0 if interactive else capacity * BACKGROUND_RESERVE
+            if interactive:
+                with self._lock:
+                    self._interactive_waiting += 1
+            try:
+                while True:
+                    if not interactive and self._interactive_waiting:
+                        time.sleep(MAX_SLEEP / 10)  # Interactive requests of this process go first
+                        continue
+                    wait = self._take(api, cost, rate, capacity, reserve)
+                    if wait <= 0:
+                        break
+                    time.sleep(min(wait, MAX_SLEEP))
+            finally:
+                if interactive:
+                    with self._lock:
+                        self._interactive_waiting -= 1
+        observe("scheduler_wait_seconds", time.perf_counter() - start, help="Time requests waited for a rate limit token",
+                api=api, lane=INTERACTIVE if interactive else BACKGROUND)
+
+    def refund(self, api, cost=1):
+        """
+        Give back the quota acquire() charged for a request the API didn't bill (throttled or a server error).
+        """
+        if not self.daily_quotas.get(api):
+            return
+        with self._lock, self._transaction():
+            self._db.execute("UPDATE quota SET used = MAX(used - ?, 0) WHERE api = ? AND day = ?", (cost, api, _today()))
+
+    def penalize(self, api, seconds=1.0):
+        """
+        The API answered 429: empty the bucket (for every process) so nobody sends anything for a while.
+        """
+        rate = self.rate_limits.get(api)
+        if not rate:
+            return
+        with self._lock, self._transaction():
+            self._db.execute("INSERT OR REPLACE INTO buckets VALUES (?, ?, ?)", (api, -rate * seconds, time.time()))
+
+    def quota_used(self):
+        """
+        Tokens used today per API.
+        """
+        with self._lock:
+            rows = self._db.execute("SELECT api, used FROM quota WHERE day = ?", (_today(),)).fetchall()
+        return dict(rows)
+
+    def _take(self, api, cost, rate, capacity, reserve):
+        # Refill the bucket, then take the tokens if there are enough. Returns 0, or seconds to wait before retrying.
+        now = time.time()
+        with self._lock, self._transaction():
+            row = self._db.execute("SELECT tokens, updated FROM buckets WHERE api = ?", (api,)).fetchone()
+            tokens = capacity if row is None else min(capacity, row[0] + (now - row[1]) * rate)
+            needed = min(cost, capacity) + reserve  # A request bigger than the whole bucket just drains it
+            if tokens >= needed:
+                tokens -= cost
+                wait = 0.0
+            else:
+                wait = (needed - tokens) / rate
+            self._db.execute("INSERT OR REPLACE INTO buckets VALUES (?, ?, ?)", (api, tokens, now))
+        return wait
+
+    def _charge(self, api, cost):
+        quota = self.daily_quotas.get(api)
+        day = _today()
+        with self._lock, self._transaction():
+            row = self._db.execute("SELECT used FROM quota WHERE api = ? AND day = ?", (api, day)).fetchone()
+            used = row[0] if row else 0.0
+            if quota and used + cost > quota:
+                exceeded = True
+            else:
+                exceeded = False
+                self._db.execute("INSERT OR REPLACE INTO quota VALUES (?, ?, ?)", (api, day, used + cost))
+        if exceeded:
+            count("quota_exceeded_total", help="Requests refused because the daily quota was used up", api=api)
+            raise QuotaExceeded(f"Daily {api} quota of {quota:g} is used up")
+
+    @contextmanager
+    def _transaction(self):
+        # BEGIN IMMEDIATE takes the write lock up front, so two processes can't both read the same token count
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        self._db.execute("COMMIT")
+
+
+def _today():
+    return time.strftime("%Y-%m-%d", time.gmtime())
+
+
+# Shared instance used by api_client (set SCHEDULER_DB_PATH="" to keep the limits per process)
+scheduler = Scheduler.from_env()
@@ -0,0 +1,128 @@
+# Shortest-path service around dijkstra_algorithm.py for plans that need several shortest paths on the same graph
+# (the /plan day loop asks for one path per day)
+#   - shortest-path trees are cached per source, so asking again from the same place is free
+#   - all the sources needed for a plan can be solved in one batched call (scipy's C Dijkstra over the CSR arrays)
+#   - small graphs can just solve all pairs up front
+#   - a single query without a cached tree runs one search that stops at the end node: Dijkstra's, or A* guided by
+#     the places' coordinates when the caller says the weights allow it (heuristic_scale, see astar_path)
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+
+from compact_graph import CompactGraph
+from dijkstra_algorithm import astar_path, dijkstra_path
+
+ALL_PAIRS_LIMIT = 300  # Graphs up to this many nodes get every tree at once (n^2 floats, ~0.7 MB at 300)
+
+
+class ShortestPathService:
+    """
+    Answers shortest-path queries on one graph, reusing work between queries.
+
+    Parameters:
+        graph (CompactGraph or nx.Graph): The graph to search (networkx graphs get converted once).
+        all_pairs_limit (int): Graphs with at most this many nodes solve all pairs on the first query.
+        heuristic_scale (float): Use A* with this scale for one-off queries (e.g. HEURISTIC_SCALE for great-circle
+                                 weights). Leave it None for road distances, A*'s guess isn't safe for those.
+    """
+
+    def __init__(self, graph, all_pairs_limit=ALL_PAIRS_LIMIT, heuristic_scale=None):
+        self.graph = graph if isinstance(graph, CompactGraph) else CompactGraph.from_networkx(graph)
+        self.all_pairs_limit = all_pairs_limit
+        self.heuristic_scale = heuristic_scale
+        self.trees = {}  # source -> (distances, predecessors) arrays
+        self.searches = 0  # Number of Dijkstra runs actually done (batched runs count once)
+        n = self.graph.number_of_nodes()
+        self._matrix = csr_matrix((self.graph.weights, self.graph.indices, self.graph.indptr), shape=(n, n))
+
+    def __contains__(self, node):
+        return node in self.graph.nodes
+
+    def prefetch(self, sources):
+        """
+        Solve the shortest-path trees of several sources in one batched search.
+
+        Parameters:
+            sources (iterable): Start nodes that will be queried.
+        """
+        n = self.graph.number_of_nodes()
+        if n <= self.all_pairs_limit:
+            sources = range(n)
+        missing = sorted({source for source in sources if source in self and source not in self.trees})
+        if not missing:
+            return
+        distances, predecessors = dijkstra(self._matrix, directed=False, indices=missing, return_predecessors=True)
+        self.searches += 1
+        for source, row_distances, row_predecessors in zip(missing, distances, predecessors):
+            self.trees[source] = (row_distances, row_predecessors)
+
+    def tree(self, source):
+        """
+        Full shortest-path tree of a source (cached).
+
+        Returns:
+            tuple: (distances, predecessors) arrays; predecessors are -9999 where there is none (scipy's convention).
+        """
+        if source not in self.trees:
+            self.prefetch([source])
+        return self.trees[source]
+
+    def path(self, start_node, end_node):
+        """
+        Shortest path between two nodes.
+
+        Returns:
+            tuple: (path, length) where path is a list of nodes from start to end ([] if unreachable
+            or a node is not in the graph) and length is the total distance (inf if unreachable).
+        """
+        if start_node not in self or end_node not in self:
+            return [], float("inf")
+
+        # Undirected graph: a cached tree from either end answers the query
+        if start_node in self.trees or end_node in self.trees:
+            if start_node in self.trees:
+                path = _walk_back(self.trees[start_node][1], end_node)
+                path.reverse()
+                length = self.trees[start_node][0][end_node]
+            else:
+                path = _walk_back(self.trees[end_node][1], start_node)
+                length = self.trees[end_node][0][start_node]
+            return (path, float(length)) if np.isfinite(length) else ([], float("inf"))
+
+        if self.graph.number_of_nodes() <= self.all_pairs_limit:
+            self.prefetch([start_node])
+            return self.path(start_node, end_node)
+
+        # One-off query: a search that heads for the end node and stops there is cheaper than a full tree
+        path = []
+        if self.heuristic_scale is None:
+            dijkstra_path(self.graph, path, start_node, end_node)
+        else:
+            astar_path(self.graph, path, start_node, end_node, scale=self.heuristic_scale)
+        self.searches += 1
+        if not path or path[0] != start_node:
+            return [], float("inf")
+        length = sum(self.graph.edge_weight(u, v) for u, v in zip(path[:-1], path[1:]))
+        return path, length
+
+    def day_paths(self, duration):
+        """
+        The per-day paths of a plan: day i goes from node i to node n - 1 - i, solved in one batched search.
+
+        Returns:
+            list: One path (list of nodes) per day; [] for days whose nodes don't exist.
+        """
+        n = self.graph.number_of_nodes()
+        pairs = [(day, n - 1 - day) for day in range(duration)]
+        self.prefetch(start for start, _ in pairs)
+        return [self.path(start, end)[0] for start, end in pairs]
+
+
+def _walk_back(predecessors, node):
+    # Follow the predecessors from node back to the tree's source (scipy marks "no predecessor" with a negative value)
+    path = [int(node)]
+    while predecessors[node] >= 0:
+        node = predecessors[node]
+        path.append(int(node))
+    return path
@@ -0,0 +1,121 @@
+# Spatial index over the places so we can find each place's nearest neighbours without looking at every pair
+# Used by create_graph(k=..., radius=...) to build a sparse graph instead of a complete one
+
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from scipy.spatial import cKDTree
+
+from distance_providers import EARTH_RADIUS_M
+
+
+def to_unit_xyz(coords):
+    """
+    Project [lat, lon] degrees onto the unit sphere.
+
+    Straight-line (chord) distance between these points grows with great-circle distance,
+    so a normal KD-tree on them gives correct nearest neighbours anywhere on Earth (no issues at the poles or the date line).
+    """
+    lat, lon = np.radians(np.asarray(coords, dtype=np.float64)).T
+    return np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+
+
+def meters_to_chord(meters):
+    # Great-circle distance in meters -> chord length on the unit sphere
+    return 2 * np.sin(np.asarray(meters, dtype=np.float64) / (2 * EARTH_RADIUS_M))
+
+
+def neighbor_pairs(coords, k=None, radius=None, tree=None):
+    """
+    Find the pairs of places that should be connected in a sparse graph.
+
+    Parameters:
+        coords (np.ndarray): (n, 2) array of [lat, lon] in degrees.
+        k (int): Connect every place to its k nearest neighbours.
+        radius (float): Connect every pair closer than this many meters (can be combined with k).
+        tree (cKDTree): Prebuilt tree over to_unit_xyz(coords), built here if not given.
+
+    Returns:
+        np.ndarray: (m, 2) array of unique pairs (i, j) with i < j, connected into a single component.
+    """
+    n = len(coords)
+    if n < 2:
+        return np.empty((0, 2), dtype=np.int64)
+    xyz = to_unit_xyz(coords)
+    if tree is None:
+        tree = cKDTree(xyz)
+
+    pairs = [np.empty((0, 2), dtype=np.int64)]
+    if k:
+        k = min(k, n - 1)
+        _, nearest = tree.query(xyz, k=k + 1)  # +1 because every point's nearest neighbour is itself
+        i = np.repeat(np.arange(n), k + 1)
+        pairs.append(np.column_stack([i, nearest.ravel()]))
+    if radius:
+        pairs.append(tree.query_pairs(meters_to_chord(radius), output_type="ndarray"))
+
+    pairs = np.concatenate(pairs).astype(np.int64)
+    pairs = pairs[pairs[:, 0] != pairs[:, 1]]
+    pairs = np.unique(np.sort(pairs, axis=1), axis=0)
+    return connect_components(xyz, pairs, tree)
+
+
+def connect_pairs(coords, pairs):
+    """
+    Bridge the components of an existing set of pairs, e.g. after edges without a distance were dropped.
+
+    Parameters:
+        coords (np.ndarray): (n, 2) array of [lat, lon] in degrees.
+        pairs (np.ndarray): (m, 2) array of unique pairs (i, j) with i < j.
+
+    Returns:
+        np.ndarray: pairs plus the bridging edges, still unique with i < j.
+    """
+    if len(coords) < 2:
+        return np.asarray(pairs, dtype=np.int64).reshape(-1, 2)
+    xyz = to_unit_xyz(coords)
+    return connect_components(xyz, np.asarray(pairs, dtype=np.int64).reshape(-1, 2), cKDTree(xyz))
+
+
+def connect_components(xyz, pairs, tree):
+    """
+    Add the shortest bridge between components until the graph is connected.
+
+    Every round, each component except the largest one gets linked to its closest point outside of it,
+    so the number of components at least halves each round (like Boruvka's MST algorithm).
+
+    Parameters:
+        xyz (np.ndarray): (n, 3) points on the unit sphere.
+        pairs (np.ndarray): (m, 2) edges so far.
+        tree (cKDTree): Tree over xyz.
+
+    Returns:
+        np.ndarray: pairs plus the bridging edges, still unique with i < j.
+    """
+    n = len(xyz)
+    while True:
+        graph = coo_matrix((np.ones(len(pairs)), (pairs[:, 0], pairs[:, 1])), shape=(n, n))
+        n_components, labels = connected_components(graph, directed=False)
+        if n_components <= 1:
+            return pairs
+
+        largest = np.argmax(np.bincount(labels))
+        bridges = []
+        for component in range(n_components):
+            if component == largest:
+                continue
+            members = np.flatnonzero(labels == component)
+            k = min(n, 8)
+            while True:
+                # Some of the k nearest neighbours of the members must be outside the component eventually
+                distances, nearest = tree.query(xyz[members], k=k)
+                distances, nearest = distances.reshape(len(members), -1), nearest.reshape(len(members), -1)
+                outside = labels[nearest] != component
+                if outside.any():
+                    distances = np.where(outside, distances, np.inf)
+                    row, col = np.unravel_index(np.argmin(distances), distances.shape)
+                    bridges.append(sorted((members[row], nearest[row, col])))
+                    break
+                k = min(n, k * 2)
+
+        pairs = np.unique(np.concatenate([pairs, np.array(bridges, dtype=np.int64)]), axis=0)
@@ -1,15 +1,102 @@
 # I had to create this file to avaoid a circular importing issue (using this function in graph_builder from api_test, then using other functions from graph_builder in api_test)
 
-import requests
-
 from dotenv import load_dotenv
 import os
+import threading
+from typing import List, Optional, TypedDict
+
+from api_client import MapsApiError, get_json, REQUEST_COUNTS
+from geo_cache import cache, distance_key
 
 load_dotenv()
 
 API_KEY = os.getenv('API_KEY')
 # Make sure to keep this API keep secret/secure ^^
 
+GOOGLE_MAPS_API_URL = "https://maps.googleapis.com/maps/api"
+
+# Which server the Places, Geocoding and Distance Matrix clients talk to (set MAPS_BACKEND in .env):
+#   "google" (default), "mock" (local stand-in started inside this process, see mock_maps_server.py)
+#   or the URL of any compatible server (e.g. a mock_maps_server.py running on its own)
+MAPS_BACKEND = os.getenv("MAPS_BACKEND", "google")
+mock_server = None  # The in-process stand-in when MAPS_BACKEND=mock
+
+
+def backend_url(backend):
+    """
+    Root URL of the Maps web services for a MAPS_BACKEND setting.
+
+    Parameters:
+        backend (str): "google", "mock" or a URL.
+
+    Returns:
+        str: The URL every client builds its endpoints from.
+    """
+    global mock_server
+    if backend == "google":
+        return GOOGLE_MAPS_API_URL
+    if backend == "mock":
+        if mock_server is None:
+            from mock_maps_server import MockMapsServer
+            mock_server = MockMapsServer.from_env().start()
+        return mock_server.url
+    if backend.startswith(("http://", "https://")):
+        return backend.rstrip("/")
+    raise ValueError(f"Unknown MAPS_BACKEND {backend!r} (use google, mock or a URL)")
+
+
+# Root of every Maps web service we call (read at call time, so tests can also point it somewhere else)
+# With MAPS_BACKEND=mock it stays None until the first request, so importing this module never starts a server
+MAPS_API_URL = None if MAPS_BACKEND == "mock" else backend_url(MAPS_BACKEND)
+_backend_lock = threading.Lock()
+
+
+def maps_api_url():
+    """
+    Root URL of the Maps web services, starting the mock server the first time it's needed.
+
+    Returns:
+        str: MAPS_API_URL, once it's set.
+    """
+    global MAPS_API_URL
+    if MAPS_API_URL is None:
+        with _backend_lock:  # Concurrent first requests must not start two mock servers
+            if MAPS_API_URL is None:
+                MAPS_API_URL = backend_url(MAPS_BACKEND)
+    return MAPS_API_URL
+
+
+class Place(TypedDict, total=False):
+    """
+    A place returned by the Places API. It's still a plain dict, so place["name"] etc. keep working.
+    """
+    name: str
+    address: str
+    rating: float
+    lat: Optional[float]
+    lon: Optional[float]
+    place_id: Optional[str]
+    types: List[str]
+    price_level: Optional[int]
+
+
+def place_from_result(result):
+    """
+    Convert one result of a Places API response into a Place, keeping the coordinates it already contains.
+    """
+    location = result.get("geometry", {}).get("location", {})
+    return Place(
+        name=str(result.get("name")),
+        address=str(result.get("vicinity")),
+        rating=result.get("rating", 0),
+        lat=location.get("lat"),
+        lon=location.get("lng"),
+        place_id=result.get("place_id"),
+        types=result.get("types", []),
+        price_level=result.get("price_level"),
+    )
+
+
 def get_distances(origin, destinations):
     """
     Calculate distances between an origin and multiple destinations using the Distance Matrix API.
@@ -19,27 +106,36 @@ def get_distances(origin, destinations):
         destinations (list): A list of destinations as "latitude,longitude".
 
     Returns:
-        list: A list of distances (in meters) corresponding to each destination.
+        list: A list of distances (in meters) corresponding to each destination (inf if unreachable).
+
+    Raises:
+        MapsApiError: If the request failed for good (a missing distance is never passed off as unreachable).
     """
-    base_url = "https://maps.googleapis.com/maps/api/distancematrix/json"
-    dest_str = "|".join(destinations)  # Join destinations with '|'
+    # Only ask the API for the pairs we haven't seen before
+    keys = [distance_key(origin, destination) for destination in destinations]
+    known = cache.get_many("distances", keys)
+    missing = [destination for destination, key in zip(destinations, keys) if key not in known]
+    if not missing:
+        return [known[key] for key in keys]
+
+    base_url = f"{maps_api_url()}/distancematrix/json"
+    dest_str = "|".join(missing)  # Join destinations with '|'
     params = {
         "origins": origin,
         "destinations": dest_str,
         "key": API_KEY,
     }
 
-    response = requests.get(base_url, params=params)
-
-    if response.status_code == 200:
-        data = response.json()
-        distances = []
-        for element in data["rows"][0]["elements"]:
-            if element["status"] == "OK":
-                distances.append(element["distance"]["value"])  # Distance in meters
-            else:
-                distances.append(float('inf'))  # To handle unreachable destinations
-        return distances
-    else:
-        print(f"Error: {response.status_code}")
-        return []
\ No newline at end of file
+    data = get_json("distancematrix", base_url, params)
+    if data is None or data.get("status") != "OK" or not data.get("rows"):
+        raise MapsApiError(f"Distance Matrix request failed ({data.get('status') if data else 'no response'})")
+
+    fetched = {}
+    for destination, element in zip(missing, data["rows"][0]["elements"]):
+        if element["status"] == "OK":
+            fetched[distance_key(origin, destination)] = element["distance"]["value"]  # Distance in meters
+        elif element["status"] == "ZERO_RESULTS":
+            fetched[distance_key(origin, destination)] = float('inf')  # To handle unreachable destinations
+    cache.set_many("distances", fetched)  # Pairs the API couldn't answer (e.g. NOT_FOUND) aren't cached
+    known.update(fetched)
+    return [known.get(key, float('inf')) for key in keys]
\ No newline at end of file
@@ -0,0 +1,65 @@
+# Shared setup for the tests: everything runs against a local MockMapsServer, never the real Maps API
+# The environment is set before any project module is imported, since utils / geo_cache / scheduler read it on import
+
+import os
+import sys
+from collections import OrderedDict
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+os.environ["GEO_CACHE_PATH"] = ""                 # Memory-only cache, so tests never touch data/geo_cache.sqlite
+os.environ["SCHEDULER_DB_PATH"] = ""              # Token buckets in this process only
+os.environ["MAPS_BACKEND"] = "http://127.0.0.1:9"  # Nothing listens here; every test points the clients at its own stub
+
+import pytest
+
+import api_client
+import api_test
+import city_packs
+import plan_session
+import utils
+from geo_cache import cache
+from mock_maps_server import MockMapsServer
+from scheduler import Scheduler
+
+
+@pytest.fixture(scope="session")
+def mock_server():
+    with MockMapsServer(city_size=40) as server:
+        yield server
+
+
+@pytest.fixture(autouse=True)
+def pack_dir(tmp_path, monkeypatch):
+    """
+    An empty city pack folder, so plans never pick up packs built into data/packs.
+    """
+    monkeypatch.setattr(city_packs, "PACK_DIR", str(tmp_path / "packs"))
+    return city_packs.PACK_DIR
+
+
+@pytest.fixture
+def maps(mock_server, monkeypatch):
+    """
+    The stub Maps API with a cold cache and zeroed counters, and no rate limit or backoff slowing the test down.
+    """
+    monkeypatch.setattr(plan_session, "_sessions", OrderedDict())  # Sessions hold places and distances too
+    monkeypatch.setattr(utils, "MAPS_API_URL", mock_server.url)
+    monkeypatch.setattr(api_test, "PAGE_TOKEN_DELAY", 0)
+    monkeypatch.setattr(api_client, "scheduler", Scheduler(None, {}))
+    monkeypatch.setattr(api_client, "BACKOFF_SECONDS", 0)
+    cache.clear()
+    mock_server.reset_count()
+    yield mock_server
+    cache.clear()
+
+
+@pytest.fixture
+def client(maps, tmp_path, monkeypatch):
+    """
+    Flask test client of the app, rendering graphs into a temporary folder instead of src/static/graphs.
+    """
+    import app
+    import planner
+    from artifacts import ArtifactStore
+    monkeypatch.setattr(planner, "store", ArtifactStore(str(tmp_path / "graphs")))
+    return app.app.test_client()
@@ -0,0 +1,91 @@
+# Content-addressed graph artifacts (artifacts.py): keys from the graph's content, each file rendered once,
+# and size / age eviction of the folder
+
+import os
+import threading
+import time
+
+import networkx as nx
+import pytest
+
+from artifacts import ArtifactStore, artifact_key, graph_fingerprint
+from compact_graph import CompactGraph
+
+
+def small_graph(weight=5.0):
+    G = nx.Graph()
+    G.add_nodes_from([(0, {"name": "Museum A", "address": "1 Main St", "rating": 4.5, "lat": 40.71, "lon": -74.0}),
+                      (1, {"name": "Park B", "address": "2 Main St", "rating": 4.2, "lat": 40.72, "lon": -74.0})])
+    G.add_edge(0, 1, weight=weight)
+    return G
+
+
+class Renderer:
+    # render(filename) that writes a fixed text and counts its calls; slow enough for callers to overlap
+    def __init__(self, text="<html></html>", delay=0.0):
+        self.text, self.delay, self.calls = text, delay, 0
+
+    def __call__(self, filename):
+        self.calls += 1
+        time.sleep(self.delay)
+        with open(filename, "w") as file:
+            file.write(self.text)
+
+
+def test_keys_follow_the_content():
+    fingerprint = graph_fingerprint(small_graph())
+    assert graph_fingerprint(CompactGraph.from_networkx(small_graph())) == fingerprint
+    assert graph_fingerprint(small_graph(weight=6.0)) != fingerprint
+
+    key = artifact_key(fingerprint, "interactive", highlight=[(0, 1)], order=[0, 1], title="DFS")
+    assert key == artifact_key(fingerprint, "interactive", highlight=[(0, 1)], order=[0, 1], title="DFS")
+    others = [artifact_key(fingerprint, "png", highlight=[(0, 1)], order=[0, 1], title="DFS"),
+              artifact_key(fingerprint, "interactive", order=[0, 1], title="DFS"),
+              artifact_key(fingerprint, "interactive", highlight=[(0, 1)], order=[1, 0], title="DFS"),
+              artifact_key(fingerprint, "interactive", highlight=[(0, 1)], order=[0, 1], title="Dijkstra")]
+    assert len({key, *others}) == 5
+
+
+def test_each_artifact_is_rendered_once(tmp_path):
+    store = ArtifactStore(str(tmp_path))
+    render = Renderer(delay=0.1)
+    files = []
+    threads = [threading.Thread(target=lambda: files.append(store.get_or_render("a" * 32, "html", render)))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert render.calls == 1
+    assert store.rendered == 1 and store.reused == 3
+    for file in files:
+        with file:
+            assert file.read() == b"<html></html>"
+    assert os.listdir(tmp_path) == ["a" * 32 + ".html"]
+
+
+def test_failed_render_leaves_nothing_behind(tmp_path):
+    store = ArtifactStore(str(tmp_path))
+
+    def render(filename):
+        open(filename, "w").close()
+        raise RuntimeError("renderer crashed")
+
+    with pytest.raises(RuntimeError):
+        store.get_or_render("b" * 32, "html", render)
+    assert os.listdir(tmp_path) == []
+
+
+def test_evict_removes_old_then_least_recently_used_files(tmp_path):
+    store = ArtifactStore(str(tmp_path), max_bytes=250, max_age=3600)
+    now = time.time()
+    for age, name in [(7200, "old"), (300, "older"), (200, "newer"), (100, "newest")]:
+        Renderer("x" * 100)(store.path(name, "html"))
+        os.utime(store.path(name, "html"), (now - age, now - age))
+
+    opened = store.get_or_render("older", "html", Renderer())  # Used just now, so it's the most recent again
+    assert store.evict() == 2
+    assert sorted(os.listdir(tmp_path)) == ["newest.html", "older.html"]
+    with opened:
+        assert opened.read() == b"x" * 100
@@ -0,0 +1,117 @@
+# Static asset build (assets.py): hashed, compressed and resized copies, the manifest, and /assets/ serving them
+
+import gzip
+import json
+import os
+
+import pytest
+from PIL import Image
+
+import assets
+
+CSS = ".backdrop { background: url('/static/images/photo.jpg'); }\n" + "p { margin: 0; }\n" * 100
+
+
+@pytest.fixture
+def static_dir(tmp_path):
+    """
+    A small src/static: one 1000px photo, a stylesheet using it, a tiny script, and a graph that isn't an asset.
+    """
+    static = tmp_path / "static"
+    (static / "images").mkdir(parents=True)
+    (static / "graphs").mkdir()
+    Image.new("RGB", (1000, 500), (40, 120, 200)).save(static / "images" / "photo.jpg")
+    (static / "style.css").write_text(CSS)
+    (static / "app.js").write_text("run();")
+    (static / "graphs" / "plan.html").write_text("<html></html>")
+    return str(static)
+
+
+@pytest.fixture
+def built(static_dir, tmp_path, monkeypatch):
+    out_dir = str(tmp_path / "assets")
+    monkeypatch.setattr(assets, "BUILD_DIR", out_dir)
+    return assets.build(static_dir, out_dir, extra={}), out_dir
+
+
+def test_images_get_resized_variants_and_a_fallback(built):
+    manifest, out_dir = built
+    entry = manifest["images"]["images/photo.jpg"]
+    assert (entry["width"], entry["height"]) == (1000, 500)
+    for mime, files in entry["sources"].items():
+        assert [width for _, width in files] == [480, 960, 1000]  # Never wider than the original
+        for file, width in files:
+            with Image.open(os.path.join(out_dir, file)) as image:
+                assert image.width == width and image.get_format_mimetype() == mime
+    assert entry["fallback"].endswith(".1000w.jpg")
+    assert "graphs/plan.html" not in manifest["text"]
+
+
+def test_text_is_hashed_and_precompressed_when_worth_it(built):
+    manifest, out_dir = built
+    css, js = manifest["text"]["style.css"], manifest["text"]["app.js"]
+    assert css["file"].startswith("style.") and css["file"] != "style.css"
+    assert "gzip" in css["encodings"]
+    assert js["encodings"] == []  # Under MIN_COMPRESS_SIZE
+
+    with open(os.path.join(out_dir, css["file"]), "rb") as file:
+        data = file.read()
+    with open(os.path.join(out_dir, css["file"] + ".gz"), "rb") as file:
+        assert gzip.decompress(file.read()) == data
+    # The stylesheet points at the built image instead of /static
+    fallback = manifest["images"]["images/photo.jpg"]["fallback"]
+    assert f"url('/assets/{fallback}')" in data.decode()
+    assert set(manifest["files"]) == {css["file"], js["file"], fallback} | {
+        file for files in manifest["images"]["images/photo.jpg"]["sources"].values() for file, _ in files}
+
+
+def test_rebuild_keeps_names_and_replaces_the_folder(built, static_dir):
+    manifest, out_dir = built
+    with open(os.path.join(out_dir, "stale.txt"), "w") as file:
+        file.write("left over")
+
+    assert assets.build(static_dir, out_dir, extra={}) == manifest  # Same content, same names
+    assert not os.path.exists(os.path.join(out_dir, "stale.txt"))
+    with open(os.path.join(out_dir, assets.MANIFEST)) as file:
+        assert json.load(file) == manifest
+
+
+def test_urls_pictures_and_lookups(built):
+    manifest, out_dir = built
+    css = manifest["text"]["style.css"]["file"]
+    assert assets.url("style.css") == "/assets/" + css
+    assert assets.url("missing.css") is None
+
+    html = assets.picture("images/photo.jpg", alt="Photo")
+    assert '<source type="image/webp"' in html and 'width="1000" height="500"' in html
+    assert assets.picture("images/missing.jpg", fallback_url="/static/images/missing.jpg") == \
+        '<picture><img src="/static/images/missing.jpg" alt=""></picture>'
+
+    assert assets.locate(css, "gzip, deflate") == (os.path.join(out_dir, css + ".gz"), "gzip")
+    assert assets.locate(css, "") == (os.path.join(out_dir, css), None)
+    assert assets.locate("style.css") == (None, None)  # Only built files are served
+
+
+def test_no_build_falls_back_to_static(tmp_path):
+    out_dir = str(tmp_path / "nothing")
+    assert assets.url("style.css", out_dir) is None
+    assert assets.locate("style.css", out_dir=out_dir) == (None, None)
+
+
+def test_assets_route_serves_built_files(built, client):
+    manifest, _ = built
+    css = manifest["text"]["style.css"]["file"]
+
+    response = client.get(f"/assets/{css}", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(response.data).decode().endswith("p { margin: 0; }\n")
+    assert response.cache_control.immutable and response.cache_control.max_age == assets.MAX_AGE
+    assert "Accept-Encoding" in response.headers["Vary"]
+
+    plain = client.get(f"/assets/{css}")
+    assert "Content-Encoding" not in plain.headers and plain.mimetype == "text/css"
+    assert client.get("/assets/style.css").status_code == 404
+    assert client.get("/assets/../requests.jsonl").status_code == 404
+
+    assert f'href="/assets/{css}"' in client.get("/").get_data(as_text=True)
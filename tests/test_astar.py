@@ -0,0 +1,104 @@
+# A* and bidirectional Dijkstra (dijkstra_algorithm.py) find the same paths as Dijkstra's
+# on networkx and compact graphs, and on a graph built from the stub's road distances
+
+import random
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from compact_graph import CompactGraph, NodeTable
+from dfs_algorithm import dfs_path
+from dijkstra_algorithm import astar_path, bidirectional_dijkstra_path, dijkstra_path
+from distance_providers import ApiProvider, HaversineProvider, haversine_pairs, to_coords
+from graph_builder import create_graph, edge_arrays
+from shortest_paths import ShortestPathService
+
+ALGORITHMS = [dijkstra_path, astar_path, bidirectional_dijkstra_path]
+
+
+def random_places(n, seed=0):
+    rng = random.Random(seed)
+    return [{"name": f"Place {i}", "address": f"{i} Main St", "rating": round(rng.uniform(1, 5), 1),
+             "lat": 40.7 + rng.uniform(-0.05, 0.05), "lon": -74.0 + rng.uniform(-0.05, 0.05)} for i in range(n)]
+
+
+def road_like_graph(n, k=4, seed=0):
+    # Sparse graph whose edges are great-circle distances times a detour of 1.0 - 1.5, like roads
+    places = random_places(n, seed)
+    rows, cols, _ = edge_arrays(places, k=k, provider=HaversineProvider())
+    weights = haversine_pairs(to_coords(places), rows, cols) * np.random.default_rng(seed).uniform(1.0, 1.5, len(rows))
+    return CompactGraph.from_edges(NodeTable.from_places(places), rows, cols, weights)
+
+
+def queries(n, count=30, seed=0):
+    rng = random.Random(seed)
+    return [(rng.randrange(n), rng.randrange(n)) for _ in range(count)] + [(0, 0)]
+
+
+def check_path(graph, path, start, end, length):
+    assert path[0] == start and path[-1] == end
+    total = sum(graph.edge_weight(u, v) if isinstance(graph, CompactGraph) else graph[u][v]["weight"]
+                for u, v in zip(path[:-1], path[1:]))
+    assert total == pytest.approx(length, rel=1e-6)
+
+
+@pytest.mark.parametrize("as_networkx", [False, True])
+def test_algorithms_find_equally_short_paths(as_networkx):
+    graph = road_like_graph(150)
+    if as_networkx:
+        graph = graph.to_networkx()
+
+    for start, end in queries(150):
+        expected = nx.dijkstra_path_length(graph if as_networkx else graph.to_networkx(), start, end)
+        for algorithm in ALGORITHMS:
+            path = []
+            length = algorithm(graph, path, start, end)
+            assert length == pytest.approx(expected, rel=1e-6), algorithm.__name__
+            check_path(graph, path, start, end, length)
+
+
+def test_astar_settles_fewer_nodes():
+    graph = road_like_graph(400)
+    dijkstra_stats, astar_stats = {}, {}
+    for start, end in queries(400):
+        dijkstra_path(graph, [], start, end, dijkstra_stats)
+        astar_path(graph, [], start, end, astar_stats)
+    assert astar_stats["settled"] < dijkstra_stats["settled"]
+
+
+def test_astar_without_coordinates_is_plain_dijkstra():
+    graph = road_like_graph(100).to_networkx()
+    for node in graph.nodes:
+        del graph.nodes[node]["lat"], graph.nodes[node]["lon"]
+
+    for start, end in queries(100, count=10):
+        dijkstra_stats, astar_stats = {}, {}
+        expected = dijkstra_path(graph, [], start, end, dijkstra_stats)
+        assert astar_path(graph, [], start, end, astar_stats) == pytest.approx(expected, rel=1e-6)
+        assert astar_stats["settled"] == dijkstra_stats["settled"]
+
+
+def test_unreachable_end_node():
+    graph = nx.Graph()
+    graph.add_nodes_from([(0, {"lat": 40.70, "lon": -74.0}), (1, {"lat": 40.71, "lon": -74.0}), (2, {"lat": 40.72, "lon": -74.0})])
+    graph.add_edge(0, 1, weight=1500.0)
+    for algorithm in ALGORITHMS:
+        assert algorithm(graph, [], 0, 2) == float("inf")
+        assert algorithm(CompactGraph.from_networkx(graph), [], 0, 2) == float("inf")
+    assert ShortestPathService(graph).path(0, 2) == ([], float("inf"))
+
+
+def test_algorithms_agree_on_stub_road_distances(maps):
+    places = random_places(30, seed=1)
+    graph = create_graph(places, provider=ApiProvider())
+    assert maps.request_count > 0
+
+    compact = CompactGraph.from_networkx(graph)
+    day_paths = ShortestPathService(graph).day_paths(3)
+    for day, path in enumerate(day_paths):
+        start, end = day, 29 - day
+        lengths = {algorithm.__name__: algorithm(compact, [], start, end) for algorithm in ALGORITHMS}
+        assert max(lengths.values()) == pytest.approx(min(lengths.values()), rel=1e-6), lengths
+        check_path(graph, path, start, end, lengths["dijkstra_path"])
+    assert sorted(dfs_path(graph, start_node=0, preference="rating")) == list(range(30))
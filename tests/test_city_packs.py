@@ -0,0 +1,64 @@
+# Precomputed city packs (city_packs.py): built once from the stub API, then planned from with no API calls
+
+import json
+import os
+
+import numpy as np
+
+from city_packs import CityPack, build_pack, list_packs, load_pack
+from distance_providers import ApiProvider
+from planner import run_plan
+from utils import REQUEST_COUNTS
+
+INTERESTS = ["museum", "park"]
+
+
+def test_pack_holds_the_places_and_their_distances(maps, pack_dir):
+    path = build_pack("New York", INTERESTS)
+    pack = load_pack("  new   YORK ")
+    assert pack is not None and pack.path == path
+    assert pack is load_pack("New York")  # Opened once, shared by every request
+    assert len(pack) == 80 and pack.covers(["park"]) and not pack.covers(["restaurant"])
+
+    museums = pack.select(["museum"], 10)
+    ratings = pack.ratings[museums]
+    assert len(museums) == 10 and (np.diff(ratings) <= 0).all()
+    assert all(pack.types[node] & 1 for node in museums)
+
+    nodes = pack.select(INTERESTS, 6)
+    places = pack.places(nodes)
+    assert all(place["name"] and place["place_id"] for place in places)
+    expected = ApiProvider().matrix(np.array([[place["lat"], place["lon"]] for place in places]))
+    graph = pack.graph(nodes)
+    assert graph.number_of_edges() == 15
+    assert graph.edge_weight(0, 5) == expected[0, 5]
+    assert [meta["destination"] for meta in list_packs()] == ["New York"]
+
+
+def test_plan_from_a_pack_makes_no_requests(maps, pack_dir):
+    build_pack("New York", INTERESTS)
+    before = REQUEST_COUNTS.copy()
+    plan = run_plan("new york", 2000, 2, ["museum"])
+    assert REQUEST_COUNTS - before == {}
+    assert plan["G"].number_of_nodes() > 2
+
+    run_plan("new york", 2000, 2, ["restaurant"])  # Not in the pack: planned live
+    assert REQUEST_COUNTS - before
+
+
+def test_broken_or_rebuilt_packs(maps, pack_dir):
+    path = build_pack("Rome", ["museum"])
+    first = load_pack("Rome")
+
+    meta_path = os.path.join(path, "meta.json")
+    with open(meta_path, encoding="utf-8") as file:
+        meta = json.load(file)
+    with open(meta_path, "w", encoding="utf-8") as file:
+        json.dump({**meta, "version": 0}, file)
+    os.utime(meta_path, ns=(0, 0))  # A different mtime, so the pack is opened again
+    assert load_pack("Rome") is None  # Unreadable packs are ignored, /plan goes live instead
+
+    build_pack("Rome", ["museum"])
+    again = load_pack("Rome")
+    assert isinstance(again, CityPack) and again is not first
+    assert load_pack("Nowhere") is None
@@ -0,0 +1,65 @@
+# CompactGraph (compact_graph.py): the CSR arrays hold the same graph as the networkx.Graph they replace
+
+import random
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from compact_graph import CompactGraph, NodeTable
+
+
+def random_graph(n=40, edges=120, seed=0):
+    rng = random.Random(seed)
+    G = nx.Graph()
+    for node in range(n):
+        G.add_node(node, name=f"Place {node}", address=f"{node} Main St", rating=round(rng.uniform(1, 5), 1),
+                   lat=40.7 + rng.uniform(-0.05, 0.05), lon=-74.0 + rng.uniform(-0.05, 0.05))
+    while G.number_of_edges() < edges:
+        u, v = rng.sample(range(n - 1), 2)  # The last node stays isolated
+        G.add_edge(u, v, weight=round(rng.uniform(100, 5000), 1))
+    return G
+
+
+def test_networkx_round_trip():
+    G = random_graph()
+    compact = CompactGraph.from_networkx(G)
+    back = compact.to_networkx()
+
+    assert compact.number_of_nodes() == back.number_of_nodes() == 40
+    assert compact.number_of_edges() == back.number_of_edges() == 120
+    assert sorted(map(sorted, back.edges())) == sorted(map(sorted, G.edges()))
+    for u, v, weight in G.edges(data="weight"):
+        assert back[u][v]["weight"] == pytest.approx(weight, rel=1e-6)  # Weights are float32
+        assert compact.edge_weight(u, v) == compact.edge_weight(v, u) == pytest.approx(weight, rel=1e-6)
+    for node in G.nodes:
+        assert back.nodes[node] == compact.nodes[node] == G.nodes[node]
+
+
+def test_neighbours_are_sorted_csr_slices():
+    G = random_graph(seed=1)
+    compact = CompactGraph.from_networkx(G)
+    for node in G.nodes:
+        neighbours, weights = compact.neighbor_arrays(node)
+        assert neighbours.tolist() == sorted(G.neighbors(node))
+        assert list(compact.neighbors(node)) == neighbours.tolist()
+        assert len(weights) == len(neighbours)
+    assert list(compact.neighbors(39)) == []  # Isolated node: an empty slice at the end of the arrays
+
+
+def test_missing_edges_and_nodes():
+    compact = CompactGraph.from_networkx(random_graph())
+    with pytest.raises(KeyError):
+        compact.edge_weight(39, 0)
+    assert 39 in compact and 40 not in compact and -1 not in compact
+    assert list(compact.nodes) == list(range(40))
+
+
+def test_from_edges_matches_from_networkx():
+    G = random_graph(seed=2)
+    places = [G.nodes[node] for node in G.nodes]
+    rows, cols, weights = np.array([(u, v, w) for u, v, w in G.edges(data="weight")]).T
+    compact = CompactGraph.from_edges(NodeTable.from_places(places), rows, cols, weights)
+    expected = CompactGraph.from_networkx(G)
+    for array in ("indptr", "indices", "weights"):
+        assert np.array_equal(getattr(compact, array), getattr(expected, array))
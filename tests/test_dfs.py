@@ -0,0 +1,63 @@
+# Iterative dfs_path (dfs_algorithm.py): same traversal on networkx and compact graphs, no recursion limit,
+# and the max_depth / max_nodes limits
+
+import random
+import sys
+
+import networkx as nx
+import numpy as np
+
+from compact_graph import CompactGraph, NodeTable
+from dfs_algorithm import dfs_path
+from spatial_index import neighbor_pairs
+
+
+def places(n, seed=0):
+    rng = random.Random(seed)
+    return [{"name": f"Place {i}", "address": "", "rating": round(rng.uniform(1, 5), 1),
+             "lat": 40.7 + rng.uniform(-0.05, 0.05), "lon": -74.0 + rng.uniform(-0.05, 0.05)} for i in range(n)]
+
+
+def sparse_graph(n, k=4, seed=0):
+    nodes = places(n, seed)
+    pairs = neighbor_pairs(np.array([[place["lat"], place["lon"]] for place in nodes]), k=k)
+    return CompactGraph.from_edges(NodeTable.from_places(nodes), pairs[:, 0], pairs[:, 1], np.ones(len(pairs)))
+
+
+def chain(n):
+    # 0 - 1 - 2 - ... - n-1
+    return CompactGraph.from_edges(NodeTable.from_places(places(n)), np.arange(n - 1), np.arange(1, n), np.ones(n - 1))
+
+
+def test_dfs_visits_every_node_once():
+    graph = sparse_graph(120)
+    for preference in (None, "rating"):
+        compact = dfs_path(graph, start_node=5, preference=preference)
+        assert compact[0] == 5
+        assert sorted(compact) == list(range(120))
+        # Same traversal on the networkx version of the graph
+        assert dfs_path(graph.to_networkx(), start_node=5, preference=preference) == compact
+
+
+def test_deep_graph_does_not_hit_the_recursion_limit():
+    n = sys.getrecursionlimit() * 3
+    graph = chain(n)
+    assert dfs_path(graph, start_node=0) == list(range(n))
+    assert dfs_path(graph.to_networkx(), start_node=n - 1, preference="rating") == list(range(n - 1, -1, -1))
+
+
+def test_complete_graph_is_visited_best_rated_first():
+    graph = nx.complete_graph(50)
+    rng = random.Random(2)
+    nx.set_node_attributes(graph, {node: round(rng.uniform(1, 5), 1) for node in graph}, "rating")
+    path = dfs_path(graph, start_node=0, preference="rating")
+    ratings = [graph.nodes[node]["rating"] for node in path[1:]]
+    assert ratings == sorted(ratings, reverse=True)
+    assert path == dfs_path(CompactGraph.from_networkx(graph), start_node=0, preference="rating")
+
+
+def test_depth_and_node_limits():
+    graph = chain(100)
+    assert dfs_path(graph, start_node=10, max_depth=3) == [10, 9, 8, 7, 11, 12, 13]
+    assert dfs_path(graph, start_node=10, max_nodes=5) == [10, 9, 8, 7, 6]
+    assert len(dfs_path(sparse_graph(200), start_node=0, preference="rating", max_nodes=25)) == 25
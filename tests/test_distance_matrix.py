@@ -0,0 +1,81 @@
+# Distance matrix tiling, mirroring and caching (distance_matrix.py) against the stub Maps API
+
+import random
+
+import numpy as np
+import pytest
+
+from distance_matrix import MAX_ELEMENTS, TILE_SIZE, build_distance_block, build_distance_matrix, plan_tiles
+from distance_providers import ApiProvider
+from graph_builder import create_graph
+from mock_maps_server import ROAD_FACTOR, haversine_m
+
+
+def random_coords(n, seed=0):
+    rng = random.Random(seed)
+    return [f"{40.7 + rng.uniform(-0.05, 0.05):.6f},{-74.0 + rng.uniform(-0.05, 0.05):.6f}" for _ in range(n)]
+
+
+def stub_distance(a, b):
+    # What the stub answers for one pair
+    return round(haversine_m(a, b) * ROAD_FACTOR)
+
+
+@pytest.mark.parametrize("n", [1, 2, 9, 10, 11, 25, 37])
+def test_tiles_cover_upper_half_once(n):
+    covered = np.zeros((n, n), dtype=int)
+    for origins, destinations in plan_tiles(n):
+        assert len(origins) * len(destinations) <= MAX_ELEMENTS
+        assert origins.start <= destinations.start  # Never a tile below the diagonal
+        covered[origins.start:origins.stop, destinations.start:destinations.stop] += 1
+    assert (covered[np.triu_indices(n)] == 1).all()
+    # The only pairs below the diagonal that get requested are the ones inside the diagonal tiles
+    rows, cols = np.tril_indices(n, k=-1)
+    assert (covered[rows, cols] == (rows // TILE_SIZE == cols // TILE_SIZE)).all()
+
+
+def test_matrix_is_mirrored_from_the_tiles(maps):
+    coords = random_coords(23)
+    matrix = build_distance_matrix(coords)
+
+    n = len(coords)
+    assert maps.request_count == len(plan_tiles(n, TILE_SIZE))
+    assert (np.diag(matrix) == 0).all()
+    assert (matrix == matrix.T).all()
+    for i in range(n):
+        for j in range(i + 1, n):
+            assert matrix[i, j] == stub_distance(coords[i], coords[j])
+
+
+def test_matrix_is_answered_from_the_cache(maps):
+    coords = random_coords(15)
+    first = build_distance_matrix(coords)
+    maps.reset_count()
+
+    assert (build_distance_matrix(coords) == first).all()
+    assert maps.request_count == 0
+
+    # One new place: only the tiles with its pairs are requested again
+    build_distance_matrix(coords + random_coords(1, seed=1))
+    assert maps.request_count == 2
+
+
+def test_graph_takes_one_request_per_tile(maps):
+    coords = random_coords(24)
+    places = [{"name": str(i), "address": "", "rating": 4.0, "lat": float(lat), "lon": float(lon)}
+              for i, (lat, lon) in enumerate(coord.split(",") for coord in coords)]
+    graph = create_graph(places, provider=ApiProvider())
+
+    assert maps.request_count == len(plan_tiles(24)) == 6  # Instead of 24 * 23 / 2 = 276 calls
+    assert graph.number_of_edges() == 24 * 23 // 2
+    assert graph[0][23]["weight"] == stub_distance(coords[0], coords[23])
+
+
+def test_block_matches_the_full_matrix(maps):
+    coords = random_coords(14)
+    matrix = build_distance_matrix(coords)
+    maps.reset_count()
+
+    block = build_distance_block(coords[:3], coords[3:])
+    assert (block == matrix[:3, 3:]).all()
+    assert maps.request_count == 0  # Every pair is known in one direction or the other
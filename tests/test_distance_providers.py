@@ -0,0 +1,71 @@
+# Distance providers (distance_providers.py): great-circle distances computed locally, road distances from the
+# stub's Distance Matrix, and the hybrid that only asks the API for each place's nearest neighbours
+
+import random
+
+import numpy as np
+import pytest
+
+from api_client import MapsApiError
+from distance_providers import (ApiProvider, DistanceProvider, HaversineProvider, HybridProvider, haversine_matrix,
+                                haversine_pairs)
+from mock_maps_server import ROAD_FACTOR, haversine_m
+
+
+def random_coords(n, seed=0):
+    rng = random.Random(seed)
+    return np.array([[40.7 + rng.uniform(-0.05, 0.05), -74.0 + rng.uniform(-0.05, 0.05)] for _ in range(n)])
+
+
+def stub_distance(a, b):
+    return round(haversine_m(f"{a[0]},{a[1]}", f"{b[0]},{b[1]}") * ROAD_FACTOR)
+
+
+class FailingProvider(DistanceProvider):
+    def pairs(self, coords, i, j):
+        raise MapsApiError("OVER_DAILY_LIMIT from distancematrix")
+
+
+def test_haversine_distances():
+    paris, london = [48.8566, 2.3522], [51.5074, -0.1278]
+    assert haversine_matrix([paris, london])[0, 1] == pytest.approx(343_500, rel=0.005)
+
+    coords = random_coords(30)
+    matrix = HaversineProvider().matrix(coords)
+    assert (np.diag(matrix) == 0).all() and np.allclose(matrix, matrix.T)
+
+    i, j = np.triu_indices(30, k=1)
+    assert np.allclose(haversine_pairs(coords, i, j), matrix[i, j])
+    assert np.allclose(HaversineProvider().block(coords[:4], coords[4:]), matrix[:4, 4:])
+    assert np.allclose(HaversineProvider(road_factor=1.3).matrix(coords), matrix * 1.3)
+
+
+def test_api_pairs_are_road_distances(maps):
+    coords = random_coords(12)
+    i, j = np.array([0, 0, 3, 7]), np.array([1, 11, 4, 2])
+    distances = ApiProvider().pairs(coords, i, j)
+
+    assert distances.tolist() == [stub_distance(coords[a], coords[b]) for a, b in zip(i, j)]
+    assert maps.request_count == 3  # One request per origin
+
+
+def test_hybrid_refines_only_the_nearest_neighbours(maps):
+    coords = random_coords(20)
+    estimate = HaversineProvider().matrix(coords)
+    matrix = HybridProvider(k=3).matrix(coords)
+
+    refined = matrix != estimate
+    assert np.array_equal(refined, refined.T)
+    assert 20 * 3 // 2 <= refined.sum() // 2 <= 20 * 3
+    for a, b in zip(*np.nonzero(refined)):
+        assert matrix[a, b] == stub_distance(coords[a], coords[b])
+    # Every place's nearest neighbour got a road distance
+    nearest = np.argsort(estimate + np.diag(np.full(20, np.inf)), axis=1)[:, 0]
+    assert refined[np.arange(20), nearest].all()
+    assert maps.request_count <= 20
+
+
+def test_hybrid_keeps_the_estimates_when_the_api_fails():
+    coords = random_coords(10)
+    matrix = HybridProvider(k=3, refine=FailingProvider()).matrix(coords)
+    assert np.array_equal(matrix, HaversineProvider().matrix(coords))
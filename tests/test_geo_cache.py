@@ -0,0 +1,115 @@
+# GeoCache TTL and LRU eviction in both tiers (geo_cache.py), and the Maps API lookups it answers
+
+import os
+import random
+
+import numpy as np
+
+import geo_cache
+from api_test import get_lat_lon, get_nearby_places
+from distance_matrix import build_distance_block
+from fixtures import save_fixture
+from geo_cache import GeoCache, cache, distance_key
+from utils import get_distances
+
+
+class Clock:
+    # Stands in for time.time inside geo_cache, so TTLs can expire without waiting
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire_after_their_namespace_ttl(monkeypatch, tmp_path):
+    clock = Clock()
+    monkeypatch.setattr(geo_cache.time, "time", clock)
+    cache = GeoCache(str(tmp_path / "cache.sqlite"), ttls={"places": 10, "geocode": 100})
+    cache.set("places", "a", [1])
+    cache.set("geocode", "a", [2])
+
+    clock.now += 50
+    assert cache.get("places", "a") is None
+    assert cache.get("geocode", "a") == [2]
+
+    # Gone from disk too, not just from memory
+    cache._memory.clear()
+    assert cache.get("places", "a") is None
+    assert cache.get("geocode", "a") == [2]
+
+
+def test_memory_tier_drops_least_recently_used():
+    cache = GeoCache(None, max_memory_entries=2)
+    cache.set("distances", "a", 1.0)
+    cache.set("distances", "b", 2.0)
+    cache.get("distances", "a")  # Now b is the least recently used
+    cache.set("distances", "c", 3.0)
+
+    assert cache.get_many("distances", ["a", "b", "c"]) == {"a": 1.0, "c": 3.0}
+    assert cache.stats["memory_evictions"] == 1
+
+
+def test_disk_tier_answers_what_memory_dropped(tmp_path):
+    cache = GeoCache(str(tmp_path / "cache.sqlite"), max_memory_entries=1)
+    cache.set("distances", "a", 1.0)
+    cache.set("distances", "b", 2.0)
+
+    assert cache.get("distances", "a") == 1.0
+    assert cache.stats["distances.disk_hits"] == 1
+
+
+def test_evict_trims_disk_to_the_least_recently_used(monkeypatch, tmp_path):
+    clock = Clock()
+    monkeypatch.setattr(geo_cache.time, "time", clock)
+    cache = GeoCache(str(tmp_path / "cache.sqlite"), max_memory_entries=1, max_disk_entries=2)
+    for key in ("a", "b", "c"):
+        clock.now += 1
+        cache.set("distances", key, 1.0)
+    clock.now += 1
+    cache.get("distances", "a")  # Read from disk, so a is now the most recently used there
+
+    cache.evict()
+    cache._memory.clear()
+    assert sorted(cache.get_many("distances", ["a", "b", "c"])) == ["a", "c"]
+    assert cache.stats["disk_evictions"] == 1
+
+
+def test_memory_only_cache_writes_no_file(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    cache = GeoCache("")
+    cache.set("geocode", "a", [1.0, 2.0])
+    assert cache.get("geocode", "a") == [1.0, 2.0]
+    assert os.listdir(tmp_path) == []
+
+
+def random_coords(n, seed=0):
+    rng = random.Random(seed)
+    return [f"{40.7 + rng.uniform(-0.05, 0.05):.6f},{-74.0 + rng.uniform(-0.05, 0.05):.6f}" for _ in range(n)]
+
+
+def test_lookups_are_answered_from_the_cache(maps):
+    coords = random_coords(4)
+    first = (get_lat_lon("Paris"), get_nearby_places(coords[0], 2000, "museum"), get_distances(coords[0], coords[1:]))
+    assert maps.request_count == 3
+    maps.reset_count()
+
+    again = (get_lat_lon("  paris "), get_nearby_places(coords[0], 2000, "museum"), get_distances(coords[0], coords[1:]))
+    assert again == first
+    assert maps.request_count == 0
+
+    # Only the destination that wasn't asked for before is requested
+    get_distances(coords[0], coords[1:] + random_coords(1, seed=1))
+    assert maps.request_count == 1
+
+
+def test_only_answered_elements_are_cached(maps, tmp_path, monkeypatch):
+    coords = random_coords(3)
+    save_fixture(str(tmp_path), "/distancematrix/json", {"origins": coords[0], "destinations": "|".join(coords[1:])},
+                 {"status": "OK", "rows": [{"elements": [{"status": "ZERO_RESULTS"}, {"status": "NOT_FOUND"}]}]})
+    monkeypatch.setattr(maps.httpd, "fixtures", str(tmp_path))
+
+    block = build_distance_block(coords[:1], coords[1:])
+    assert (block == np.inf).all()
+    assert cache.get("distances", distance_key(coords[0], coords[1])) == np.inf  # Really no route
+    assert cache.get("distances", distance_key(coords[0], coords[2])) is None    # No answer, ask again next time
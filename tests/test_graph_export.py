@@ -0,0 +1,73 @@
+# Compact graph payload (graph_export.py): typed arrays that decode back to the same graph,
+# and the /graph/<plan_id>/<view>/data route that serves it gzipped
+
+import base64
+import gzip
+import json
+import re
+
+import networkx as nx
+import numpy as np
+
+from compact_graph import CompactGraph
+from graph_export import PAYLOAD_VERSION, graph_payload, write_payload
+from layout import graph_layout
+
+
+def decode(payload, key, dtype):
+    return np.frombuffer(base64.b64decode(payload[key]), dtype=dtype)
+
+
+def ring_graph(n=7):
+    G = nx.cycle_graph(n)
+    for node in G:
+        G.nodes[node].update(name=f"Place {node}", address="", rating=4.0, lat=40.7 + 0.01 * node, lon=-74.0 + 0.005 * node)
+    nx.set_edge_attributes(G, 1000.0, "weight")
+    G.add_edge(0, 3, weight=2500.0)
+    return G
+
+
+def test_payload_decodes_to_the_graph():
+    G = ring_graph()
+    pos = graph_layout(G)
+    payload = graph_payload(G, pos, edge_highlight=[(1, 0), (3, 0)], node_order=[2, 3, 2, 0], title="DFS")
+
+    assert payload["version"] == PAYLOAD_VERSION and payload["title"] == "DFS"
+    assert payload["nodes"] == 7 and payload["names"] == [f"Place {node}" for node in range(7)]
+    assert np.allclose(decode(payload, "x", "<f4"), [pos[node][0] for node in range(7)], atol=1e-6)
+    assert np.allclose(decode(payload, "y", "<f4"), [pos[node][1] for node in range(7)], atol=1e-6)
+
+    edges = decode(payload, "edges", "<u4").reshape(-1, 2)
+    assert payload["edges_count"] == len(edges) == G.number_of_edges()
+    assert {tuple(edge) for edge in edges.tolist()} == {tuple(sorted(edge)) for edge in G.edges()}
+
+    bits = np.unpackbits(np.frombuffer(base64.b64decode(payload["highlight"]), dtype=np.uint8), bitorder="little")
+    highlighted = {tuple(edge) for edge, bit in zip(edges.tolist(), bits) if bit}
+    assert highlighted == {(0, 1), (0, 3)}
+
+    assert decode(payload, "order", "<i4").tolist() == [4, 0, 1, 2, 0, 0, 0]  # First step of every node, 0 if never
+
+
+def test_compact_and_networkx_graphs_give_the_same_payload(tmp_path):
+    G = ring_graph()
+    pos = graph_layout(G)
+    write_payload(graph_payload(G, pos, [(0, 1)]), str(tmp_path / "a.json.gz"))
+    write_payload(graph_payload(CompactGraph.from_networkx(G), pos, [(0, 1)]), str(tmp_path / "b.json.gz"))
+    assert (tmp_path / "a.json.gz").read_bytes() == (tmp_path / "b.json.gz").read_bytes()
+    assert json.loads(gzip.decompress((tmp_path / "a.json.gz").read_bytes()))["nodes"] == 7
+
+
+def test_payload_route_sends_gzip_when_accepted(client):
+    html = client.post("/plan", data={"destination": "Paris", "budget": "2000", "duration": "2", "interests": ["museum"]})
+    plan_id = re.search(r"/graph/([0-9a-f]{16})/image", html.get_data(as_text=True)).group(1)
+
+    zipped = client.get(f"/graph/{plan_id}/dfs/data", headers={"Accept-Encoding": "gzip, br"})
+    assert zipped.status_code == 200 and zipped.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in zipped.headers["Vary"]
+    payload = json.loads(gzip.decompress(zipped.data))
+
+    plain = client.get(f"/graph/{plan_id}/dfs/data", headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in plain.headers
+    assert plain.get_json() == payload
+    assert payload["title"] == "DFS Traversal Visualization"
+    assert client.get(f"/graph/{plan_id}/image/data").status_code == 404
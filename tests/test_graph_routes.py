@@ -0,0 +1,41 @@
+# Graphs are rendered when someone opens them (/graph/<plan_id>/<view> in app.py), never while /plan runs
+
+import os
+import re
+
+import planner
+
+FORM = {"destination": "Paris", "budget": "2000", "duration": "2", "interests": ["museum"]}
+
+
+def plan_id(client):
+    response = client.post("/plan", data=FORM)
+    assert response.status_code == 200
+    return re.search(r"/graph/([0-9a-f]{16})/image", response.get_data(as_text=True)).group(1)
+
+
+def test_plan_renders_nothing_until_a_graph_is_opened(client):
+    plan = plan_id(client)
+    assert os.listdir(planner.store.directory) == []
+
+    response = client.get(f"/graph/{plan}/dfs")
+    assert response.status_code == 200 and response.mimetype == "text/html"
+    assert b"plotly" in response.data.lower()
+    assert planner.store.rendered == 1 and len(os.listdir(planner.store.directory)) == 1
+
+    assert client.get(f"/graph/{plan}/dfs").data == response.data
+    assert planner.store.rendered == 1 and planner.store.reused == 1
+
+
+def test_image_view_is_a_png(client):
+    response = client.get(f"/graph/{plan_id(client)}/image")
+    assert response.status_code == 200 and response.mimetype == "image/png"
+    assert response.data.startswith(b"\x89PNG")
+
+
+def test_unknown_plans_and_views(client):
+    plan = plan_id(client)
+    assert client.get("/graph/0000000000000000/dfs").status_code == 404
+    assert client.get(f"/graph/{plan}/nothing").status_code == 404
+    assert client.get("/graph/interactive?plan=0000000000000000").status_code == 404
+    assert client.get(f"/graph/interactive?plan={plan}&view=dfs").status_code == 200
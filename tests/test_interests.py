@@ -0,0 +1,25 @@
+# Every interest of a plan is searched at the same time (api_test.iter_places on api_client's shared pool)
+
+import time
+
+from api_test import iter_places
+
+LOCATION = "40.7128,-74.0060"
+INTERESTS = ["museum", "park", "restaurant", "art_gallery"]
+
+
+def test_interests_are_searched_concurrently(maps, monkeypatch):
+    monkeypatch.setattr(maps.httpd, "latency", 0.2)
+    start = time.perf_counter()
+    places = list(iter_places(LOCATION, 5000, INTERESTS, max_pages=1))
+    seconds = time.perf_counter() - start
+
+    assert len(places) == 20 * len(INTERESTS)
+    assert maps.request_count == len(INTERESTS)
+    assert seconds < 0.2 * len(INTERESTS) * 0.75  # One round of requests in flight together, not one after the other
+
+
+def test_interests_are_merged_without_duplicates(maps):
+    places = list(iter_places(LOCATION, 5000, ["museum", "museum", "park"]))
+    assert len(places) == 80
+    assert len({place["place_id"] for place in places}) == 80
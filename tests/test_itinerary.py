@@ -0,0 +1,61 @@
+# Multi-day itinerary optimizer (itinerary.py): balanced day clusters and short routes inside each day
+
+import random
+
+import numpy as np
+
+from compact_graph import CompactGraph, NodeTable
+from dfs_algorithm import dfs_path
+from distance_providers import haversine_matrix
+from itinerary import improve_route, plan_itinerary, route_length, split_days, travel_matrix
+
+
+def complete_graph(n, seed=0, coordinates=True):
+    rng = random.Random(seed)
+    places = [{"name": f"Place {i}", "address": "", "rating": round(rng.uniform(1, 5), 1),
+               "lat": 40.7 + rng.uniform(-0.05, 0.05), "lon": -74.0 + rng.uniform(-0.05, 0.05)} for i in range(n)]
+    coords = np.array([[place["lat"], place["lon"]] for place in places])
+    rows, cols = np.triu_indices(n, k=1)
+    weights = haversine_matrix(coords)[rows, cols] * 1.3
+    if not coordinates:
+        for place in places:
+            place["lat"] = place["lon"] = None
+    return CompactGraph.from_edges(NodeTable.from_places(places), rows, cols, weights)
+
+
+def test_every_place_is_visited_once_in_balanced_days():
+    graph = complete_graph(23)
+    days = plan_itinerary(graph, 4)
+    assert len(days) == 4
+    assert sorted(node for day in days for node in day) == list(range(23))
+    assert max(map(len, days)) <= 6  # ceil(23 / 4)
+
+
+def test_days_are_shorter_than_the_split_dfs_order():
+    for seed in range(3):
+        graph = complete_graph(40, seed)
+        matrix = travel_matrix(graph)
+        optimized = plan_itinerary(graph, 3, time_budget=None, matrix=matrix)
+        dfs_days = split_days(dfs_path(graph, start_node=0, preference="rating"), 3)
+        assert route_length(matrix, optimized) < route_length(matrix, dfs_days)
+
+
+def test_improved_route_is_never_longer():
+    # Stops on a line, visited in a shuffled order: the best open route just walks along the line
+    rng = random.Random(1)
+    cost = np.abs(np.subtract.outer(np.arange(12.0), np.arange(12.0)))
+    route = list(range(12))
+    rng.shuffle(route)
+    improved = improve_route(cost, route)
+    assert sorted(improved) == list(range(12))
+    assert route_length(cost, [improved]) == 11 < route_length(cost, [route])
+
+
+def test_places_without_coordinates_and_short_plans():
+    graph = complete_graph(10, coordinates=False)
+    days = plan_itinerary(graph, 3)
+    assert sorted(node for day in days for node in day) == list(range(10))
+
+    assert plan_itinerary(complete_graph(2), 4) == [[0], [1], [], []]  # Fewer places than days
+    assert split_days([], 2) == [[], []]
+    assert split_days([1, 2, 3, 4, 5], 2) == [[1, 2], [3, 4, 5]]
@@ -0,0 +1,120 @@
+# JobQueue coalescing and result reuse (jobs.py), with a fake plan and with real plans against the stub Maps API
+
+import threading
+import time
+
+import pytest
+
+from jobs import JobQueue, plan_key
+from planner import STAGES, PlanError, run_plan
+
+
+class SlowPlan:
+    # A plan function that runs until the test lets it finish, counting how often it really ran
+    def __init__(self, error=None):
+        self.release = threading.Event()
+        self.calls = 0
+        self.error = error
+
+    def __call__(self, destination, progress=None):
+        self.calls += 1
+        progress("places")
+        self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+        return {"destination": destination}
+
+
+@pytest.fixture
+def queue():
+    queues = []
+
+    def make(run, **options):
+        queues.append(JobQueue(run, STAGES, expected_errors=(PlanError,), **options))
+        return queues[-1]
+
+    yield make
+    for job_queue in queues:
+        job_queue.shutdown()
+
+
+def test_identical_requests_share_one_job(queue):
+    plan = SlowPlan()
+    jobs = queue(plan)
+    first = jobs.submit(plan_key("Paris", 1000, 3, ["museum"]), "Paris")
+    second = jobs.submit(plan_key("  paris ", "1000", "3", ["museum", "museum"]), "Paris")
+    other = jobs.submit(plan_key("Rome", 1000, 3, ["museum"]), "Rome")
+
+    assert second is first
+    assert other is not first
+    assert jobs.coalesced == 1
+
+    plan.release.set()
+    assert first.wait(5) and other.wait(5)
+    assert first.status == "done" and first.result == {"destination": "Paris"}
+    assert plan.calls == 2
+
+
+def test_finished_result_is_reused_until_it_expires(queue):
+    plan = SlowPlan()
+    plan.release.set()
+    key = plan_key("Paris", 1000, 3, [])
+
+    jobs = queue(plan)
+    job = jobs.submit(key, "Paris")
+    job.wait(5)
+    assert jobs.submit(key, "Paris") is job
+
+    expired = queue(plan, result_ttl=0)
+    job = expired.submit(key, "Paris")
+    job.wait(5)
+    assert expired.submit(key, "Paris") is not job
+
+
+def test_failed_plans_are_not_reused(queue):
+    plan = SlowPlan(error=PlanError("Error: No places found."))
+    plan.release.set()
+    key = plan_key("Nowhere", 1000, 3, [])
+
+    jobs = queue(plan)
+    job = jobs.submit(key, "Nowhere")
+    job.wait(5)
+    assert job.status == "failed" and job.error == "Error: No places found."
+    assert job.finished is not None
+    assert jobs.submit(key, "Nowhere") is not job
+
+
+def test_concurrent_real_plans_are_planned_once(queue, maps):
+    jobs = queue(run_plan)
+    key = plan_key("Paris", 2000, 2, ["museum"])
+    submitted = [jobs.submit(key, "Paris", 2000, 2, ["museum"]) for _ in range(5)]
+
+    assert all(job is submitted[0] for job in submitted)
+    assert submitted[0].wait(30)
+    assert submitted[0].status == "done", submitted[0].error
+    assert len(submitted[0].result["dfs_itinerary"]) == 2
+    requests = maps.request_count
+
+    # Planned again from scratch (new queue), the stub is asked nothing: the geo cache answers it all
+    again = queue(run_plan).submit(key, "Paris", 2000, 2, ["museum"])
+    assert again.wait(30) and again.status == "done"
+    assert maps.request_count == requests
+
+
+def test_async_plan_is_polled_until_done(client):
+    form = {"destination": "Rome", "budget": "2000", "duration": "2", "interests": ["museum"]}
+    response = client.post("/plan/async", data=form)
+    assert response.status_code == 202
+    job = response.get_json()
+    status_url = job["status_url"]
+    assert job["status"] in ("queued", "running", "done")
+
+    deadline = time.time() + 30
+    while job["status"] not in ("done", "failed") and time.time() < deadline:
+        time.sleep(0.05)
+        job = client.get(status_url).get_json()
+    assert job["status"] == "done" and job["progress"] == 1.0 and job["stage"] == "done"
+
+    assert client.get(f"/plan/result/{job['job_id']}").status_code == 200
+    assert client.post("/plan/async", data=form).get_json()["job_id"] == job["job_id"]  # Finished plans are reused
+    assert client.get("/plan/status/unknown").status_code == 404
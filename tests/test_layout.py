@@ -0,0 +1,68 @@
+# Node positions (layout.py): the map projection for places with coordinates, a seeded spring layout otherwise,
+# computed once per graph and shared by every picture of a plan
+
+from collections import OrderedDict
+
+import networkx as nx
+import numpy as np
+import pytest
+
+import layout
+import planner
+from artifacts import ArtifactStore
+from compact_graph import CompactGraph
+from layout import geo_layout, graph_layout
+
+
+@pytest.fixture(autouse=True)
+def no_cached_layouts(monkeypatch):
+    monkeypatch.setattr(layout, "_layouts", OrderedDict())
+
+
+def city_graph(coordinates=True):
+    G = nx.Graph()
+    places = [("Museum", 40.70, -74.02), ("Park", 40.72, -74.00), ("Cafe", 40.71, -73.98), ("Bridge", 40.69, -73.99)]
+    for node, (name, lat, lon) in enumerate(places):
+        G.add_node(node, name=name, address="", rating=4.0, lat=lat if coordinates else None, lon=lon if coordinates else None)
+    G.add_weighted_edges_from([(0, 1, 2500.0), (1, 2, 2000.0), (2, 3, 2100.0), (3, 0, 3000.0)])
+    return G
+
+
+def test_geo_layout_is_the_map():
+    positions = geo_layout([[40.70, -74.02], [40.72, -74.00], [40.71, -73.98]])
+    points = np.array([positions[node] for node in range(3)])
+    assert np.abs(points).max() == pytest.approx(1.0)
+    assert points[:, 0].argmin() == 0 and points[:, 0].argmax() == 2  # West to east
+    assert points[:, 1].argmax() == 1                                    # North up
+    assert geo_layout([]) == {}
+
+
+def test_layout_is_cached_per_graph(monkeypatch):
+    calls = []
+    monkeypatch.setattr(layout, "geo_layout", lambda coords: calls.append(1) or geo_layout(coords))
+    G = city_graph()
+    first = graph_layout(G)
+    assert graph_layout(CompactGraph.from_networkx(G)) is first  # Same content, same fingerprint
+    assert len(calls) == 1
+    assert graph_layout(city_graph()) is first  # An equal graph built again
+    assert len(calls) == 1
+
+
+def test_graph_without_coordinates_gets_a_seeded_spring_layout(monkeypatch):
+    first = graph_layout(city_graph(coordinates=False))
+    monkeypatch.setattr(layout, "_layouts", OrderedDict())
+    again = graph_layout(city_graph(coordinates=False))
+    assert first is not again
+    assert all(np.allclose(first[node], again[node]) for node in first)
+
+
+def test_every_view_of_a_plan_shares_one_layout(monkeypatch, tmp_path):
+    calls = []
+    monkeypatch.setattr(layout, "geo_layout", lambda coords: calls.append(1) or geo_layout(coords))
+    monkeypatch.setattr(planner, "store", ArtifactStore(str(tmp_path)))
+    plan = planner.get_plan(planner.save_plan(CompactGraph.from_networkx(city_graph()), [0, 1, 2, 3], [0, 3]))
+
+    for view in ("dfs", "dijkstra", "full"):
+        planner.render_view(plan, view).close()
+        planner.render_payload(plan, view).close()
+    assert len(calls) == 1
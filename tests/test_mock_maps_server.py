@@ -0,0 +1,40 @@
+# The stub Maps API (mock_maps_server.py) and recorded fixtures (fixtures.py): a recorded city plans again offline
+
+import api_client
+import utils
+from api_test import get_lat_lon, get_nearby_places
+from geo_cache import cache
+from mock_maps_server import MockMapsServer
+from utils import get_distances
+
+LOCATION = "40.7128,-74.0060"
+
+
+def lookups():
+    return get_lat_lon("Paris"), get_nearby_places(LOCATION, 3000, "museum"), get_distances(LOCATION, ["40.72,-74.01", "40.73,-73.99"])
+
+
+def test_recorded_responses_are_replayed(maps, tmp_path, monkeypatch):
+    monkeypatch.setattr(api_client, "RECORD_FIXTURES", str(tmp_path))
+    recorded = lookups()
+    assert sorted(path.parent.name for path in tmp_path.glob("*/*.json")) == ["distancematrix", "geocode", "nearbysearch"]
+
+    # A differently seeded city would answer differently, unless it replays what was recorded
+    monkeypatch.setattr(api_client, "RECORD_FIXTURES", None)
+    with MockMapsServer(city_size=5, seed=7, fixtures=str(tmp_path)) as replay:
+        monkeypatch.setattr(utils, "MAPS_API_URL", replay.url)
+        cache.clear()
+        assert lookups() == recorded
+        assert replay.httpd.fixture_hits == 3
+
+        cache.clear()
+        with MockMapsServer(city_size=5, seed=7) as fresh:
+            monkeypatch.setattr(utils, "MAPS_API_URL", fresh.url)
+            assert lookups()[1] != recorded[1]
+
+
+def test_stub_answers_are_deterministic(maps):
+    first = lookups()
+    cache.clear()
+    assert lookups() == first
+    assert maps.request_count == 6
@@ -0,0 +1,36 @@
+# Places keep the coordinates of their search result, so a plan geocodes its destination and nothing else
+
+from api_test import get_nearby_places
+from geo_cache import GeoCache
+from planner import run_plan
+from utils import REQUEST_COUNTS
+
+LOCATION = "40.7128,-74.0060"
+
+
+def test_places_carry_their_coordinates(maps):
+    places = get_nearby_places(LOCATION, 5000, "museum")
+    assert places and all(isinstance(place["lat"], float) and isinstance(place["lon"], float) for place in places)
+
+
+def test_plan_geocodes_only_the_destination(maps):
+    before = REQUEST_COUNTS.copy()
+    plan = run_plan("Paris", 2000, 2, ["museum", "park"])
+    requests = REQUEST_COUNTS - before
+
+    assert requests["geocode"] == 1
+    graph = plan["G"]
+    assert graph.number_of_nodes() > 2
+    assert all(graph.nodes[node]["lat"] is not None for node in graph.nodes)
+
+
+def test_cached_values_are_copies(tmp_path):
+    cache = GeoCache(str(tmp_path / "cache.sqlite"))
+    places = [{"name": "Museum", "lat": None}]
+    cache.set("places", "key", places)
+    places[0]["lat"] = 1.0
+
+    found = cache.get("places", "key")
+    found[0]["lat"] = 2.0
+    found.append({"name": "Park"})
+    assert cache.get("places", "key") == [{"name": "Museum", "lat": None}]
@@ -0,0 +1,38 @@
+# Paginated, streaming place search (api_test.py) against the stub Maps API
+
+from api_test import collect_places, iter_nearby_pages, iter_places
+from geo_cache import cache, places_key
+
+LOCATION = "40.7128,-74.0060"
+
+
+def test_pages_are_streamed_in_order(maps):
+    pages = list(iter_nearby_pages(LOCATION, 5000, "museum"))
+    assert [len(page) for page in pages] == [20, 20]  # city_size=40
+    assert maps.request_count == 2
+
+
+def test_a_bigger_search_after_a_cached_one_gets_every_page(maps):
+    first = list(iter_nearby_pages(LOCATION, 5000, "museum", max_pages=1))
+    maps.reset_count()
+
+    pages = list(iter_nearby_pages(LOCATION, 5000, "museum", max_pages=3))
+    assert pages[0] == first[0]
+    assert sum(len(page) for page in pages) == 40
+    # Page 0 came from the cache without a token, so the search was walked again for a fresh one
+    assert maps.request_count == 2
+
+    # Tokens expire within minutes on Google's side, they are never cached
+    for page in range(2):
+        entry = cache.get("places", f"{places_key(LOCATION, 5000, 'museum')}|page{page}")
+        assert "next_page_token" not in entry
+    maps.reset_count()
+    assert sum(len(page) for page in iter_nearby_pages(LOCATION, 5000, "museum")) == 40
+    assert maps.request_count == 0
+
+
+def test_collecting_enough_places_stops_requesting_pages(maps):
+    places = collect_places(iter_places(LOCATION, 5000, ["museum", "park"]), max_places=5, oversample=2)
+    assert len(places) == 5
+    assert [place["rating"] for place in places] == sorted((place["rating"] for place in places), reverse=True)
+    assert maps.request_count == 2  # The first page of each interest was enough
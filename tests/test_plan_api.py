@@ -0,0 +1,66 @@
+# JSON planning API (plan_api.py): spec checks, compact records and bulk plans streamed back as NDJSON
+
+import json
+
+import pytest
+
+import app
+from plan_api import BulkPlanner, parse_spec, read_specs
+from planner import PlanError
+
+SPEC = {"destination": "Paris", "budget": 2000, "duration": 2, "interests": ["museum"]}
+
+
+@pytest.fixture
+def bulk(monkeypatch):
+    planner = BulkPlanner(max_workers=1)
+    monkeypatch.setattr(app, "bulk", planner)
+    yield planner
+    planner.shutdown()
+
+
+def test_specs_are_checked():
+    assert parse_spec({**SPEC, "budget": "2000", "interests": "museum"}) == {**SPEC, "interests": ["museum"]}
+    for bad in (None, [], {**SPEC, "destination": " "}, {**SPEC, "duration": "two"}, {**SPEC, "duration": 0},
+                {**SPEC, "interests": [1]}, {**SPEC, "budget": 10}):
+        with pytest.raises(PlanError):
+            parse_spec(bad)
+
+
+def test_bulk_bodies():
+    assert read_specs(json.dumps([SPEC]), "application/json") == [SPEC]
+    assert read_specs(json.dumps({"plans": [SPEC, SPEC]}), "application/json") == [SPEC, SPEC]
+    assert read_specs(json.dumps(SPEC) + "\n\n" + json.dumps(SPEC) + "\n", "application/x-ndjson") == [SPEC, SPEC]
+    for body in ("", "{", "[]", json.dumps({"plan": [SPEC]}), json.dumps([SPEC] * 1001)):
+        with pytest.raises(PlanError):
+            read_specs(body, "application/json")
+
+
+def test_plan_record_lists_every_place_once(client):
+    response = client.post("/api/plan", json=SPEC)
+    assert response.status_code == 200
+    record = response.get_json()
+
+    assert record["destination"] == "Paris" and record["duration"] == 2
+    nodes = [node for itinerary in record["itineraries"].values() for day in itinerary for node in day]
+    assert all(0 <= node < len(record["places"]) for node in nodes)
+    assert all(len(itinerary) == 2 for itinerary in record["itineraries"].values())
+    assert client.get(record["links"]["dfs"]).status_code == 200
+    assert client.post("/api/plan", json={**SPEC, "budget": 1}).status_code == 400
+
+
+def test_bulk_plans_are_streamed_as_ndjson(client, bulk):
+    specs = [{**SPEC, "id": "a"}, {**SPEC, "destination": "Rome", "id": "b"}, {**SPEC, "budget": 1, "id": "c"}]
+    body = "\n".join(json.dumps(spec) for spec in specs)
+    response = client.post("/api/plan/bulk", data=body, content_type="application/x-ndjson")
+    assert response.status_code == 200 and response.mimetype == "application/x-ndjson"
+
+    records = {record["id"]: record for record in map(json.loads, response.get_data(as_text=True).splitlines())}
+    assert sorted(records) == ["a", "b", "c"]
+    assert records["c"]["status"] == "failed" and "Budget is too low" in records["c"]["error"]
+    for key, index in (("a", 0), ("b", 1)):
+        assert records[key]["status"] == "done", records[key]
+        assert records[key]["index"] == index and "plan_id" not in records[key]
+        assert len(records[key]["itineraries"]["optimized"]) == 2
+
+    assert client.post("/api/plan/bulk", data="nonsense", content_type="application/json").status_code == 400
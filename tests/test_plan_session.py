@@ -0,0 +1,76 @@
+# Plan sessions (plan_session.py): a destination planned again only fetches the distances of places it hasn't seen
+
+import random
+
+import numpy as np
+
+from api_test import _place_key
+from distance_providers import HaversineProvider, to_coords
+from plan_session import PlanSession
+from planner import run_plan
+from utils import REQUEST_COUNTS
+
+
+def random_places(n, seed=0):
+    rng = random.Random(seed)
+    return [{"name": f"Place {seed}-{i}", "address": f"{i} Main St", "rating": round(rng.uniform(1, 5), 1),
+             "lat": 40.7 + rng.uniform(-0.05, 0.05), "lon": -74.0 + rng.uniform(-0.05, 0.05)} for i in range(n)]
+
+
+class CountingProvider(HaversineProvider):
+    # Great-circle distances, counting how many elements were asked for
+    def __init__(self):
+        super().__init__()
+        self.elements = 0
+
+    def matrix(self, coords):
+        self.elements += len(coords) ** 2
+        return super().matrix(coords)
+
+    def block(self, coords, other):
+        self.elements += len(coords) * len(other)
+        return super().block(coords, other)
+
+
+def test_new_places_only_fetch_their_own_rows():
+    provider = CountingProvider()
+    session = PlanSession("Paris", 40.7, -74.0, provider=provider)
+    first, second = random_places(20), random_places(5, seed=1)
+
+    assert session.add_places(first) == 20
+    provider.elements = 0
+    assert session.add_places(first[:3] + second) == 5
+    assert provider.elements == 5 * 20 + 5 * 5
+    assert np.allclose(session.distances, HaversineProvider().matrix(to_coords(first + second)))
+
+    graph = session.graph(second + first[:2])
+    assert graph.number_of_nodes() == 7 and graph.number_of_edges() == 21
+    assert graph.nodes[0]["name"] == "Place 1-0"
+    assert graph.edge_weight(0, 6) == np.float32(session.distances[20, 1])
+
+
+def test_removed_places_drop_their_rows():
+    session = PlanSession("Paris", 40.7, -74.0, provider=HaversineProvider())
+    places = random_places(10)
+    session.add_places(places)
+
+    assert session.remove_places([_place_key(places[3]), _place_key(places[7]), "unknown"]) == 2
+    kept = [place for i, place in enumerate(places) if i not in (3, 7)]
+    assert session.places == kept
+    assert np.allclose(session.distances, HaversineProvider().matrix(to_coords(kept)))
+
+
+def test_replanning_reuses_the_session(maps):
+    before = REQUEST_COUNTS.copy()
+    run_plan("Paris", 400, 2, ["museum"])  # 20 places
+    assert (REQUEST_COUNTS - before)["geocode"] == 1
+
+    before = REQUEST_COUNTS.copy()
+    run_plan("Paris", 200, 2, ["museum"])  # Fewer places: a slice of what the session has
+    assert REQUEST_COUNTS - before == {}
+
+    before, elements = REQUEST_COUNTS.copy(), maps.httpd.elements_served
+    plan = run_plan("Paris", 700, 2, ["museum"])  # 15 more places: only their rows are fetched
+    assert (REQUEST_COUNTS - before)["geocode"] == 0
+    assert plan["G"].number_of_nodes() == 35
+    assert 15 * 20 <= maps.httpd.elements_served - elements < 35 * 35 // 2
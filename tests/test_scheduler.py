@@ -0,0 +1,81 @@
+# Request scheduler (scheduler.py) and how api_client uses it: daily quotas checked before any rate limit token
+# is taken and only charged for what the API bills, the background lane's reserve, and which errors are retried
+
+import time
+
+import pytest
+
+import api_client
+from api_client import MAX_RETRIES, MapsApiError
+from distance_matrix import build_distance_matrix
+from fixtures import save_fixture
+from geo_cache import cache, distance_key
+from scheduler import QuotaExceeded, Scheduler, background
+
+COORDS = ["40.700000,-74.000000", "40.710000,-74.010000"]
+
+
+def test_quota_is_checked_before_waiting_for_tokens():
+    scheduler = Scheduler(None, {"places": 1}, {"places": 1})
+    scheduler.acquire("places")
+    tokens = scheduler._db.execute("SELECT tokens FROM buckets WHERE api = 'places'").fetchone()[0]
+
+    start = time.perf_counter()
+    with pytest.raises(QuotaExceeded):
+        scheduler.acquire("places")
+    assert time.perf_counter() - start < 0.5  # Refused right away, not after a second's wait for the bucket to refill
+    assert scheduler._db.execute("SELECT tokens FROM buckets WHERE api = 'places'").fetchone()[0] == tokens
+    assert scheduler.quota_used() == {"places": 1}
+
+
+def test_refund_gives_the_quota_back():
+    scheduler = Scheduler(None, {}, {"places": 2})
+    scheduler.acquire("places")
+    scheduler.acquire("places")
+    scheduler.refund("places")
+    scheduler.acquire("places")
+    assert scheduler.quota_used() == {"places": 2}
+
+
+def test_throttled_attempts_are_not_charged(maps, tmp_path, monkeypatch):
+    scheduler = Scheduler(None, {}, {"distancematrix": 100})
+    monkeypatch.setattr(api_client, "scheduler", scheduler)
+    save_fixture(str(tmp_path), "/distancematrix/json", {"origins": "|".join(COORDS), "destinations": "|".join(COORDS)},
+                 {"status": "OVER_QUERY_LIMIT", "rows": []})
+    monkeypatch.setattr(maps.httpd, "fixtures", str(tmp_path))
+
+    with pytest.raises(MapsApiError):
+        build_distance_matrix(COORDS)
+    assert maps.request_count == MAX_RETRIES + 1  # Retried like a 429
+    assert scheduler.quota_used() == {"distancematrix": 0}
+
+    # Once the API answers, the 2 x 2 elements are charged
+    monkeypatch.setattr(maps.httpd, "fixtures", None)
+    build_distance_matrix(COORDS)
+    assert scheduler.quota_used() == {"distancematrix": 4}
+
+
+def test_background_lane_leaves_a_reserve():
+    scheduler = Scheduler(None, {"places": 10})  # 10 tokens, 2.5 of them kept for interactive requests
+    for _ in range(8):
+        scheduler.acquire("places")
+
+    start = time.perf_counter()
+    scheduler.acquire("places")  # Interactive: 2 tokens left is enough
+    assert time.perf_counter() - start < 0.05
+
+    start = time.perf_counter()
+    with background():
+        scheduler.acquire("places")  # Waits until 1 + 2.5 tokens are there again
+    assert time.perf_counter() - start >= 0.2
+
+
+def test_error_status_raises_and_is_not_cached(maps, tmp_path, monkeypatch):
+    save_fixture(str(tmp_path), "/distancematrix/json", {"origins": "|".join(COORDS), "destinations": "|".join(COORDS)},
+                 {"status": "REQUEST_DENIED", "error_message": "The provided API key is invalid.", "rows": []})
+    monkeypatch.setattr(maps.httpd, "fixtures", str(tmp_path))
+
+    with pytest.raises(MapsApiError):
+        build_distance_matrix(COORDS)
+    assert maps.request_count == 1  # Not worth retrying
+    assert cache.get("distances", distance_key(COORDS[0], COORDS[1])) is None
@@ -0,0 +1,69 @@
+# ShortestPathService (shortest_paths.py) agrees with Dijkstra's and batches the day paths into one search
+
+import random
+
+import numpy as np
+import pytest
+
+from compact_graph import CompactGraph, NodeTable
+from dijkstra_algorithm import HEURISTIC_SCALE, dijkstra_path
+from distance_providers import HaversineProvider, haversine_pairs, to_coords
+from graph_builder import edge_arrays
+from shortest_paths import ShortestPathService
+
+
+def random_places(n, seed=0):
+    rng = random.Random(seed)
+    return [{"name": f"Place {i}", "address": f"{i} Main St", "rating": round(rng.uniform(1, 5), 1),
+             "lat": 40.7 + rng.uniform(-0.05, 0.05), "lon": -74.0 + rng.uniform(-0.05, 0.05)} for i in range(n)]
+
+
+def road_like_graph(n, k=4, seed=0):
+    # Sparse graph whose edges are great-circle distances times a detour of 1.0 - 1.5, like roads
+    places = random_places(n, seed)
+    rows, cols, _ = edge_arrays(places, k=k, provider=HaversineProvider())
+    weights = haversine_pairs(to_coords(places), rows, cols) * np.random.default_rng(seed).uniform(1.0, 1.5, len(rows))
+    return CompactGraph.from_edges(NodeTable.from_places(places), rows, cols, weights)
+
+
+def queries(n, count=30, seed=0):
+    rng = random.Random(seed)
+    return [(rng.randrange(n), rng.randrange(n)) for _ in range(count)] + [(0, 0)]
+
+
+def check_path(graph, path, start, end, length):
+    assert path[0] == start and path[-1] == end
+    total = sum(graph.edge_weight(u, v) if isinstance(graph, CompactGraph) else graph[u][v]["weight"]
+                for u, v in zip(path[:-1], path[1:]))
+    assert total == pytest.approx(length, rel=1e-6)
+
+
+@pytest.mark.parametrize("heuristic_scale", [None, HEURISTIC_SCALE])
+def test_service_agrees_with_dijkstra(heuristic_scale):
+    graph = road_like_graph(200)
+    # all_pairs_limit=0: one-off queries go through dijkstra_path / astar_path instead of cached trees
+    services = [ShortestPathService(graph), ShortestPathService(graph, all_pairs_limit=0, heuristic_scale=heuristic_scale)]
+    for start, end in queries(200):
+        expected = dijkstra_path(graph, [], start, end)
+        for service in services:
+            path, length = service.path(start, end)
+            assert length == pytest.approx(expected, rel=1e-6)
+            check_path(graph, path, start, end, length)
+
+
+def test_day_paths_take_one_batched_search():
+    graph = road_like_graph(200)
+    service = ShortestPathService(graph, all_pairs_limit=0)
+    day_paths = service.day_paths(4)
+
+    assert service.searches == 1
+    assert sorted(service.trees) == [0, 1, 2, 3]
+    for day, path in enumerate(day_paths):
+        check_path(graph, path, day, 199 - day, dijkstra_path(graph, [], day, 199 - day))
+
+    # Later queries from (or to) the same places reuse the trees
+    service.path(2, 50)
+    service.path(120, 3)
+    assert service.searches == 1
+    assert ShortestPathService(graph).day_paths(4) == day_paths  # Small graphs solve all pairs at once instead
+
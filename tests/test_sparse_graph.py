@@ -0,0 +1,96 @@
+# Sparse place graphs (graph_builder.edge_arrays with k / radius) stay connected, even when a bridge has no road
+
+import random
+
+import networkx as nx
+import numpy as np
+
+from compact_graph import CompactGraph, NodeTable
+from distance_providers import HaversineProvider, haversine_matrix, haversine_pairs, to_coords
+from graph_builder import edge_arrays
+from spatial_index import neighbor_pairs
+
+
+def two_clusters(size=6):
+    # Two tight groups of places ~10 km apart: with a small k the only edge between them is a bridge
+    places = []
+    for cluster, lat in enumerate((40.70, 40.79)):
+        for i in range(size):
+            places.append({"name": f"Place {cluster}-{i}", "address": "", "rating": 4.0,
+                           "lat": lat + 0.001 * i, "lon": -74.0 + 0.0005 * i})
+    return places
+
+
+class NoRoadProvider(HaversineProvider):
+    # Great-circle distances, except that the given pairs have no route (like ZERO_RESULTS)
+    def __init__(self, unreachable):
+        super().__init__(road_factor=1.3)
+        self.unreachable = {tuple(sorted(pair)) for pair in unreachable}
+        self.asked = []
+
+    def pairs(self, coords, i, j):
+        self.asked.extend(zip(np.asarray(i).tolist(), np.asarray(j).tolist()))
+        weights = super().pairs(coords, i, j)
+        for index, pair in enumerate(zip(np.asarray(i).tolist(), np.asarray(j).tolist())):
+            if tuple(sorted(pair)) in self.unreachable:
+                weights[index] = np.inf
+        return weights
+
+
+def is_connected(places, rows, cols, weights):
+    return nx.is_connected(CompactGraph.from_edges(NodeTable.from_places(places), rows, cols, weights).to_networkx())
+
+
+def bridges(places, k):
+    # The pairs that join the two clusters
+    pairs = neighbor_pairs(to_coords(places), k=k)
+    half = len(places) // 2
+    return [tuple(pair) for pair in pairs.tolist() if (pair[0] < half) != (pair[1] < half)]
+
+
+def random_coords(n, seed=0):
+    rng = random.Random(seed)
+    return np.array([[40.7 + rng.uniform(-0.05, 0.05), -74.0 + rng.uniform(-0.05, 0.05)] for _ in range(n)])
+
+
+def test_pairs_match_a_brute_force_search():
+    coords = random_coords(200)
+    distances = haversine_matrix(coords) + np.diag(np.full(200, np.inf))
+    expected = {tuple(sorted((a, int(b)))) for a in range(200) for b in np.argsort(distances[a])[:4]}
+    expected |= {(a, b) for a, b in zip(*np.triu_indices(200, k=1)) if distances[a, b] < 800}
+
+    pairs = neighbor_pairs(coords, k=4, radius=800)
+    assert (pairs[:, 0] < pairs[:, 1]).all()
+    assert {tuple(pair) for pair in pairs.tolist()} == expected
+
+
+def test_sparse_graph_is_connected():
+    places = two_clusters()
+    rows, cols, weights = edge_arrays(places, provider=HaversineProvider(), k=2)
+    assert len(bridges(places, k=2)) == 1
+    assert (rows < cols).all()
+    assert is_connected(places, rows, cols, weights)
+
+
+def test_unreachable_bridge_is_replaced():
+    places = two_clusters()
+    (bridge,) = bridges(places, k=2)
+    provider = NoRoadProvider([bridge])
+
+    rows, cols, weights = edge_arrays(places, provider=provider, k=2)
+    assert np.isfinite(weights).all()
+    assert (rows < cols).all()
+    assert len(set(zip(rows.tolist(), cols.tolist()))) == len(rows)
+    assert is_connected(places, rows, cols, weights)
+
+    # The closest pair is the dropped bridge again, so it gets the great-circle estimate instead of a road distance
+    edges = dict(zip(zip(rows.tolist(), cols.tolist()), weights.tolist()))
+    assert edges[bridge] == haversine_pairs(to_coords(places), [bridge[0]], [bridge[1]])[0]
+
+
+def test_unreachable_edge_inside_a_cluster_is_just_dropped():
+    places = two_clusters()
+    provider = NoRoadProvider([(0, 1)])
+    rows, cols, weights = edge_arrays(places, provider=provider, k=2)
+    assert (0, 1) not in set(zip(rows.tolist(), cols.tolist()))
+    assert is_connected(places, rows, cols, weights)